@@ -0,0 +1,1059 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from models import TareaBase, EstadoTarea, PrioridadTarea, a_epoca_us, tarea_desde_dict
+from indices import IndiceSecundario, IndiceOrdenado, IndiceTexto, MIN_PREFIJO, tokenizar
+from persistencia import (
+    Persistencia, PersistenciaJSON, EscritorAgrupado, MetricasEscritura,
+    crear_persistencia, crear_registro, _sincronizar_directorio
+)
+from snapshot_binario import SnapshotBinario
+
+
+# Posición de cada prioridad al ordenar (las tareas sin prioridad van al final)
+RANGO_PRIORIDAD = {PrioridadTarea.ALTA: 0, PrioridadTarea.MEDIA: 1, PrioridadTarea.BAJA: 2}
+
+# Órdenes disponibles para listar tareas; los empates se resuelven por ID
+ORDENES = ("id", "fecha_creacion", "fecha_limite", "prioridad")
+
+# Tareas eliminadas más recientes cuya clave de ordenación se recuerda: si eran el
+# cursor de una paginación (after_id), la página siguiente continúa tras esa clave
+CURSORES_ELIMINADOS = 10000
+
+
+# ABSTRACCIÓN: Interfaz común para los motores de almacenamiento de tareas
+class AlmacenTareas(ABC):
+    """
+    Clase abstracta base para guardar tareas.
+    El gestor modifica las tareas y luego avisa al almacén con actualizar().
+    """
+
+    @abstractmethod
+    def cargar(self):
+        """Prepara el almacén (lee los datos guardados o abre la base de datos)"""
+        pass
+
+    @abstractmethod
+    def generar_id(self) -> int:
+        """Devuelve un ID nuevo que no se ha usado nunca"""
+        pass
+
+    @abstractmethod
+    def obtener(self, id_tarea: int) -> Optional[TareaBase]:
+        pass
+
+    @abstractmethod
+    def insertar(self, tarea: TareaBase):
+        pass
+
+    @abstractmethod
+    def actualizar(self, tarea: TareaBase, operacion: str = "actualizar"):
+        """Guarda los cambios hechos sobre una tarea ya existente"""
+        pass
+
+    @abstractmethod
+    def eliminar(self, id_tarea: int) -> bool:
+        pass
+
+    @abstractmethod
+    def listar(self, estado: Optional[EstadoTarea] = None, tipo: Optional[str] = None,
+               prioridad: Optional[PrioridadTarea] = None, orden: str = "id",
+               limite: Optional[int] = None, despues_de: Optional[int] = None) -> List[TareaBase]:
+        """
+        Lista las tareas que cumplen todos los filtros (tipo es el nombre de la clase),
+        ordenadas según orden. Con despues_de se continúa tras esa tarea (cursor).
+        """
+        pass
+
+    @abstractmethod
+    def contar(self, estado: Optional[EstadoTarea] = None, tipo: Optional[str] = None,
+               prioridad: Optional[PrioridadTarea] = None) -> int:
+        """Número de tareas que cumplen los filtros"""
+        pass
+
+    @abstractmethod
+    def conteos(self) -> Dict[str, Dict[Any, int]]:
+        """Número de tareas por "estado", "tipo" y "prioridad" """
+        pass
+
+    @abstractmethod
+    def contar_vencidas(self, ahora: datetime) -> int:
+        pass
+
+    @abstractmethod
+    def listar_por_fecha_limite(self, hasta: datetime, desde: Optional[datetime] = None) -> List[TareaBase]:
+        """Tareas no completadas con desde <= fecha_limite < hasta, ordenadas por fecha límite"""
+        pass
+
+    @abstractmethod
+    def proximo_vencimiento(self, desde: Optional[datetime] = None) -> Optional[datetime]:
+        """Menor fecha límite >= desde de las tareas no completadas (None si no hay ninguna)"""
+        pass
+
+    def listar_completadas_antes(self, hasta: datetime, limite: Optional[int] = None) -> List[TareaBase]:
+        """
+        Tareas completadas antes de hasta (las que no guardan cuándo se completaron,
+        por su fecha de creación), hasta limite
+        """
+        completadas = [tarea for tarea in self.listar(estado=EstadoTarea.COMPLETADA)
+                       if (tarea.fecha_completada or tarea.fecha_creacion) < hasta]
+        return completadas[:limite]
+
+    @abstractmethod
+    def iterar(self) -> Iterator[TareaBase]:
+        """Recorre todas las tareas"""
+        pass
+
+    def valores_analitica(self) -> Iterator[Tuple[int, tuple]]:
+        """(id, tarea.valores_analitica()) de todas las tareas, para construir la vista de analitica.py"""
+        return ((tarea.id, tarea.valores_analitica()) for tarea in self.iterar())
+
+    @abstractmethod
+    def buscar(self, consulta: str, limite: int = 20) -> Tuple[List[TareaBase], int]:
+        """
+        Búsqueda de texto en título y descripción (sin distinguir mayúsculas ni acentos;
+        cada palabra también coincide como prefijo). Devuelve las limite tareas más
+        relevantes y el número total de coincidencias.
+        """
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @contextmanager
+    def lote(self):
+        """
+        Agrupa las mutaciones hechas dentro del bloque para persistirlas de una vez.
+        Si el motor lo permite, un error dentro del bloque deshace todo el lote.
+        """
+        yield
+
+    def guardar_todo(self):
+        """Fuerza la escritura completa del estado (si el motor lo necesita)"""
+        pass
+
+    def confirmar(self) -> Future:
+        """Future que se resuelve cuando los cambios hechos hasta ahora son durables"""
+        futuro: Future = Future()
+        futuro.set_result(None)
+        return futuro
+
+    @abstractmethod
+    def metricas_persistencia(self) -> Dict[str, Any]:
+        pass
+
+    def continuar_carga(self, tamano_bloque: int = 2000) -> bool:
+        """Carga el siguiente bloque de tareas en segundo plano; False cuando ya no queda nada"""
+        return False
+
+    def estado_carga(self) -> Dict[str, Any]:
+        """"lista" o "cargando" y la fracción del snapshot ya cargada"""
+        return {"estado": "lista", "progreso": 1.0}
+
+    def version_externa(self) -> int:
+        """Número que cambia cuando otro proceso modifica las tareas (0 si nadie más puede)"""
+        return 0
+
+    def avanzar_ids(self, ultimo_id: int):
+        """Los IDs nuevos serán mayores que ultimo_id (usado por tareas que ya no están en el almacén)"""
+        pass
+
+    def cerrar(self):
+        pass
+
+
+# HERENCIA: Almacén en memoria con persistencia JSON o journal
+class AlmacenMemoria(AlmacenTareas):
+    """Todas las tareas viven en un diccionario; los cambios se escriben en segundo plano"""
+
+    def __init__(self, persistencia: Optional[Persistencia] = None):
+        # ENCAPSULACIÓN: Diccionario privado de tareas
+        self._tareas: Dict[int, TareaBase] = {}
+        self._siguiente_id = 1
+        self._persistencia = persistencia if persistencia is not None else PersistenciaJSON("tareas.json")
+        self._escritor: Optional[EscritorAgrupado] = None
+        # Índices secundarios: estado, tipo y prioridad -> IDs
+        self._por_estado = IndiceSecundario()
+        self._por_tipo = IndiceSecundario()
+        self._por_prioridad = IndiceSecundario()
+        # Índice ordenado por fecha límite (solo tareas con fecha y sin completar)
+        self._por_fecha_limite = IndiceOrdenado()
+        # Índice ordenado por fecha en que se completó (solo tareas completadas), para archivar
+        self._por_fecha_completada = IndiceOrdenado()
+        # Cada índice con la función que calcula su clave a partir de
+        # los valores indexados de la tarea y de la propia tarea
+        self._indices: List[Tuple[Any, Callable]] = [
+            (self._por_estado, lambda claves, tarea: claves[0]),
+            (self._por_tipo, lambda claves, tarea: claves[1]),
+            (self._por_prioridad, lambda claves, tarea: claves[2]),
+            (self._por_fecha_limite, self._clave_vencimiento),
+            (self._por_fecha_completada, self._clave_completada),
+        ]
+        # Índices de ordenación para paginar; se construyen la primera vez que se piden
+        self._ordenes: Dict[str, Tuple[IndiceOrdenado, Callable]] = {}
+        # Índice de texto para buscar; se construye la primera vez que se busca
+        self._texto: Optional[IndiceTexto] = None
+        # Valores indexados de cada tarea (estado, tipo, prioridad, fecha_limite, fecha_completada)
+        self._claves: Dict[int, tuple] = {}
+        # Claves de ordenación de las últimas tareas eliminadas (o archivadas), por orden
+        self._cursores_eliminados: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # Registros acumulados mientras hay un lote abierto (None fuera de un lote)
+        self._registros_lote: Optional[List[dict]] = None
+        # Carga perezosa: snapshot del que faltan tareas por leer (None cuando ya está todo),
+        # posición de la carga en segundo plano e IDs del snapshot que no hay que cargar
+        self._snapshot: Optional[SnapshotBinario] = None
+        self._posicion_carga = 0
+        self._descartadas: Set[int] = set()
+        # Las lecturas concurrentes del gestor pueden materializar tareas del snapshot:
+        # esas escrituras internas se hacen de una en una
+        self._cerrojo_carga = threading.Lock()
+        self._cerrojo_id = threading.Lock()
+
+    def cargar(self):
+        # Cada proceso tendría su propia copia de las tareas: solo uno puede usar los archivos
+        self._persistencia.bloquear()
+        perezosa = self._persistencia.abrir_perezoso()
+        if perezosa is not None:
+            # Solo se leen los cambios del log; el snapshot se lee bajo demanda
+            cambios, self._snapshot = perezosa
+            for id_tarea, tarea_data in cambios.items():
+                if tarea_data is None:
+                    self._descartadas.add(id_tarea)
+                else:
+                    self._agregar(tarea_data, id_tarea)
+            if self._snapshot is None:
+                self._terminar_carga()
+        else:
+            for id_tarea, tarea_data in self._persistencia.cargar().items():
+                self._agregar(tarea_data, id_tarea)
+        self._siguiente_id = max(self._siguiente_id, self._persistencia.ultimo_id + 1)
+        # Las escrituras se hacen en un hilo aparte para no bloquear el event loop
+        self._escritor = EscritorAgrupado(self._persistencia)
+
+    def _agregar(self, tarea_data: dict, id_tarea: int):
+        tarea_data["id"] = int(id_tarea)
+        tarea = tarea_desde_dict(tarea_data)
+        self._tareas[tarea.id] = tarea
+        self._indexar(tarea)
+
+    def continuar_carga(self, tamano_bloque: int = 2000) -> bool:
+        if self._snapshot is None:
+            return False
+        with self._cerrojo_carga:
+            if self._snapshot is None:
+                return False
+            fin = min(self._posicion_carga + tamano_bloque, self._snapshot.cantidad)
+            for indice in range(self._posicion_carga, fin):
+                id_tarea = self._snapshot.id_en(indice)
+                # Las ya materializadas o modificadas y las eliminadas no se vuelven a leer
+                if id_tarea not in self._tareas and id_tarea not in self._descartadas:
+                    tarea = self._snapshot.leer_en(indice)
+                    self._tareas[id_tarea] = tarea
+                    self._indexar(tarea)
+            self._posicion_carga = fin
+            if fin < self._snapshot.cantidad:
+                return True
+            self._terminar_carga()
+            return False
+
+    def _completar_carga(self):
+        """
+        Las consultas sobre todas las tareas necesitan la carga completa.
+        Después ya nadie modifica las tareas desde una lectura, así que pueden recorrerse
+        aunque otros hilos estén leyendo a la vez.
+        """
+        while self.continuar_carga(tamano_bloque=100000):
+            pass
+
+    def _terminar_carga(self):
+        self._snapshot = None
+        self._descartadas = set()
+        self._persistencia.terminar_carga()
+
+    def estado_carga(self) -> Dict[str, Any]:
+        if self._snapshot is None:
+            return {"estado": "lista", "progreso": 1.0}
+        return {"estado": "cargando", "progreso": self._posicion_carga / max(1, self._snapshot.cantidad)}
+
+    def generar_id(self) -> int:
+        with self._cerrojo_id:
+            id_actual = self._siguiente_id
+            self._siguiente_id += 1
+        return id_actual
+
+    def avanzar_ids(self, ultimo_id: int):
+        with self._cerrojo_id:
+            self._siguiente_id = max(self._siguiente_id, ultimo_id + 1)
+
+    def obtener(self, id_tarea: int) -> Optional[TareaBase]:
+        tarea = self._tareas.get(id_tarea)
+        if tarea is None and self._snapshot is not None:
+            with self._cerrojo_carga:
+                # Otro hilo puede haberla materializado (o terminado la carga) mientras tanto
+                tarea = self._tareas.get(id_tarea)
+                if tarea is None and self._snapshot is not None and id_tarea not in self._descartadas:
+                    # Carga perezosa: se materializa la tarea la primera vez que se pide
+                    tarea = self._snapshot.leer(id_tarea)
+                    if tarea is not None:
+                        self._tareas[id_tarea] = tarea
+                        self._indexar(tarea)
+        return tarea
+
+    def insertar(self, tarea: TareaBase):
+        self._tareas[tarea.id] = tarea
+        self._indexar(tarea)
+        self._registrar_cambio("crear", tarea)
+
+    def actualizar(self, tarea: TareaBase, operacion: str = "actualizar"):
+        self._indexar(tarea)
+        self._registrar_cambio(operacion, tarea)
+
+    def eliminar(self, id_tarea: int) -> bool:
+        if self.obtener(id_tarea) is None:
+            return False
+        self._desindexar(self._tareas.pop(id_tarea))
+        if self._snapshot is not None:
+            self._descartadas.add(id_tarea)
+        self._encolar(crear_registro("eliminar", id_tarea))
+        return True
+
+    @contextmanager
+    def lote(self):
+        # Los cambios en memoria no se deshacen: el gestor valida el lote antes de aplicarlo.
+        # Si aun así el bloque falla, no se persiste nada del lote
+        if self._registros_lote is not None:
+            yield
+            return
+        self._registros_lote = []
+        try:
+            yield
+        except BaseException:
+            self._registros_lote = None
+            raise
+        registros, self._registros_lote = self._registros_lote, None
+        if registros:
+            self._escritor.encolar_lote(registros)
+
+    def _filtrar(self, estado: Optional[EstadoTarea], tipo: Optional[str],
+                 prioridad: Optional[PrioridadTarea]) -> Optional[Set[int]]:
+        """IDs que cumplen los filtros, o None si no hay filtros"""
+        filtros = [indice.ids(valor) for indice, valor in (
+            (self._por_estado, estado), (self._por_tipo, tipo), (self._por_prioridad, prioridad)
+        ) if valor is not None]
+        if not filtros:
+            return None
+        # Intersecar empezando por el conjunto más pequeño: coste O(resultado)
+        filtros.sort(key=len)
+        return filtros[0].intersection(*filtros[1:]) if len(filtros) > 1 else filtros[0]
+
+    def listar(self, estado: Optional[EstadoTarea] = None, tipo: Optional[str] = None,
+               prioridad: Optional[PrioridadTarea] = None, orden: str = "id",
+               limite: Optional[int] = None, despues_de: Optional[int] = None) -> List[TareaBase]:
+        self._completar_carga()
+        ids = self._filtrar(estado, tipo, prioridad)
+        indice, clave_de = self._indice_orden(orden)
+        
+        desde = None
+        if despues_de is not None:
+            desde = (self._clave_cursor(orden, clave_de, despues_de), despues_de)
+        
+        if ids is not None and self._conviene_ordenar(len(ids), limite):
+            # Pocos candidatos: ordenarlos directamente es más barato que recorrer el índice
+            candidatos = sorted((clave_de(self._claves[i], self._tareas[i]), i) for i in ids)
+            if desde is not None:
+                candidatos = candidatos[bisect_right(candidatos, desde):]
+            return [self._tareas[i] for _, i in candidatos[:limite]]
+        
+        return [self._tareas[i] for i in indice.pagina(desde, limite, ids)]
+
+    def _clave_cursor(self, orden: str, clave_de: Callable, id_tarea: int) -> Any:
+        """
+        Clave de ordenación de la tarea del cursor; si ya no está en el almacén (eliminada
+        o archivada entre dos páginas), la que tenía. Por ID no hace falta buscarla
+        """
+        if orden == "id":
+            return id_tarea
+        tarea = self._tareas.get(id_tarea)
+        if tarea is not None:
+            return clave_de(self._claves[id_tarea], tarea)
+        eliminada = self._cursores_eliminados.get(id_tarea)
+        if eliminada is None:
+            raise ValueError(f"El cursor {id_tarea} no corresponde a ninguna tarea")
+        return eliminada[orden]
+
+    def _conviene_ordenar(self, candidatos: int, limite: Optional[int]) -> bool:
+        """
+        Ordenar los candidatos cuesta O(c log c); recorrer el índice de ordenación
+        salta de media total/c entradas por cada resultado de la página.
+        """
+        if limite is None:
+            return True
+        return candidatos * max(1, candidatos.bit_length()) <= limite * len(self._tareas) // max(1, candidatos)
+
+    def _indice_orden(self, orden: str) -> Tuple[IndiceOrdenado, Callable]:
+        """Devuelve (construyéndolo si hace falta) el índice de ordenación pedido"""
+        if orden not in self._ordenes:
+            if orden not in ORDENES:
+                raise ValueError(f"Orden no válido: {orden}")
+            # Varios listados concurrentes (lecturas del gestor) lo construyen una sola vez:
+            # un duplicado quedaría en _indices y cada escritura lo mantendría para nada
+            with self._cerrojo_carga:
+                if orden not in self._ordenes:
+                    clave_de = getattr(self, f"_clave_orden_{orden}")
+                    indice = IndiceOrdenado(
+                        (clave_de(self._claves[id_tarea], tarea), id_tarea)
+                        for id_tarea, tarea in self._tareas.items()
+                    )
+                    self._indices.append((indice, clave_de))
+                    self._ordenes[orden] = (indice, clave_de)
+        return self._ordenes[orden]
+
+    def contar(self, estado: Optional[EstadoTarea] = None, tipo: Optional[str] = None,
+               prioridad: Optional[PrioridadTarea] = None) -> int:
+        self._completar_carga()
+        ids = self._filtrar(estado, tipo, prioridad)
+        return len(self._tareas) if ids is None else len(ids)
+
+    def conteos(self) -> Dict[str, Dict[Any, int]]:
+        # Los índices ya mantienen los conteos: coste O(1) por valor
+        self._completar_carga()
+        return {
+            "estado": self._por_estado.conteos(),
+            "tipo": self._por_tipo.conteos(),
+            "prioridad": self._por_prioridad.conteos(),
+        }
+
+    def contar_vencidas(self, ahora: datetime) -> int:
+        self._completar_carga()
+        return self._por_fecha_limite.contar_menores(ahora)
+
+    def listar_por_fecha_limite(self, hasta: datetime, desde: Optional[datetime] = None) -> List[TareaBase]:
+        self._completar_carga()
+        return [self._tareas[id_tarea] for id_tarea in self._por_fecha_limite.rango(desde, hasta)]
+
+    def proximo_vencimiento(self, desde: Optional[datetime] = None) -> Optional[datetime]:
+        self._completar_carga()
+        return self._por_fecha_limite.primera_clave(desde)
+
+    def listar_completadas_antes(self, hasta: datetime, limite: Optional[int] = None) -> List[TareaBase]:
+        self._completar_carga()
+        ids = islice(self._por_fecha_completada.rango(None, hasta), limite)
+        return [self._tareas[id_tarea] for id_tarea in ids]
+
+    def iterar(self) -> Iterator[TareaBase]:
+        self._completar_carga()
+        return iter(list(self._tareas.values()))
+
+    def buscar(self, consulta: str, limite: int = 20) -> Tuple[List[TareaBase], int]:
+        self._completar_carga()
+        if self._texto is None:
+            # Varias búsquedas concurrentes (lecturas del gestor) lo construyen una sola vez
+            with self._cerrojo_carga:
+                if self._texto is None:
+                    texto = IndiceTexto()
+                    for tarea in self._tareas.values():
+                        texto.indexar(tarea.id, tarea.titulo, tarea.descripcion)
+                    self._texto = texto
+        ids, total = self._texto.buscar(consulta, limite)
+        return [self._tareas[id_tarea] for id_tarea in ids], total
+
+    def __len__(self) -> int:
+        self._completar_carga()
+        return len(self._tareas)
+
+    @staticmethod
+    def _claves_de(tarea: TareaBase) -> tuple:
+        """Valores indexados de la tarea: (estado, tipo, prioridad, fecha_limite, fecha_completada)"""
+        return (tarea.estado, tarea.__class__.__name__,
+                getattr(tarea, "prioridad", None), getattr(tarea, "fecha_limite", None), tarea.fecha_completada)
+
+    @staticmethod
+    def _clave_vencimiento(claves: tuple, tarea: TareaBase) -> Optional[datetime]:
+        # Una tarea completada ya no puede vencer
+        return claves[3] if claves[0] != EstadoTarea.COMPLETADA else None
+
+    @staticmethod
+    def _clave_completada(claves: tuple, tarea: TareaBase) -> Optional[datetime]:
+        if claves[0] != EstadoTarea.COMPLETADA:
+            return None
+        return claves[4] or tarea.fecha_creacion
+
+    @staticmethod
+    def _clave_orden_id(claves: tuple, tarea: TareaBase) -> int:
+        return tarea.id
+
+    @staticmethod
+    def _clave_orden_fecha_creacion(claves: tuple, tarea: TareaBase) -> datetime:
+        return tarea.fecha_creacion
+
+    @staticmethod
+    def _clave_orden_fecha_limite(claves: tuple, tarea: TareaBase) -> tuple:
+        # Las tareas sin fecha límite van al final
+        return (claves[3] is None, claves[3] or datetime.min)
+
+    @staticmethod
+    def _clave_orden_prioridad(claves: tuple, tarea: TareaBase) -> int:
+        return RANGO_PRIORIDAD.get(claves[2], len(RANGO_PRIORIDAD))
+
+    def _indexar(self, tarea: TareaBase):
+        """Método privado que actualiza los índices de una tarea"""
+        if self._texto is not None:
+            self._texto.indexar(tarea.id, tarea.titulo, tarea.descripcion)
+        nuevas = self._claves_de(tarea)
+        anteriores = self._claves.get(tarea.id)
+        if anteriores == nuevas:
+            return
+        for indice, clave_de in self._indices:
+            anterior = clave_de(anteriores, tarea) if anteriores is not None else None
+            nueva = clave_de(nuevas, tarea)
+            if anterior == nueva:
+                continue
+            if anterior is not None:
+                indice.quitar(anterior, tarea.id)
+            if nueva is not None:
+                indice.agregar(nueva, tarea.id)
+        self._claves[tarea.id] = nuevas
+
+    def _desindexar(self, tarea: TareaBase):
+        if self._texto is not None:
+            self._texto.quitar(tarea.id)
+        anteriores = self._claves.pop(tarea.id, None)
+        if anteriores is None:
+            return
+        self._cursores_eliminados[tarea.id] = {
+            orden: getattr(self, f"_clave_orden_{orden}")(anteriores, tarea) for orden in ORDENES if orden != "id"
+        }
+        if len(self._cursores_eliminados) > CURSORES_ELIMINADOS:
+            self._cursores_eliminados.popitem(last=False)
+        for indice, clave_de in self._indices:
+            anterior = clave_de(anteriores, tarea)
+            if anterior is not None:
+                indice.quitar(anterior, tarea.id)
+
+    def _registrar_cambio(self, operacion: str, tarea: TareaBase):
+        """Método privado que encola una mutación para el escritor de persistencia"""
+        self._encolar(crear_registro(operacion, tarea.id, tarea.to_dict()))
+
+    def _encolar(self, registro: dict):
+        if self._registros_lote is not None:
+            self._registros_lote.append(registro)
+        else:
+            self._escritor.encolar(registro)
+
+    def guardar_todo(self):
+        self._completar_carga()
+        tareas_data = {id_tarea: tarea.to_dict() for id_tarea, tarea in self._tareas.items()}
+        self._escritor.guardar_todo(tareas_data)
+
+    def confirmar(self) -> Future:
+        return self._escritor.confirmar()
+
+    def metricas_persistencia(self) -> Dict[str, Any]:
+        return self._escritor.metricas()
+
+    def cerrar(self):
+        if self._escritor is not None:
+            self._escritor.cerrar()
+
+
+# HERENCIA: Almacén SQLite, los datos no se cargan en memoria
+class AlmacenSQLite(AlmacenTareas):
+    """
+    Guarda las tareas en SQLite (modo WAL) con índices por estado, tipo,
+    prioridad y fecha límite. Los filtros, los conteos y las tareas vencidas
+    se resuelven con consultas SQL, así que la memoria no crece con el número de tareas.
+
+    Varios procesos (workers de uvicorn/gunicorn) pueden compartir la misma base de datos:
+    los IDs salen de una secuencia guardada en ella y la caché de tareas de cada proceso
+    se invalida cuando otro proceso confirma cambios.
+    """
+
+    COLUMNAS = ("id", "tipo", "titulo", "descripcion", "estado",
+                "prioridad", "fecha_limite", "fecha_creacion", "fecha_completada")
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS tareas (
+            id INTEGER PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            titulo TEXT NOT NULL,
+            descripcion TEXT NOT NULL DEFAULT '',
+            estado TEXT NOT NULL,
+            prioridad TEXT,
+            fecha_limite TEXT,
+            fecha_creacion TEXT NOT NULL,
+            fecha_completada TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_tareas_estado ON tareas(estado);
+        CREATE INDEX IF NOT EXISTS idx_tareas_tipo ON tareas(tipo);
+        CREATE INDEX IF NOT EXISTS idx_tareas_prioridad ON tareas(prioridad);
+        CREATE INDEX IF NOT EXISTS idx_tareas_fecha_limite ON tareas(fecha_limite)
+            WHERE fecha_limite IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_tareas_fecha_creacion ON tareas(fecha_creacion, id);
+        CREATE INDEX IF NOT EXISTS idx_tareas_orden_fecha_limite
+            ON tareas(fecha_limite IS NULL, COALESCE(fecha_limite, ''), id);
+        CREATE INDEX IF NOT EXISTS idx_tareas_orden_prioridad ON tareas({rango_prioridad}, id);
+        CREATE TABLE IF NOT EXISTS secuencias (
+            nombre TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO secuencias (nombre, valor)
+            SELECT 'tareas', COALESCE(MAX(id), 0) FROM tareas;
+        CREATE TABLE IF NOT EXISTS tareas_eliminadas (
+            orden INTEGER PRIMARY KEY,
+            id INTEGER NOT NULL UNIQUE,
+            prioridad TEXT,
+            fecha_limite TEXT,
+            fecha_creacion TEXT NOT NULL
+        );
+        CREATE TRIGGER IF NOT EXISTS tareas_recordar_eliminada AFTER DELETE ON tareas BEGIN
+            INSERT OR REPLACE INTO tareas_eliminadas (id, prioridad, fecha_limite, fecha_creacion)
+                VALUES (old.id, old.prioridad, old.fecha_limite, old.fecha_creacion);
+            DELETE FROM tareas_eliminadas WHERE orden <= last_insert_rowid() - {cursores_eliminados};
+        END;
+    """
+
+    # Índice de texto FTS5 sobre título y descripción (sin acentos, con prefijos de 2 y 3
+    # letras precalculados). Es external content: no duplica el texto, y los triggers lo
+    # mantienen al día solo cuando cambian esas columnas
+    ESQUEMA_BUSQUEDA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS tareas_fts USING fts5(
+            titulo, descripcion, content='tareas', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        );
+        CREATE TRIGGER IF NOT EXISTS tareas_fts_insertar AFTER INSERT ON tareas BEGIN
+            INSERT INTO tareas_fts (rowid, titulo, descripcion) VALUES (new.id, new.titulo, new.descripcion);
+        END;
+        CREATE TRIGGER IF NOT EXISTS tareas_fts_eliminar AFTER DELETE ON tareas BEGIN
+            INSERT INTO tareas_fts (tareas_fts, rowid, titulo, descripcion)
+                VALUES ('delete', old.id, old.titulo, old.descripcion);
+        END;
+        CREATE TRIGGER IF NOT EXISTS tareas_fts_actualizar AFTER UPDATE OF titulo, descripcion ON tareas
+            WHEN old.titulo IS NOT new.titulo OR old.descripcion IS NOT new.descripcion BEGIN
+            INSERT INTO tareas_fts (tareas_fts, rowid, titulo, descripcion)
+                VALUES ('delete', old.id, old.titulo, old.descripcion);
+            INSERT INTO tareas_fts (rowid, titulo, descripcion) VALUES (new.id, new.titulo, new.descripcion);
+        END;
+    """
+
+    # Pesos de bm25() para (titulo, descripcion), como en IndiceTexto
+    PESOS_BUSQUEDA = (2.0, 1.0)
+
+    # Expresión SQL equivalente a RANGO_PRIORIDAD
+    RANGO_PRIORIDAD_SQL = ("(CASE prioridad "
+                           + " ".join(f"WHEN '{p.value}' THEN {r}" for p, r in RANGO_PRIORIDAD.items())
+                           + f" ELSE {len(RANGO_PRIORIDAD)} END)")
+
+    # Expresiones de ordenación de cada orden (cubiertas por los índices anteriores)
+    ORDEN_SQL = {
+        "id": ("id",),
+        "fecha_creacion": ("fecha_creacion", "id"),
+        "fecha_limite": ("fecha_limite IS NULL", "COALESCE(fecha_limite, '')", "id"),
+        "prioridad": (RANGO_PRIORIDAD_SQL, "id"),
+    }
+
+    def __init__(self, ruta: str = "tareas.db", tamano_cache: int = 10000, bloque_ids: int = 1):
+        self._ruta = ruta
+        self._conexion: Optional[sqlite3.Connection] = None
+        self._cerrojo = threading.Lock()
+        self._metricas = MetricasEscritura()
+        # Caché LRU de tareas ya materializadas (con su JSON cacheado) y la
+        # versión de la base de datos con la que se llenó
+        self._cache: "OrderedDict[int, TareaBase]" = OrderedDict()
+        self._tamano_cache = tamano_cache
+        self._version_cache: Optional[int] = None
+        # La caché se consulta desde varios hilos a la vez (lecturas del gestor)
+        self._cerrojo_cache = threading.Lock()
+        # IDs reservados en la secuencia y aún sin usar: [siguiente, fin)
+        self._bloque_ids = bloque_ids
+        self._ids_reservados = (0, 0)
+        self._cerrojo_ids = threading.Lock()
+        # Escrituras hechas dentro del lote abierto (None fuera de un lote)
+        self._escrituras_lote: Optional[int] = None
+        # Motivo por el que no se puede buscar (None si hay FTS5)
+        self._error_busqueda: Optional[str] = None
+        # Sincronización del WAL pedida por confirmar() y aún sin empezar, y el hilo que las hace
+        self._sincronizacion: Optional[Future] = None
+        self._condicion_sincronizar = threading.Condition()
+        self._hilo_sincronizar: Optional[threading.Thread] = None
+        self._directorio_sincronizado = False
+
+    def cargar(self):
+        # timeout: espera a que otro proceso suelte el bloqueo de escritura
+        self._conexion = sqlite3.connect(self._ruta, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.executescript(self.ESQUEMA.format(rango_prioridad=self.RANGO_PRIORIDAD_SQL,
+                                                        cursores_eliminados=CURSORES_ELIMINADOS))
+        if not any(fila[1] == "fecha_completada" for fila in self._consultar("PRAGMA table_info(tareas)")):
+            # Base de datos anterior a la fecha de completado
+            try:
+                self._conexion.execute("ALTER TABLE tareas ADD COLUMN fecha_completada TEXT")
+            except sqlite3.OperationalError:
+                pass  # Otro worker la ha añadido a la vez
+        existia = self._consultar("SELECT 1 FROM sqlite_master WHERE name = 'tareas_fts'")
+        try:
+            self._conexion.executescript(self.ESQUEMA_BUSQUEDA)
+        except sqlite3.OperationalError as e:
+            # SQLite compilado sin FTS5: todo funciona salvo la búsqueda
+            self._error_busqueda = str(e)
+            return
+        if not existia:
+            # Base de datos anterior a la búsqueda: se indexan las tareas que ya tenía
+            self._conexion.execute("INSERT INTO tareas_fts (tareas_fts) VALUES ('rebuild')")
+
+    def generar_id(self) -> int:
+        # La secuencia vive en la base de datos: el UPDATE es atómico entre procesos
+        # y nunca reutiliza IDs, aunque se elimine la última tarea.
+        # Con bloque_ids > 1 cada proceso reserva varios IDs de una vez (menos
+        # escrituras compartidas, pero los IDs de distintos workers se intercalan)
+        with self._cerrojo_ids:
+            siguiente, fin = self._ids_reservados
+            if siguiente >= fin:
+                fin = self._consultar(
+                    "UPDATE secuencias SET valor = valor + ? WHERE nombre = 'tareas' RETURNING valor",
+                    (self._bloque_ids,)
+                )[0][0] + 1
+                siguiente = fin - self._bloque_ids
+            self._ids_reservados = (siguiente + 1, fin)
+        return siguiente
+
+    def _fila(self, tarea: TareaBase) -> tuple:
+        data = tarea.to_dict()
+        return tuple(data.get(columna) for columna in self.COLUMNAS)
+
+    def _tarea(self, fila: tuple) -> TareaBase:
+        return tarea_desde_dict(dict(zip(self.COLUMNAS, fila)))
+
+    def _consultar(self, sql: str, parametros: tuple = ()) -> List[tuple]:
+        with self._cerrojo:
+            return self._conexion.execute(sql, parametros).fetchall()
+
+    def _escribir(self, sql: str, parametros: tuple) -> int:
+        inicio = time.perf_counter()
+        with self._cerrojo:
+            cursor = self._conexion.execute(sql, parametros)
+        if self._escrituras_lote is not None:
+            self._escrituras_lote += 1
+        else:
+            self._metricas.registrar_lote(1, 0, time.perf_counter() - inicio)
+        return cursor.rowcount
+
+    @contextmanager
+    def lote(self):
+        # Todo el lote va en una transacción: un solo commit, o ninguno si falla
+        if self._escrituras_lote is not None:
+            yield
+            return
+        inicio = time.perf_counter()
+        with self._cerrojo:
+            self._conexion.execute("BEGIN IMMEDIATE")
+        self._escrituras_lote = 0
+        try:
+            yield
+        except BaseException:
+            with self._cerrojo:
+                self._conexion.execute("ROLLBACK")
+            # Las tareas cacheadas pueden tener cambios que se han deshecho,
+            # y una reserva de IDs hecha dentro del lote también se ha deshecho
+            with self._cerrojo_cache:
+                self._cache.clear()
+            with self._cerrojo_ids:
+                self._ids_reservados = (0, 0)
+            raise
+        else:
+            with self._cerrojo:
+                self._conexion.execute("COMMIT")
+            self._metricas.registrar_lote(self._escrituras_lote, 0, time.perf_counter() - inicio)
+        finally:
+            self._escrituras_lote = None
+
+    def version_externa(self) -> int:
+        # PRAGMA data_version solo cambia con commits de otras conexiones y no lee de disco
+        return self._consultar("PRAGMA data_version")[0][0]
+
+    def _validar_cache(self):
+        """Vacía la caché si otro proceso ha confirmado cambios desde la última consulta"""
+        version = self.version_externa()
+        with self._cerrojo_cache:
+            if version != self._version_cache:
+                self._cache.clear()
+                self._version_cache = version
+
+    def _cachear(self, tarea: TareaBase):
+        with self._cerrojo_cache:
+            self._cache[tarea.id] = tarea
+            self._cache.move_to_end(tarea.id)
+            if len(self._cache) > self._tamano_cache:
+                self._cache.popitem(last=False)
+
+    def _descachear(self, id_tarea: int):
+        with self._cerrojo_cache:
+            self._cache.pop(id_tarea, None)
+
+    def obtener(self, id_tarea: int) -> Optional[TareaBase]:
+        self._validar_cache()
+        with self._cerrojo_cache:
+            tarea = self._cache.get(id_tarea)
+            if tarea is not None:
+                self._cache.move_to_end(id_tarea)
+                return tarea
+        filas = self._consultar(f"SELECT {', '.join(self.COLUMNAS)} FROM tareas WHERE id = ?", (id_tarea,))
+        if not filas:
+            return None
+        tarea = self._tarea(filas[0])
+        self._cachear(tarea)
+        return tarea
+
+    def insertar(self, tarea: TareaBase):
+        marcadores = ", ".join("?" for _ in self.COLUMNAS)
+        self._escribir(f"INSERT INTO tareas ({', '.join(self.COLUMNAS)}) VALUES ({marcadores})",
+                       self._fila(tarea))
+        self._cachear(tarea)
+
+    def actualizar(self, tarea: TareaBase, operacion: str = "actualizar"):
+        asignaciones = ", ".join(f"{columna} = ?" for columna in self.COLUMNAS[1:])
+        fila = self._fila(tarea)
+        try:
+            self._escribir(f"UPDATE tareas SET {asignaciones} WHERE id = ?", fila[1:] + (fila[0],))
+        except Exception:
+            # La tarea cacheada ya está modificada pero el cambio no se ha guardado
+            self._descachear(tarea.id)
+            raise
+        self._cachear(tarea)
+
+    def eliminar(self, id_tarea: int) -> bool:
+        self._descachear(id_tarea)
+        return self._escribir("DELETE FROM tareas WHERE id = ?", (id_tarea,)) > 0
+
+    @staticmethod
+    def _condiciones(estado: Optional[EstadoTarea], tipo: Optional[str],
+                     prioridad: Optional[PrioridadTarea]) -> Tuple[List[str], List[Any]]:
+        condiciones = []
+        parametros = []
+        for columna, valor in (("estado", estado), ("tipo", tipo), ("prioridad", prioridad)):
+            if valor is not None:
+                condiciones.append(f"{columna} = ?")
+                parametros.append(valor.value if hasattr(valor, "value") else valor)
+        return condiciones, parametros
+
+    def listar(self, estado: Optional[EstadoTarea] = None, tipo: Optional[str] = None,
+               prioridad: Optional[PrioridadTarea] = None, orden: str = "id",
+               limite: Optional[int] = None, despues_de: Optional[int] = None) -> List[TareaBase]:
+        if orden not in self.ORDEN_SQL:
+            raise ValueError(f"Orden no válido: {orden}")
+        expresiones = self.ORDEN_SQL[orden]
+        condiciones, parametros = self._condiciones(estado, tipo, prioridad)
+        
+        if despues_de is not None:
+            # Paginación por cursor: continuar tras la clave de ordenación de esa tarea
+            marcadores = ", ".join("?" for _ in expresiones)
+            condiciones.append(f"({', '.join(expresiones)}) > ({marcadores})")
+            parametros.extend(self._clave_cursor(expresiones, despues_de))
+        
+        sql = f"SELECT {', '.join(self.COLUMNAS)} FROM tareas"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        sql += f" ORDER BY {', '.join(expresiones)}"
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(limite)
+        return [self._tarea(fila) for fila in self._consultar(sql, tuple(parametros))]
+
+    def _clave_cursor(self, expresiones: tuple, id_tarea: int) -> tuple:
+        """
+        Clave de ordenación de la tarea del cursor; si la ha eliminado este u otro proceso
+        entre dos páginas, la que tenía (tareas_eliminadas). Por ID no hace falta buscarla
+        """
+        if expresiones == ("id",):
+            return (id_tarea,)
+        columnas = ", ".join(expresiones)
+        filas = self._consultar(
+            f"SELECT {columnas} FROM tareas WHERE id = ? "
+            f"UNION ALL SELECT {columnas} FROM tareas_eliminadas WHERE id = ? LIMIT 1",
+            (id_tarea, id_tarea)
+        )
+        if not filas:
+            raise ValueError(f"El cursor {id_tarea} no corresponde a ninguna tarea")
+        return filas[0]
+
+    def contar(self, estado: Optional[EstadoTarea] = None, tipo: Optional[str] = None,
+               prioridad: Optional[PrioridadTarea] = None) -> int:
+        condiciones, parametros = self._condiciones(estado, tipo, prioridad)
+        sql = "SELECT COUNT(*) FROM tareas"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        return self._consultar(sql, tuple(parametros))[0][0]
+
+    def conteos(self) -> Dict[str, Dict[Any, int]]:
+        # Cada GROUP BY se resuelve recorriendo solo el índice de la columna
+        resultado = {}
+        for columna, convertir in (("estado", EstadoTarea), ("tipo", str), ("prioridad", PrioridadTarea)):
+            filas = self._consultar(
+                f"SELECT {columna}, COUNT(*) FROM tareas WHERE {columna} IS NOT NULL GROUP BY {columna}"
+            )
+            resultado[columna] = {convertir(valor): cantidad for valor, cantidad in filas}
+        return resultado
+
+    def contar_vencidas(self, ahora: datetime) -> int:
+        return self._consultar(
+            "SELECT COUNT(*) FROM tareas WHERE fecha_limite < ? AND estado != ?",
+            (ahora.isoformat(), EstadoTarea.COMPLETADA.value)
+        )[0][0]
+
+    def listar_por_fecha_limite(self, hasta: datetime, desde: Optional[datetime] = None) -> List[TareaBase]:
+        filas = self._consultar(
+            f"SELECT {', '.join(self.COLUMNAS)} FROM tareas "
+            "WHERE fecha_limite >= ? AND fecha_limite < ? AND estado != ? ORDER BY fecha_limite, id",
+            (desde.isoformat() if desde else "", hasta.isoformat(), EstadoTarea.COMPLETADA.value)
+        )
+        # Las tareas que están en la caché se devuelven tal cual: al procesar los
+        # vencimientos se marca la misma instancia que luego se sirve
+        self._validar_cache()
+        with self._cerrojo_cache:
+            return [self._cache.get(fila[0]) or self._tarea(fila) for fila in filas]
+
+    def proximo_vencimiento(self, desde: Optional[datetime] = None) -> Optional[datetime]:
+        filas = self._consultar(
+            "SELECT fecha_limite FROM tareas WHERE fecha_limite >= ? AND estado != ? ORDER BY fecha_limite LIMIT 1",
+            (desde.isoformat() if desde else "", EstadoTarea.COMPLETADA.value)
+        )
+        return datetime.fromisoformat(filas[0][0]) if filas else None
+
+    def iterar(self, tamano_bloque: int = 1000) -> Iterator[TareaBase]:
+        """Recorre la tabla por bloques de IDs para no cargarla entera"""
+        ultimo_id = 0
+        while True:
+            filas = self._consultar(
+                f"SELECT {', '.join(self.COLUMNAS)} FROM tareas WHERE id > ? ORDER BY id LIMIT ?",
+                (ultimo_id, tamano_bloque)
+            )
+            if not filas:
+                return
+            for fila in filas:
+                yield self._tarea(fila)
+            ultimo_id = filas[-1][0]
+
+    def valores_analitica(self, tamano_bloque: int = 10000) -> Iterator[Tuple[int, tuple]]:
+        # Sin materializar las tareas: solo se convierten las columnas que hacen falta
+        estados = {estado.value: estado for estado in EstadoTarea}
+        prioridades = {prioridad.value: prioridad for prioridad in PrioridadTarea}
+
+        def epoca(fecha: Optional[str]) -> Optional[int]:
+            return a_epoca_us(datetime.fromisoformat(fecha)) if fecha else None
+
+        ultimo_id = 0
+        while True:
+            filas = self._consultar(
+                "SELECT id, tipo, estado, prioridad, fecha_creacion, fecha_completada, fecha_limite "
+                "FROM tareas WHERE id > ? ORDER BY id LIMIT ?", (ultimo_id, tamano_bloque)
+            )
+            if not filas:
+                return
+            for id_tarea, tipo, estado, prioridad, creacion, completada, limite in filas:
+                yield id_tarea, (tipo, estados[estado], prioridades.get(prioridad),
+                                 epoca(creacion), epoca(completada), epoca(limite))
+            ultimo_id = filas[-1][0]
+
+    def buscar(self, consulta: str, limite: int = 20) -> Tuple[List[TareaBase], int]:
+        if self._error_busqueda is not None:
+            raise RuntimeError(f"Búsqueda no disponible: {self._error_busqueda}")
+        palabras = tokenizar(consulta)
+        if not palabras:
+            return [], 0
+        # Mismas palabras que IndiceTexto; entre comillas no son operadores de FTS5
+        expresion = " ".join(f'"{palabra}"*' if len(palabra) >= MIN_PREFIJO else f'"{palabra}"'
+                             for palabra in palabras)
+        filas = self._consultar(
+            f"SELECT {', '.join('tareas.' + columna for columna in self.COLUMNAS)} "
+            "FROM tareas_fts JOIN tareas ON tareas.id = tareas_fts.rowid "
+            "WHERE tareas_fts MATCH ? ORDER BY bm25(tareas_fts, ?, ?), tareas.id LIMIT ?",
+            (expresion, *self.PESOS_BUSQUEDA, limite)
+        )
+        total = self._consultar("SELECT COUNT(*) FROM tareas_fts WHERE tareas_fts MATCH ?", (expresion,))[0][0]
+        return [self._tarea(fila) for fila in filas], total
+
+    def __len__(self) -> int:
+        return self._consultar("SELECT COUNT(*) FROM tareas")[0][0]
+
+    def confirmar(self) -> Future:
+        """
+        Con synchronous=NORMAL las transacciones no sincronizan el WAL, y un checkpoint no
+        lo hace si otro proceso aún lee sus páginas: lo confirmado podría perderse con un
+        corte de luz. Aquí se sincronizan (fsync) el WAL y la base de datos en un hilo aparte,
+        fuera del bucle de eventos; las confirmaciones que llegan antes de que empiece
+        comparten la misma sincronización
+        """
+        with self._condicion_sincronizar:
+            if self._sincronizacion is None:
+                self._sincronizacion = Future()
+                self._condicion_sincronizar.notify()
+            if self._hilo_sincronizar is None:
+                self._hilo_sincronizar = threading.Thread(target=self._bucle_sincronizar,
+                                                          name="sincronizar-sqlite", daemon=True)
+                self._hilo_sincronizar.start()
+            return self._sincronizacion
+
+    def _bucle_sincronizar(self):
+        """Hilo que hace las sincronizaciones pedidas por confirmar(), de una en una"""
+        while True:
+            with self._condicion_sincronizar:
+                while self._sincronizacion is None and self._conexion is not None:
+                    self._condicion_sincronizar.wait()
+                futuro, self._sincronizacion = self._sincronizacion, None
+            if futuro is None:
+                return
+            try:
+                # Todo lo confirmado está en el WAL o, tras un checkpoint, en la base de datos
+                for ruta in (f"{self._ruta}-wal", self._ruta):
+                    self._sincronizar_archivo(ruta)
+                if not self._directorio_sincronizado:
+                    # El WAL se crea con la primera escritura y no se borra mientras la conexión siga abierta
+                    _sincronizar_directorio(os.path.dirname(os.path.abspath(self._ruta)))
+                    self._directorio_sincronizado = True
+            except OSError as error:
+                futuro.set_exception(error)
+            else:
+                futuro.set_result(None)
+
+    @staticmethod
+    def _sincronizar_archivo(ruta: str):
+        try:
+            fd = os.open(ruta, os.O_RDWR)
+        except FileNotFoundError:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def metricas_persistencia(self) -> Dict[str, Any]:
+        return self._metricas.resumen()
+
+    def cerrar(self):
+        if self._conexion is not None:
+            self._conexion.close()
+        with self._condicion_sincronizar:
+            self._conexion = None
+            self._condicion_sincronizar.notify()
+        if self._hilo_sincronizar is not None:
+            self._hilo_sincronizar.join()
+            self._hilo_sincronizar = None
+
+
+def crear_almacen(tipo: str = "memoria", modo_persistencia: str = "json",
+                  ruta_sqlite: str = "tareas.db", bloque_ids: int = 1) -> AlmacenTareas:
+    """Factory de almacenes: "memoria" (por defecto) o "sqlite" """
+    if tipo == "sqlite":
+        return AlmacenSQLite(ruta_sqlite, bloque_ids=bloque_ids)
+    return AlmacenMemoria(crear_persistencia(modo_persistencia))
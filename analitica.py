@@ -0,0 +1,199 @@
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from models import EstadoTarea, PrioridadTarea, desde_epoca_us
+
+# NumPy es opcional: sin él todo funciona salvo GET /estadisticas/series
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+# Duración de cada intervalo de las series y ventana por defecto (hasta el intervalo actual)
+INTERVALOS = {"hora": timedelta(hours=1), "dia": timedelta(days=1)}
+VENTANA_POR_DEFECTO = {"hora": timedelta(days=1), "dia": timedelta(days=30)}
+MAXIMO_INTERVALOS = 2000
+
+# Límites (en horas) de los grupos de antigüedad de las tareas sin completar
+LIMITES_EDAD_HORAS = (1, 6, 24, 72, 168, 720)
+GRUPOS_EDAD = (f"<{LIMITES_EDAD_HORAS[0]}h",) + tuple(
+    f"{desde}h-{hasta}h" for desde, hasta in zip(LIMITES_EDAD_HORAS, LIMITES_EDAD_HORAS[1:])
+) + (f">={LIMITES_EDAD_HORAS[-1]}h",)
+
+_HORA_US = 3600 * 10 ** 6
+_SIN_FECHA = -(2 ** 63)
+# Estado de las posiciones sin tarea (IDs eliminados o aún no usados)
+_SIN_TAREA = -1
+
+# Códigos de las columnas (como en snapshot_binario.py)
+_TIPOS = ("TareaSimple", "TareaPrioritaria", "TareaConFecha")
+_CODIGO_TIPO = {tipo: codigo for codigo, tipo in enumerate(_TIPOS)}
+_CODIGO_ESTADO = {estado: codigo for codigo, estado in enumerate(EstadoTarea)}
+_COMPLETADA = _CODIGO_ESTADO[EstadoTarea.COMPLETADA]
+# El código 0 indica "sin prioridad"
+_PRIORIDADES = (None,) + tuple(PrioridadTarea)
+_CODIGO_PRIORIDAD = {prioridad: codigo for codigo, prioridad in enumerate(_PRIORIDADES)}
+_NOMBRES_PRIORIDAD = ("sin_prioridad",) + tuple(prioridad.value for prioridad in PrioridadTarea)
+
+
+def _microsegundos(duracion: timedelta) -> int:
+    return duracion // timedelta(microseconds=1)
+
+
+class VistaColumnar:
+    """
+    Copia en columnas (un array de NumPy por campo, indexado por ID) de los campos
+    que usan las series de estadísticas: tipo, estado, prioridad, creación, fecha
+    en que se completó y fecha límite. Las agregaciones son operaciones sobre
+    arrays (máscaras, conteos, bincount) en lugar de bucles sobre las tareas.
+    ENCAPSULACIÓN: GestorTareas la construye una vez y después la mantiene al día
+    con cada cambio (actualizar/quitar), con su cerrojo de escritura tomado.
+    Los IDs no se reutilizan y crecen de uno en uno, así que indexar por ID apenas
+    deja huecos; las posiciones de las tareas eliminadas quedan sin tarea.
+    Las tareas archivadas (completadas, ya no cambian) conservan su fila: las series
+    de creadas y completadas siguen contándolas.
+    """
+
+    def __init__(self, capacidad: int = 1024):
+        if np is None:
+            raise RuntimeError("Las series de estadísticas necesitan NumPy (pip install numpy)")
+        self._tipo = np.zeros(0, np.int8)
+        self._estado = np.full(0, _SIN_TAREA, np.int8)
+        self._prioridad = np.zeros(0, np.int8)
+        self._creacion = np.zeros(0, np.int64)
+        self._completada = np.full(0, _SIN_FECHA, np.int64)
+        self._limite = np.full(0, _SIN_FECHA, np.int64)
+        # Una posición más que el mayor ID guardado: las consultas no miran más allá
+        self._fin = 0
+        self._reservar(capacidad)
+
+    @classmethod
+    def construir(cls, filas: Iterable[Tuple[int, tuple]]) -> "VistaColumnar":
+        """Vista con las filas (id, tarea.valores_analitica()) dadas, asignando cada columna de una vez"""
+        columnas = ([], [], [], [], [], [], [])
+        for id_tarea, (tipo, estado, prioridad, creacion_us, completada_us, limite_us) in filas:
+            columnas[0].append(id_tarea)
+            columnas[1].append(_CODIGO_TIPO.get(tipo, 0))
+            columnas[2].append(_CODIGO_ESTADO[estado])
+            columnas[3].append(_CODIGO_PRIORIDAD[prioridad])
+            columnas[4].append(creacion_us)
+            columnas[5].append(_SIN_FECHA if completada_us is None else completada_us)
+            columnas[6].append(_SIN_FECHA if limite_us is None else limite_us)
+        vista = cls(max(columnas[0], default=0) + 1)
+        if columnas[0]:
+            ids = np.array(columnas[0], np.int64)
+            for array, valores in zip(vista._columnas(), columnas[1:]):
+                array[ids] = valores
+            vista._fin = int(ids.max()) + 1
+        return vista
+
+    def _columnas(self) -> tuple:
+        return self._tipo, self._estado, self._prioridad, self._creacion, self._completada, self._limite
+
+    def _reservar(self, capacidad: int):
+        """Amplía los arrays (al doble, como una lista) para que quepan capacidad posiciones"""
+        actual = len(self._estado)
+        if capacidad <= actual:
+            return
+        nueva = max(capacidad, 2 * actual)
+        self._tipo = np.concatenate((self._tipo, np.zeros(nueva - actual, np.int8)))
+        self._estado = np.concatenate((self._estado, np.full(nueva - actual, _SIN_TAREA, np.int8)))
+        self._prioridad = np.concatenate((self._prioridad, np.zeros(nueva - actual, np.int8)))
+        self._creacion = np.concatenate((self._creacion, np.zeros(nueva - actual, np.int64)))
+        self._completada = np.concatenate((self._completada, np.full(nueva - actual, _SIN_FECHA, np.int64)))
+        self._limite = np.concatenate((self._limite, np.full(nueva - actual, _SIN_FECHA, np.int64)))
+
+    def actualizar(self, id_tarea: int, valores: tuple):
+        """Guarda (o sobrescribe) la fila de una tarea a partir de tarea.valores_analitica()"""
+        tipo, estado, prioridad, creacion_us, completada_us, limite_us = valores
+        self._reservar(id_tarea + 1)
+        self._tipo[id_tarea] = _CODIGO_TIPO.get(tipo, 0)
+        self._estado[id_tarea] = _CODIGO_ESTADO[estado]
+        self._prioridad[id_tarea] = _CODIGO_PRIORIDAD[prioridad]
+        self._creacion[id_tarea] = creacion_us
+        self._completada[id_tarea] = _SIN_FECHA if completada_us is None else completada_us
+        self._limite[id_tarea] = _SIN_FECHA if limite_us is None else limite_us
+        self._fin = max(self._fin, id_tarea + 1)
+
+    def quitar(self, id_tarea: int):
+        if id_tarea < self._fin:
+            self._estado[id_tarea] = _SIN_TAREA
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._estado[:self._fin] != _SIN_TAREA))
+
+    @staticmethod
+    def _por_intervalo(fechas, mascara, inicio_us: int, paso_us: int, intervalos: int) -> list:
+        """Cuántas de las fechas marcadas en mascara caen en cada intervalo [inicio + i*paso, inicio + (i+1)*paso)"""
+        # Se filtra sobre las columnas completas: solo se copian las fechas de la ventana
+        # (las que no tienen fecha quedan fuera, y no llegan a la resta)
+        fechas = fechas[mascara & (fechas >= inicio_us) & (fechas < inicio_us + intervalos * paso_us)]
+        return np.bincount((fechas - inicio_us) // paso_us, minlength=intervalos).tolist()
+
+    def series(self, intervalo: str, desde_us: Optional[int], hasta_us: Optional[int], ahora_us: int,
+               vencimiento_us: int, tipo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        - series: tareas creadas y completadas en cada intervalo ("hora" o "dia", en hora
+          local) entre desde y hasta; por defecto, la ventana que termina con el intervalo actual
+        - edad_pendientes: antigüedad en ahora de las tareas sin completar, por grupos
+        - vencidas_por_prioridad: de las tareas sin completar con fecha límite, cuántas
+          han pasado de vencimiento_us, por prioridad
+        Con tipo (nombre de la clase) solo se cuentan las tareas de ese tipo.
+        """
+        if intervalo not in INTERVALOS:
+            raise ValueError(f"Intervalo no válido: {intervalo}")
+        paso_us = _microsegundos(INTERVALOS[intervalo])
+        if hasta_us is None:
+            hasta_us = ahora_us - ahora_us % paso_us + paso_us
+        if desde_us is None:
+            desde_us = hasta_us - _microsegundos(VENTANA_POR_DEFECTO[intervalo])
+        if desde_us >= hasta_us:
+            raise ValueError("desde debe ser anterior a hasta")
+        # Los intervalos empiezan en horas o días completos
+        inicio_us = desde_us - desde_us % paso_us
+        intervalos = -(-(hasta_us - inicio_us) // paso_us)
+        if intervalos > MAXIMO_INTERVALOS:
+            raise ValueError(f"Demasiados intervalos ({intervalos}); el máximo es {MAXIMO_INTERVALOS}")
+
+        tipos, estados, prioridades, creacion, completada, limite = (
+            columna[:self._fin] for columna in self._columnas()
+        )
+        existe = estados != _SIN_TAREA
+        if tipo is not None:
+            existe &= tipos == _CODIGO_TIPO.get(tipo, _SIN_TAREA)
+        completadas = existe & (estados == _COMPLETADA)
+        abiertas = existe & (estados != _COMPLETADA)
+
+        creadas_por_intervalo = self._por_intervalo(creacion, existe, inicio_us, paso_us, intervalos)
+        completadas_por_intervalo = self._por_intervalo(completada, completadas, inicio_us, paso_us, intervalos)
+
+        # Antigüedad: cuántas tareas sin completar son más recientes que cada límite
+        # (las creadas después de ahora, que se redondea al minuto, cuentan como recientes)
+        total_abiertas = int(np.count_nonzero(abiertas))
+        recientes = [int(np.count_nonzero(abiertas & (creacion > ahora_us - horas * _HORA_US)))
+                     for horas in LIMITES_EDAD_HORAS]
+        grupos = np.diff([0] + recientes + [total_abiertas]).tolist()
+
+        con_fecha = abiertas & (limite != _SIN_FECHA)
+        vencidas = con_fecha & (limite < vencimiento_us)
+        por_prioridad = np.bincount(prioridades[con_fecha], minlength=len(_PRIORIDADES)).tolist()
+        vencidas_por_prioridad = np.bincount(prioridades[vencidas], minlength=len(_PRIORIDADES)).tolist()
+
+        return {
+            "intervalo": intervalo,
+            "desde": desde_epoca_us(inicio_us),
+            "hasta": desde_epoca_us(inicio_us + intervalos * paso_us),
+            "ahora": desde_epoca_us(ahora_us),
+            "series": [
+                {"inicio": desde_epoca_us(inicio_us + i * paso_us), "creadas": creadas, "completadas": cerradas}
+                for i, (creadas, cerradas) in enumerate(zip(creadas_por_intervalo, completadas_por_intervalo))
+            ],
+            "edad_pendientes": {
+                "total": total_abiertas,
+                "grupos": dict(zip(GRUPOS_EDAD, grupos)),
+            },
+            "vencidas_por_prioridad": {
+                nombre: {"con_fecha": total, "vencidas": cuantas, "tasa": cuantas / total if total else 0.0}
+                for nombre, total, cuantas in zip(_NOMBRES_PRIORIDAD, por_prioridad, vencidas_por_prioridad)
+            },
+        }
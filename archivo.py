@@ -0,0 +1,294 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from models import TareaBase, tarea_desde_dict
+from persistencia import _sincronizar_directorio
+from serializacion import a_json
+
+# Registros del índice: un bloque (segmento, posición, longitud y cuántos IDs le siguen)
+# o una tarea que sale del archivo (restaurada o eliminada)
+_BLOQUE = struct.Struct("<cIQII")
+_ID = struct.Struct("<q")
+_TIPO_BLOQUE = b"B"
+_TIPO_QUITAR = b"Q"
+
+
+class ArchivoTareas:
+    """
+    Almacén frío de las tareas completadas hace tiempo, fuera del almacén principal.
+    Las tareas se guardan en segmentos de solo añadir (segmento-000001.dat, ...):
+    bloques de hasta tareas_por_bloque tareas (to_dict en NDJSON) comprimidos con zlib.
+    Un índice de solo añadir (indice.dat) dice en qué bloque está cada ID.
+    ENCAPSULACIÓN: En memoria el índice son dos arrays ordenados por ID (12 bytes por tarea,
+    sin objetos de Python): uno grande y otro con lo archivado desde la última mezcla,
+    que se mezcla con el grande cuando crece. Leer una tarea descomprime solo su bloque;
+    los últimos bloques leídos se quedan en una caché LRU.
+    Las tareas archivadas no cambian: para modificarlas el gestor las restaura.
+    """
+
+    def __init__(self, directorio: str = "archivo", tareas_por_bloque: int = 128,
+                 tamano_segmento: int = 64 * 1024 * 1024, bloques_en_cache: int = 64):
+        self._directorio = directorio
+        self._tareas_por_bloque = tareas_por_bloque
+        self._tamano_segmento = tamano_segmento
+        self._bloques_en_cache = bloques_en_cache
+        # (segmento, posición, longitud) de cada bloque; los IDs apuntan a su posición en esta lista
+        self._bloques: List[Tuple[int, int, int]] = []
+        # Índice: IDs ordenados y el bloque de cada uno, en dos niveles
+        self._ids, self._bloque_de = array("q"), array("l")
+        self._ids_recientes, self._bloque_de_recientes = array("q"), array("l")
+        # IDs que han salido del archivo y aún aparecen en los arrays
+        self._quitados: Set[int] = set()
+        self._cantidad = 0
+        self.ultimo_id = 0
+        self._segmento = 0
+        self._tamano_actual = 0
+        self._lectores: Dict[int, int] = {}
+        self._cache: "OrderedDict[int, Dict[int, dict]]" = OrderedDict()
+        self._cerrojo = threading.Lock()
+        self._cargar()
+
+    def _ruta(self, nombre: str) -> str:
+        return os.path.join(self._directorio, nombre)
+
+    def _ruta_segmento(self, segmento: int) -> str:
+        return self._ruta(f"segmento-{segmento:06d}.dat")
+
+    def _cargar(self):
+        """Reconstruye el índice en memoria leyendo indice.dat (sin tocar los segmentos)"""
+        ruta = self._ruta("indice.dat")
+        if not os.path.exists(ruta):
+            return
+        with open(ruta, "rb") as archivo:
+            contenido = archivo.read()
+        posicion = 0
+        entradas: Dict[int, int] = {}
+        while posicion + 1 <= len(contenido):
+            tipo = contenido[posicion:posicion + 1]
+            if tipo == _TIPO_BLOQUE and posicion + _BLOQUE.size <= len(contenido):
+                _, segmento, inicio, longitud, cantidad = _BLOQUE.unpack_from(contenido, posicion)
+                fin = posicion + _BLOQUE.size + cantidad * _ID.size
+                if fin > len(contenido):
+                    break
+                bloque = len(self._bloques)
+                self._bloques.append((segmento, inicio, longitud))
+                for (id_tarea,) in _ID.iter_unpack(contenido[posicion + _BLOQUE.size:fin]):
+                    entradas[id_tarea] = bloque
+                    self.ultimo_id = max(self.ultimo_id, id_tarea)
+                self._segmento = max(self._segmento, segmento)
+                posicion = fin
+            elif tipo == _TIPO_QUITAR and posicion + 1 + _ID.size <= len(contenido):
+                entradas.pop(_ID.unpack_from(contenido, posicion + 1)[0], None)
+                posicion += 1 + _ID.size
+            else:
+                break
+        if posicion < len(contenido):
+            # Registro a medias de una caída: se descarta
+            with open(ruta, "r+b") as archivo:
+                archivo.truncate(posicion)
+        for id_tarea in sorted(entradas):
+            self._ids.append(id_tarea)
+            self._bloque_de.append(entradas[id_tarea])
+        self._cantidad = len(self._ids)
+        if self._segmento:
+            self._tamano_actual = os.path.getsize(self._ruta_segmento(self._segmento))
+
+    def __len__(self) -> int:
+        return self._cantidad
+
+    def _buscar(self, id_tarea: int) -> Optional[int]:
+        """Bloque donde está archivada la tarea (None si no lo está)"""
+        if id_tarea in self._quitados:
+            return None
+        for ids, bloques in ((self._ids_recientes, self._bloque_de_recientes), (self._ids, self._bloque_de)):
+            posicion = bisect_left(ids, id_tarea)
+            if posicion < len(ids) and ids[posicion] == id_tarea:
+                return bloques[posicion]
+        return None
+
+    def contiene(self, id_tarea: int) -> bool:
+        return self._buscar(id_tarea) is not None
+
+    def bloque_de(self, id_tarea: int) -> Optional[int]:
+        """Número del bloque de una tarea archivada: identifica la versión archivada"""
+        return self._buscar(id_tarea)
+
+    def obtener(self, id_tarea: int) -> Optional[TareaBase]:
+        bloque = self._buscar(id_tarea)
+        if bloque is None:
+            return None
+        return tarea_desde_dict(self._leer_bloque(bloque)[id_tarea])
+
+    def listar(self, limite: int, despues_de: Optional[int] = None) -> List[TareaBase]:
+        """Hasta limite tareas archivadas por orden de ID, a partir de la siguiente a despues_de"""
+        ids = self._siguientes_ids(limite, despues_de if despues_de is not None else 0)
+        return [tarea_desde_dict(self._leer_bloque(bloque)[id_tarea]) for id_tarea, bloque in ids]
+
+    def _siguientes_ids(self, limite: int, despues_de: int) -> List[Tuple[int, int]]:
+        """(id, bloque) de los limite siguientes IDs, mezclando los dos niveles del índice"""
+        a = bisect_right(self._ids, despues_de)
+        b = bisect_right(self._ids_recientes, despues_de)
+        resultado = []
+        while len(resultado) < limite and (a < len(self._ids) or b < len(self._ids_recientes)):
+            id_a = self._ids[a] if a < len(self._ids) else None
+            id_b = self._ids_recientes[b] if b < len(self._ids_recientes) else None
+            # A igual ID manda el nivel reciente (la tarea se archivó otra vez)
+            if id_b is not None and (id_a is None or id_b <= id_a):
+                candidato = (id_b, self._bloque_de_recientes[b])
+                b += 1
+                if id_a == id_b:
+                    a += 1
+            else:
+                candidato = (id_a, self._bloque_de[a])
+                a += 1
+            if candidato[0] not in self._quitados:
+                resultado.append(candidato)
+        return resultado
+
+    def _leer_bloque(self, bloque: int) -> Dict[int, dict]:
+        """Tareas (diccionarios de to_dict) de un bloque, desde la caché o del segmento"""
+        with self._cerrojo:
+            tareas = self._cache.get(bloque)
+            if tareas is not None:
+                self._cache.move_to_end(bloque)
+                return tareas
+            tareas = self._cache[bloque] = self._descomprimir(bloque)
+            while len(self._cache) > self._bloques_en_cache:
+                self._cache.popitem(last=False)
+            return tareas
+
+    def _descomprimir(self, bloque: int) -> Dict[int, dict]:
+        """Lee y descomprime un bloque del segmento (con el cerrojo tomado)"""
+        segmento, inicio, longitud = self._bloques[bloque]
+        fd = self._lectores.get(segmento)
+        if fd is None:
+            fd = self._lectores[segmento] = os.open(self._ruta_segmento(segmento), os.O_RDONLY)
+        lineas = zlib.decompress(os.pread(fd, longitud, inicio)).split(b"\n")
+        return {datos["id"]: datos for datos in map(json.loads, lineas)}
+
+    def valores_analitica(self) -> Iterator[Tuple[int, tuple]]:
+        """
+        (id, tarea.valores_analitica()) de todas las tareas archivadas, para construir la
+        vista de analitica.py: cada bloque se descomprime una vez, sin pasar por la caché
+        """
+        por_bloque: Dict[int, List[int]] = {}
+        for id_tarea, bloque in self._siguientes_ids(len(self), 0):
+            por_bloque.setdefault(bloque, []).append(id_tarea)
+        for bloque in sorted(por_bloque):
+            with self._cerrojo:
+                tareas = self._descomprimir(bloque)
+            for id_tarea in por_bloque[bloque]:
+                yield id_tarea, tarea_desde_dict(tareas[id_tarea]).valores_analitica()
+
+    def archivar(self, tareas: Iterable[TareaBase]):
+        """
+        Añade las tareas al archivo: primero los bloques al segmento y después el índice,
+        cada uno con fsync. Tras una caída entre los dos, los bloques sin índice se ignoran.
+        """
+        tareas = sorted(tareas, key=lambda tarea: tarea.id)
+        if not tareas:
+            return
+        os.makedirs(self._directorio, exist_ok=True)
+        if self._segmento == 0 or self._tamano_actual >= self._tamano_segmento:
+            self._segmento += 1
+            self._tamano_actual = 0
+        registros, nuevos = [], []
+        with open(self._ruta_segmento(self._segmento), "ab") as segmento:
+            inicio = segmento.seek(0, os.SEEK_END)
+            for desde in range(0, len(tareas), self._tareas_por_bloque):
+                grupo = tareas[desde:desde + self._tareas_por_bloque]
+                cuerpo = zlib.compress(b"\n".join(a_json(tarea.to_dict()) for tarea in grupo), 6)
+                segmento.write(cuerpo)
+                bloque = len(self._bloques) + len(registros)
+                registros.append((_BLOQUE.pack(_TIPO_BLOQUE, self._segmento, inicio, len(cuerpo), len(grupo))
+                                  + b"".join(_ID.pack(tarea.id) for tarea in grupo), (self._segmento, inicio, len(cuerpo))))
+                nuevos.extend((tarea.id, bloque) for tarea in grupo)
+                inicio += len(cuerpo)
+            segmento.flush()
+            os.fsync(segmento.fileno())
+        self._tamano_actual = inicio
+        self._anadir_indice(b"".join(registro for registro, _ in registros))
+        self._bloques.extend(ubicacion for _, ubicacion in registros)
+
+        for id_tarea, _ in nuevos:
+            if self._buscar(id_tarea) is None:
+                self._cantidad += 1
+            self._quitados.discard(id_tarea)
+        self._ids_recientes, self._bloque_de_recientes = self._mezclar(
+            self._ids_recientes, self._bloque_de_recientes, nuevos
+        )
+        self.ultimo_id = max(self.ultimo_id, tareas[-1].id)
+        # El nivel reciente se mezcla con el grande cuando llega a una cuarta parte:
+        # cada ID se mueve un número acotado de veces
+        if len(self._ids_recientes) > len(self._ids) // 4 + self._tareas_por_bloque:
+            self._ids, self._bloque_de = self._mezclar(
+                self._ids, self._bloque_de, zip(self._ids_recientes, self._bloque_de_recientes)
+            )
+            self._ids_recientes, self._bloque_de_recientes = array("q"), array("l")
+            # Los quitados ya no están en ningún array
+            self._quitados = {id_tarea for id_tarea in self._quitados if self._esta_en_arrays(id_tarea)}
+
+    def _esta_en_arrays(self, id_tarea: int) -> bool:
+        posicion = bisect_left(self._ids, id_tarea)
+        return posicion < len(self._ids) and self._ids[posicion] == id_tarea
+
+    def _mezclar(self, ids: array, bloques: array, nuevos: Iterable[Tuple[int, int]]) -> Tuple[array, array]:
+        """
+        Mezcla (id, bloque) ordenados con los arrays ordenados: a igual ID manda el nuevo;
+        los IDs quitados del archivo se descartan
+        """
+        ids_mezcla, bloques_mezcla = array("q"), array("l")
+        posicion = 0
+        for id_tarea, bloque in nuevos:
+            if id_tarea in self._quitados:
+                continue
+            hasta = bisect_left(ids, id_tarea, posicion)
+            for indice in range(posicion, hasta):
+                if ids[indice] not in self._quitados:
+                    ids_mezcla.append(ids[indice])
+                    bloques_mezcla.append(bloques[indice])
+            posicion = hasta + 1 if hasta < len(ids) and ids[hasta] == id_tarea else hasta
+            ids_mezcla.append(id_tarea)
+            bloques_mezcla.append(bloque)
+        for indice in range(posicion, len(ids)):
+            if ids[indice] not in self._quitados:
+                ids_mezcla.append(ids[indice])
+                bloques_mezcla.append(bloques[indice])
+        return ids_mezcla, bloques_mezcla
+
+    def quitar(self, id_tarea: int) -> bool:
+        """Saca una tarea del archivo (se ha restaurado o eliminado); sus bytes quedan en el segmento"""
+        if self._buscar(id_tarea) is None:
+            return False
+        self._anadir_indice(_TIPO_QUITAR + _ID.pack(id_tarea))
+        self._quitados.add(id_tarea)
+        self._cantidad -= 1
+        return True
+
+    def _anadir_indice(self, registros: bytes):
+        ruta = self._ruta("indice.dat")
+        nuevo = not os.path.exists(ruta)
+        with open(ruta, "ab") as indice:
+            indice.write(registros)
+            indice.flush()
+            os.fsync(indice.fileno())
+        if nuevo:
+            _sincronizar_directorio(self._directorio)
+
+    def tamano_disco(self) -> int:
+        """Bytes que ocupan los segmentos"""
+        return sum(os.path.getsize(self._ruta_segmento(segmento)) for segmento in range(1, self._segmento + 1)
+                   if os.path.exists(self._ruta_segmento(segmento)))
+
+    def cerrar(self):
+        with self._cerrojo:
+            for fd in self._lectores.values():
+                os.close(fd)
+            self._lectores = {}
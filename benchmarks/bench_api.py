@@ -0,0 +1,233 @@
+"""
+Macro-benchmark de la API con una mezcla de peticiones (ESCENARIO).
+
+- asgi: ejecuta la aplicación en este proceso con un cliente ASGI (httpx),
+  sin red ni servidor: mide el coste de FastAPI, el gestor y la serialización.
+- http: arranca uvicorn y lanza varios procesos cliente con conexiones
+  persistentes (al estilo de wrk); la memoria pico es la del servidor.
+Antes de medir crea --tareas tareas con POST /tareas/bulk y hace unas
+peticiones de calentamiento. Imprime p50/p99 y peticiones por segundo de
+cada tipo de petición y del total, y con --salida los guarda en JSON
+(comparables con benchmarks/comparar.py).
+El mismo escenario se puede lanzar con locust (benchmarks/locustfile.py).
+
+Uso:
+    python benchmarks/bench_api.py asgi --tareas 10000 --peticiones 5000 --concurrencia 16
+    python benchmarks/bench_api.py http --tareas 10000 --peticiones 20000 --clientes 8 --salida api.json
+    python benchmarks/bench_api.py http --almacen sqlite --workers 4
+"""
+import argparse
+import asyncio
+import contextlib
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from medicion import resumir, imprimir, guardar, rss_pico_kb
+
+# Mezcla de peticiones: (nombre, peso, método, ruta, cuerpo).
+# {id} se sustituye por una de las tareas creadas antes de medir, al azar
+ESCENARIO = (
+    ("listar", 30, "GET", "/tareas?limit=50", None),
+    ("listar_pendientes", 15, "GET", "/tareas?estado=pendiente&limit=50", None),
+    ("obtener", 25, "GET", "/tareas/{id}", None),
+    ("estadisticas", 8, "GET", "/estadisticas", None),
+    ("vencidas", 4, "GET", "/tareas/vencidas/listar", None),
+    ("crear", 10, "POST", "/tareas", {"tipo": "prioritaria", "titulo": "Tarea de la prueba de carga",
+                                      "prioridad": "alta"}),
+    ("actualizar", 5, "PUT", "/tareas/{id}", {"descripcion": "Actualizada en la prueba de carga"}),
+    ("completar", 3, "PATCH", "/tareas/{id}/completar", None),
+)
+
+CABECERAS_JSON = {"Content-Type": "application/json"}
+
+
+def secuencia(peticiones: int, tareas: int, semilla: int) -> list:
+    """Peticiones (nombre, método, ruta, cuerpo) en un orden reproducible"""
+    aleatorio = random.Random(semilla)
+    elegidas = aleatorio.choices(ESCENARIO, weights=[peso for _, peso, *_ in ESCENARIO], k=peticiones)
+    return [(nombre, metodo, ruta.format(id=aleatorio.randint(1, tareas)),
+             json.dumps(cuerpo).encode() if cuerpo is not None else None)
+            for nombre, _, metodo, ruta, cuerpo in elegidas]
+
+
+def lotes_iniciales(tareas: int, tamano_lote: int = 1000) -> list:
+    """Cuerpos de POST /tareas/bulk: tipos y prioridades mezclados, la mitad de las fechas ya vencidas"""
+    ahora = datetime.now()
+    tipos = ("simple", "prioritaria", "con_fecha")
+    lotes = []
+    for desde in range(0, tareas, tamano_lote):
+        lote = []
+        for i in range(desde, min(desde + tamano_lote, tareas)):
+            tarea = {"tipo": tipos[i % 3], "titulo": f"Tarea {i}", "descripcion": f"Descripción de la tarea {i}"}
+            if tarea["tipo"] == "prioritaria":
+                tarea["prioridad"] = ("alta", "media", "baja")[i % 3]
+            elif tarea["tipo"] == "con_fecha":
+                tarea["fecha_limite"] = (ahora + timedelta(hours=(i % 200) - 100)).isoformat()
+            lote.append(tarea)
+        lotes.append(json.dumps(lote).encode())
+    return lotes
+
+
+def resumir_peticiones(registros: list, duracion: float, rss_kb: int, **etiquetas) -> list:
+    """Resultados por tipo de petición y del total a partir de (nombre, segundos, estado HTTP)"""
+    por_nombre = defaultdict(list)
+    errores = defaultdict(int)
+    for nombre, segundos, estado in registros:
+        por_nombre[nombre].append(segundos)
+        if estado >= 400:
+            errores[nombre] += 1
+    resultados = []
+    for nombre in [nombre for nombre, *_ in ESCENARIO if nombre in por_nombre] + ["total"]:
+        tiempos = [segundos for _, segundos, _ in registros] if nombre == "total" else por_nombre[nombre]
+        resultado = resumir(nombre, tiempos, duracion, **etiquetas)
+        resultado["rss_pico_kb"] = rss_kb
+        resultado["errores"] = sum(errores.values()) if nombre == "total" else errores[nombre]
+        resultados.append(resultado)
+    return resultados
+
+
+async def probar_asgi(args, directorio: str) -> list:
+    import httpx
+
+    os.environ.update(TAREAS_ALMACEN=args.almacen, TAREAS_PERSISTENCIA="journal",
+                      TAREAS_SQLITE_RUTA=os.path.join(directorio, "tareas.db"))
+    os.chdir(directorio)
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transporte = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            for lote in lotes_iniciales(args.tareas):
+                respuesta = await cliente.post("/tareas/bulk", content=lote, headers=CABECERAS_JSON)
+                respuesta.raise_for_status()
+
+            peticiones = secuencia(args.calentamiento + args.peticiones, args.tareas, args.semilla)
+            registros = []
+
+            async def trabajador(pendientes, registrar: bool):
+                # Todos los trabajadores sacan peticiones del mismo iterador
+                for nombre, metodo, ruta, cuerpo in pendientes:
+                    inicio = time.perf_counter()
+                    respuesta = await cliente.request(metodo, ruta, content=cuerpo,
+                                                      headers=CABECERAS_JSON if cuerpo else None)
+                    if registrar:
+                        registros.append((nombre, time.perf_counter() - inicio, respuesta.status_code))
+
+            calentamiento = iter(peticiones[:args.calentamiento])
+            await asyncio.gather(*(trabajador(calentamiento, False) for _ in range(args.concurrencia)))
+            pendientes = iter(peticiones[args.calentamiento:])
+            inicio = time.perf_counter()
+            await asyncio.gather(*(trabajador(pendientes, True) for _ in range(args.concurrencia)))
+            duracion = time.perf_counter() - inicio
+
+    return resumir_peticiones(registros, duracion, rss_pico_kb(), modo="asgi", almacen=args.almacen,
+                              tareas=args.tareas, concurrencia=args.concurrencia)
+
+
+def cliente_http(puerto: int, peticiones: list) -> tuple:
+    """Proceso cliente: lanza sus peticiones por una conexión persistente"""
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto)
+    registros = []
+    inicio = time.time()
+    for nombre, metodo, ruta, cuerpo in peticiones:
+        antes = time.perf_counter()
+        conexion.request(metodo, ruta, body=cuerpo, headers=CABECERAS_JSON if cuerpo else {})
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        registros.append((nombre, time.perf_counter() - antes, respuesta.status))
+    conexion.close()
+    return inicio, time.time(), registros
+
+
+def probar_http(args, directorio: str) -> list:
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", RAIZ, "--port", str(args.puerto),
+         "--workers", str(args.workers), "--log-level", "warning", "--timeout-graceful-shutdown", "1"],
+        # Los archivos de persistencia se crean en el directorio temporal
+        cwd=directorio, env=dict(os.environ, TAREAS_ALMACEN=args.almacen, TAREAS_PERSISTENCIA="journal",
+                           TAREAS_SQLITE_RUTA=os.path.join(directorio, "tareas.db")),
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        for _ in range(100):
+            try:
+                conexion = http.client.HTTPConnection("127.0.0.1", args.puerto)
+                conexion.request("GET", "/salud")
+                conexion.getresponse().read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        for lote in lotes_iniciales(args.tareas):
+            conexion.request("POST", "/tareas/bulk", body=lote, headers=CABECERAS_JSON)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            if respuesta.status != 200:
+                raise RuntimeError(f"No se pudieron crear las tareas iniciales: HTTP {respuesta.status}")
+        conexion.close()
+
+        peticiones = secuencia(args.calentamiento + args.peticiones, args.tareas, args.semilla)
+        cliente_http(args.puerto, peticiones[:args.calentamiento])
+        medidas = peticiones[args.calentamiento:]
+        with ProcessPoolExecutor(max_workers=args.clientes) as clientes:
+            partes = list(clientes.map(cliente_http, [args.puerto] * args.clientes,
+                                       [medidas[i::args.clientes] for i in range(args.clientes)]))
+        duracion = max(fin for _, fin, _ in partes) - min(inicio for inicio, _, _ in partes)
+        registros = [registro for _, _, parte in partes for registro in parte]
+        # Memoria pico del servidor (con varios workers, de todos sus procesos)
+        pids = [proceso.pid] + [int(pid) for pid in subprocess.run(
+            ["pgrep", "-P", str(proceso.pid)], capture_output=True, text=True).stdout.split()]
+        rss_kb = sum(rss_pico_kb(pid) for pid in pids)
+    finally:
+        proceso.terminate()
+        proceso.wait()
+    return resumir_peticiones(registros, duracion, rss_kb, modo="http", almacen=args.almacen,
+                              tareas=args.tareas, clientes=args.clientes, workers=args.workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modo", choices=("asgi", "http"))
+    parser.add_argument("--almacen", choices=("memoria", "sqlite"), default="memoria")
+    parser.add_argument("--tareas", type=int, default=10000, help="Tareas creadas antes de medir")
+    parser.add_argument("--peticiones", type=int, default=5000)
+    parser.add_argument("--calentamiento", type=int, default=200, help="Peticiones previas que no se miden")
+    parser.add_argument("--concurrencia", type=int, default=16, help="Peticiones a la vez (asgi)")
+    parser.add_argument("--clientes", type=int, default=8, help="Procesos cliente (http)")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn (http; varios: --almacen sqlite)")
+    parser.add_argument("--puerto", type=int, default=8767)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="Archivo JSON de resultados (- para la salida estándar)")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="bench_api_")
+    try:
+        if args.modo == "asgi":
+            # Los modelos escriben mensajes (p. ej. al completar una tarea prioritaria)
+            with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+                resultados = asyncio.run(probar_asgi(args, directorio))
+        else:
+            resultados = probar_http(args, directorio)
+    finally:
+        os.chdir(RAIZ)
+        shutil.rmtree(directorio)
+    print(f"{args.modo}, {args.almacen}, {args.tareas} tareas, {args.peticiones} peticiones")
+    imprimir(resultados)
+    guardar(args.salida, "api", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
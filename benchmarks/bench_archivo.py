@@ -0,0 +1,125 @@
+"""
+Benchmark del archivo de tareas completadas (archivo.py).
+
+Crea --tareas tareas de las que --completadas (fracción) están completadas hace
+más de 30 días y mide, antes y después de archivarlas:
+- listar (GET /tareas, primera página y lista completa), estadísticas y vencidas,
+- guardar todo: reescribir el estado completo (persistencia json/journal),
+y además cuánto cuesta archivar, leer una tarea archivada (obtener) y listar
+páginas de GET /tareas/archivadas.
+
+Uso:
+    python benchmarks/bench_archivo.py --tareas 200000 --completadas 0.9
+    python benchmarks/bench_archivo.py --tareas 200000 --persistencia json --salida archivo.json
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gestor import GestorTareas
+from almacenamiento import crear_almacen
+from archivo import ArchivoTareas
+from models import a_epoca_us
+from medicion import medir, resumir, imprimir, guardar
+
+
+def medir_almacen(gestor: GestorTareas, fase: str, repeticiones: int, etiquetas: dict) -> list:
+    """Operaciones que recorren el almacén principal"""
+    operaciones = (
+        ("listar (pagina)", lambda i: gestor.listar_tareas(limite=50)),
+        ("listar (todo)", lambda i: gestor.listar_tareas()),
+        ("estadisticas", lambda i: gestor.obtener_estadisticas()),
+        ("vencidas", lambda i: gestor.obtener_tareas_vencidas()),
+        ("guardar todo", lambda i: (gestor.guardar_tareas(), gestor.confirmar_persistencia().result())),
+    )
+    return [resumir(f"{nombre} {fase}", medir(operacion, repeticiones), **etiquetas)
+            for nombre, operacion in operaciones]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tareas", type=int, default=200000)
+    parser.add_argument("--completadas", type=float, default=0.9, help="Fracción de tareas completadas hace tiempo")
+    parser.add_argument("--persistencia", choices=("json", "journal"), default="journal")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="Archivo JSON de resultados (- para la salida estándar)")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="bench_archivo_")
+    os.chdir(directorio)
+    etiquetas = {"tareas": args.tareas, "persistencia": args.persistencia}
+    resultados = []
+    try:
+        gestor = GestorTareas(almacen=crear_almacen("memoria", modo_persistencia=args.persistencia),
+                              archivo=ArchivoTareas(os.path.join(directorio, "archivo")))
+        ahora = datetime.now()
+        for desde in range(0, args.tareas, 10000):
+            gestor.crear_tareas([
+                {"tipo": ("simple", "prioritaria", "con_fecha")[i % 3], "titulo": f"Tarea {i}",
+                 "descripcion": "Descripción de la tarea " * 3,
+                 **({"fecha_limite": ahora + timedelta(days=i % 60 - 30)} if i % 3 == 2 else {})}
+                for i in range(desde, min(desde + 10000, args.tareas))
+            ])
+        aleatorio = random.Random(args.semilla)
+        antiguas = aleatorio.sample(range(1, args.tareas + 1), int(args.tareas * args.completadas))
+        hace_tiempo = a_epoca_us(ahora - timedelta(days=40))
+        # Se completan con el reloj de las tareas atrasado 40 días
+        with gestor.escritura(), mock.patch("models.ahora_us", lambda: hace_tiempo), \
+                contextlib.redirect_stdout(io.StringIO()):
+            for id_tarea in antiguas:
+                gestor.marcar_completada(id_tarea)
+        gestor.confirmar_persistencia().result()
+
+        resultados += medir_almacen(gestor, "antes", args.repeticiones, etiquetas)
+
+        tiempos, inicio = [], time.perf_counter()
+        while True:
+            instante = time.perf_counter()
+            archivadas = gestor.archivar_completadas(timedelta(days=30))
+            tiempos.append(time.perf_counter() - instante)
+            if archivadas < 1000:
+                break
+        resultados.append(resumir("archivar (lote de 1000)", tiempos, time.perf_counter() - inicio, **etiquetas))
+        gestor.confirmar_persistencia().result()
+
+        resultados += medir_almacen(gestor, "despues", args.repeticiones, etiquetas)
+
+        # Lecturas de tareas archivadas repartidas por todo el archivo (sin caché de bloques la mayoría)
+        consultadas = aleatorio.sample(antiguas, min(2000, len(antiguas)))
+        resultados.append(resumir("obtener archivada", medir(
+            lambda i: gestor.obtener_tarea(consultadas[i]), len(consultadas)
+        ), **etiquetas))
+        cursores = [None] + sorted(aleatorio.sample(antiguas, min(200, len(antiguas))))
+        resultados.append(resumir("listar archivadas (50)", medir(
+            lambda i: gestor.listar_archivadas(50, cursores[i % len(cursores)]), len(cursores)
+        ), **etiquetas))
+
+        metricas = gestor.metricas_archivo()
+        en_disco = sum(os.path.getsize(os.path.join(directorio, nombre))
+                       for nombre in os.listdir(directorio) if os.path.isfile(os.path.join(directorio, nombre)))
+        print(f"{args.tareas} tareas: {metricas['tareas']} archivadas en {metricas['bytes'] / 1e6:.1f} MB "
+              f"de segmentos; {gestor.contar_tareas()} en el almacén, {en_disco / 1e6:.1f} MB en su persistencia")
+        gestor.cerrar()
+    finally:
+        os.chdir(RAIZ)
+        shutil.rmtree(directorio)
+
+    imprimir(resultados)
+    guardar(args.salida, "archivo", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
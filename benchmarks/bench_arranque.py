@@ -0,0 +1,84 @@
+"""
+Benchmark de arranque.
+
+Mide, para cada modo de persistencia, cuánto tarda el gestor en poder atender
+peticiones, cuánto tarda la primera consulta de una tarea y cuánto tarda la
+carga completa (en el modo binario se completa en segundo plano).
+
+Uso:
+    python benchmarks/bench_arranque.py --tareas 200000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from gestor import GestorTareas
+from almacenamiento import crear_almacen
+
+MODOS = ("json", "journal", "binario")
+
+
+def preparar(directorio: str, modo: str, cantidad: int):
+    """Crea los archivos de cantidad tareas en el modo dado"""
+    os.chdir(directorio)
+    gestor = GestorTareas(almacen=crear_almacen("memoria", modo_persistencia=modo))
+    tipos = ("simple", "prioritaria", "con_fecha")
+    gestor.crear_tareas([
+        {"tipo": tipos[i % 3], "titulo": f"Tarea {i}", "descripcion": "Descripción de prueba",
+         "prioridad": "alta", "fecha_limite": "2030-01-01T00:00:00"}
+        for i in range(cantidad)
+    ])
+    gestor.guardar_tareas()
+    gestor.cerrar()
+
+
+def medir(directorio: str, modo: str, id_consulta: int) -> dict:
+    os.chdir(directorio)
+    inicio = time.perf_counter()
+    gestor = GestorTareas(almacen=crear_almacen("memoria", modo_persistencia=modo))
+    listo = time.perf_counter()
+    gestor.obtener_tarea(id_consulta)
+    consulta = time.perf_counter()
+    while gestor.continuar_carga():
+        pass
+    completo = time.perf_counter()
+    gestor.cerrar()
+    return {
+        "listo": listo - inicio,
+        "primera consulta": consulta - listo,
+        "carga completa": completo - inicio,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tareas", type=int, default=200000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    raiz = tempfile.mkdtemp(prefix="bench_arranque_")
+    try:
+        print(f"{args.tareas} tareas, mejor de {args.repeticiones} repeticiones")
+        for modo in MODOS:
+            directorio = os.path.join(raiz, modo)
+            os.mkdir(directorio)
+            preparar(directorio, modo, args.tareas)
+            mejores = {}
+            for _ in range(args.repeticiones):
+                for nombre, segundos in medir(directorio, modo, args.tareas // 2).items():
+                    mejores[nombre] = min(mejores.get(nombre, float("inf")), segundos)
+            print(f"  {modo:<8} " + "  ".join(f"{nombre}: {segundos * 1000:9.2f} ms"
+                                              for nombre, segundos in mejores.items()))
+    finally:
+        os.chdir(RAIZ)
+        shutil.rmtree(raiz)
+
+
+if __name__ == "__main__":
+    main()
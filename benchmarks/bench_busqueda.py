@@ -0,0 +1,187 @@
+"""
+Benchmark de la búsqueda de texto (GET /tareas/buscar).
+
+Genera tareas con títulos y descripciones en español (las palabras siguen
+una distribución de Zipf: unas pocas muy frecuentes y muchas raras) y mide:
+- memoria: IndiceTexto de AlmacenMemoria (tiempo de construcción y memoria),
+- sqlite: índice FTS5 de AlmacenSQLite,
+y para cada tipo de consulta la latencia p50/p99 y el número de coincidencias.
+
+Uso:
+    python benchmarks/bench_busqueda.py --tareas 1000000
+    python benchmarks/bench_busqueda.py --tareas 100000 --modos memoria sqlite
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from indices import IndiceTexto
+from almacenamiento import AlmacenSQLite
+from models import TareaSimple
+
+PALABRAS = (
+    "revisar informe presupuesto reunión cliente proyecto llamar enviar correo factura "
+    "comprar preparar presentación documento actualizar servidor código pruebas diseño "
+    "revisión contrato equipo pedido entrega análisis datos ventas marketing página web "
+    "configurar copia seguridad migración base error corregir incidencia soporte usuario "
+    "planificar sprint tarea semana mañana lunes martes miércoles jueves viernes urgente "
+    "pendiente calendario agenda médico farmacia supermercado pan leche fruta gimnasio "
+    "pagar alquiler luz agua teléfono banco impuestos declaración renta seguro coche taller "
+    "cumpleaños regalo viaje billete hotel reserva maleta pasaporte vacaciones familia niños "
+    "colegio deberes lectura libro curso inglés examen estudiar práctica formación entrevista"
+).split()
+
+SILABAS = ("ba be bi bo bu ca ce ci co cu da de di do du fa fe fi fo fu la le li lo lu "
+           "ma me mi mo mu na ne ni no nu pa pe pi po pu ra re ri ro ru sa se si so su "
+           "ta te ti to tu va ve vi vo za ce cha che chi llo lla ña ño rra rro tra tre").split()
+
+# Consultas de cada tipo (se sustituyen las palabras por términos reales del vocabulario)
+CONSULTAS = ("palabra frecuente", "palabra rara", "prefijo corto", "prefijo largo",
+             "dos palabras", "sin acentos", "sin resultados")
+
+
+def vocabulario(tamano: int, semilla: int) -> list:
+    """Palabras reales seguidas de palabras inventadas (las más raras)"""
+    aleatorio = random.Random(semilla)
+    palabras = list(PALABRAS)
+    vistas = set(palabras)
+    while len(palabras) < tamano:
+        palabra = "".join(aleatorio.choice(SILABAS) for _ in range(aleatorio.randint(2, 4)))
+        if palabra not in vistas:
+            vistas.add(palabra)
+            palabras.append(palabra)
+    return palabras
+
+
+def generar_textos(cantidad: int, palabras: list, semilla: int):
+    """(título, descripción) de cada tarea; la palabra i aparece con frecuencia ~ 1/(i+1)"""
+    aleatorio = random.Random(semilla)
+    pesos = [1 / (i + 1) for i in range(len(palabras))]
+    acumulados = []
+    total = 0.0
+    for peso in pesos:
+        total += peso
+        acumulados.append(total)
+    muestra = aleatorio.choices(palabras, cum_weights=acumulados, k=cantidad * 12)
+    posicion = 0
+    for _ in range(cantidad):
+        largo_titulo = aleatorio.randint(2, 5)
+        largo_descripcion = aleatorio.randint(0, 8)
+        titulo = " ".join(muestra[posicion:posicion + largo_titulo]).capitalize()
+        posicion += largo_titulo
+        descripcion = " ".join(muestra[posicion:posicion + largo_descripcion])
+        posicion += largo_descripcion
+        yield titulo, descripcion
+
+
+def rss_kb() -> int:
+    with open("/proc/self/status") as estado:
+        for linea in estado:
+            if linea.startswith("VmRSS:"):
+                return int(linea.split()[1])
+    return 0
+
+
+def consultas(palabras: list, repeticiones: int, semilla: int) -> dict:
+    """Consultas concretas de cada tipo"""
+    aleatorio = random.Random(semilla)
+    frecuentes = [p for p in PALABRAS[:20] if len(p) >= 5]
+    raras = palabras[-1000:]
+    con_acentos = [p for p in PALABRAS if any(c in p for c in "áéíóúñ")]
+    sin_acentos = str.maketrans("áéíóúñ", "aeioun")
+    generadores = {
+        "palabra frecuente": lambda: aleatorio.choice(frecuentes),
+        "palabra rara": lambda: aleatorio.choice(raras),
+        "prefijo corto": lambda: aleatorio.choice(PALABRAS)[:2],
+        "prefijo largo": lambda: aleatorio.choice(PALABRAS)[:5],
+        "dos palabras": lambda: f"{aleatorio.choice(frecuentes)} {aleatorio.choice(PALABRAS[20:])[:4]}",
+        "sin acentos": lambda: aleatorio.choice(con_acentos).translate(sin_acentos).upper(),
+        "sin resultados": lambda: "zzzqx" + str(aleatorio.randint(0, 999)),
+    }
+    return {tipo: [generadores[tipo]() for _ in range(repeticiones)] for tipo in CONSULTAS}
+
+
+def medir(buscar, por_tipo: dict, limite: int):
+    print(f"  {'consulta':<18} {'p50 (ms)':>9} {'p99 (ms)':>9} {'coincidencias (mediana)':>24}")
+    for tipo, lista in por_tipo.items():
+        tiempos, totales = [], []
+        for consulta in lista:
+            inicio = time.perf_counter()
+            _, total = buscar(consulta, limite)
+            tiempos.append(time.perf_counter() - inicio)
+            totales.append(total)
+        tiempos.sort()
+        p99 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))]
+        print(f"  {tipo:<18} {statistics.median(tiempos) * 1000:9.3f} {p99 * 1000:9.3f} "
+              f"{statistics.median(totales):24.0f}")
+
+
+def probar_memoria(textos: list, por_tipo: dict, limite: int):
+    antes = rss_kb()
+    inicio = time.perf_counter()
+    indice = IndiceTexto()
+    for id_tarea, (titulo, descripcion) in enumerate(textos, start=1):
+        indice.indexar(id_tarea, titulo, descripcion)
+    duracion = time.perf_counter() - inicio
+    memoria = (rss_kb() - antes) * 1024
+    print(f"memoria: {len(textos)} tareas, {len(indice._vocabulario)} términos")
+    print(f"  construcción: {duracion:.1f} s, memoria del índice: {memoria / 2**20:.0f} MiB "
+          f"({memoria / len(textos):.0f} bytes por tarea)")
+
+    # Actualización incremental (lo que cuesta cada crear/actualizar/eliminar)
+    inicio = time.perf_counter()
+    for id_tarea in range(1, 10001):
+        titulo, descripcion = textos[-id_tarea]
+        indice.indexar(id_tarea, titulo, descripcion)
+    print(f"  actualizar una tarea: {(time.perf_counter() - inicio) / 10000 * 1e6:.1f} µs")
+    medir(indice.buscar, por_tipo, limite)
+
+
+def probar_sqlite(textos: list, por_tipo: dict, limite: int):
+    directorio = tempfile.mkdtemp(prefix="bench_busqueda_")
+    try:
+        almacen = AlmacenSQLite(os.path.join(directorio, "tareas.db"))
+        almacen.cargar()
+        inicio = time.perf_counter()
+        with almacen.lote():
+            for id_tarea, (titulo, descripcion) in enumerate(textos, start=1):
+                almacen.insertar(TareaSimple(id_tarea, titulo, descripcion))
+        duracion = time.perf_counter() - inicio
+        tamano = os.path.getsize(os.path.join(directorio, "tareas.db"))
+        print(f"sqlite: {len(textos)} tareas")
+        print(f"  inserción con índice FTS5: {duracion:.1f} s, base de datos: {tamano / 2**20:.0f} MiB")
+        medir(almacen.buscar, por_tipo, limite)
+        almacen.cerrar()
+    finally:
+        shutil.rmtree(directorio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tareas", type=int, default=1000000)
+    parser.add_argument("--vocabulario", type=int, default=50000, help="Palabras distintas")
+    parser.add_argument("--consultas", type=int, default=200, help="Consultas de cada tipo")
+    parser.add_argument("--limite", type=int, default=20)
+    parser.add_argument("--modos", nargs="+", choices=("memoria", "sqlite"), default=["memoria", "sqlite"])
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    palabras = vocabulario(args.vocabulario, args.semilla)
+    textos = list(generar_textos(args.tareas, palabras, args.semilla))
+    por_tipo = consultas(palabras, args.consultas, args.semilla)
+    if "memoria" in args.modos:
+        probar_memoria(textos, por_tipo, args.limite)
+    if "sqlite" in args.modos:
+        probar_sqlite(textos, por_tipo, args.limite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark de GET /tareas/eventos con muchos suscriptores.
+
+- bus: reparte eventos a N suscriptores dentro del proceso (como los
+  generadores de las respuestas SSE) y mide la memoria por suscriptor
+  y el tiempo hasta que todos reciben cada evento.
+- http: arranca el servidor, abre N conexiones SSE reales, crea tareas
+  y comprueba que todas las conexiones reciben todos los eventos; mide
+  la memoria (RSS) del servidor por conexión.
+
+Uso:
+    python benchmarks/bench_eventos.py bus --suscriptores 10000 --eventos 200
+    python benchmarks/bench_eventos.py http --suscriptores 2000 --eventos 20
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from eventos import BusEventos
+
+
+async def consumir(bus: BusEventos, suscripcion, eventos: int, suscriptores: int,
+                   recibidos: list, fin: asyncio.Event):
+    """Lo mismo que hace la respuesta SSE con cada suscripción"""
+    pendientes = eventos
+    try:
+        while pendientes:
+            mensajes = await suscripcion.recibir()
+            if not mensajes:
+                return
+            pendientes -= len(mensajes)
+        recibidos.append(time.perf_counter())
+        if len(recibidos) == suscriptores:
+            fin.set()
+    finally:
+        bus.cancelar(suscripcion)
+
+
+async def probar_bus(suscriptores: int, eventos: int):
+    bus = BusEventos(maximo_cola=eventos + 1)
+    bus.iniciar()
+    recibidos, fin = [], asyncio.Event()
+
+    tracemalloc.start()
+    inicio_memoria = tracemalloc.get_traced_memory()[0]
+    tareas = [asyncio.create_task(consumir(bus, bus.suscribir(), eventos, suscriptores, recibidos, fin))
+              for _ in range(suscriptores)]
+    await asyncio.sleep(0)
+    memoria = tracemalloc.get_traced_memory()[0] - inicio_memoria
+    tracemalloc.stop()
+
+    datos = json.dumps({"id": 1, "tarea": {"id": 1, "titulo": "Tarea", "estado": "pendiente"}}).encode()
+    inicio = time.perf_counter()
+    # Se publica desde otro hilo, como las escrituras en el threadpool
+    hilo = threading.Thread(target=lambda: [bus.publicar("crear", i, datos) for i in range(eventos)])
+    hilo.start()
+    await fin.wait()
+    duracion = time.perf_counter() - inicio
+    hilo.join()
+    await asyncio.gather(*tareas)
+    bus.detener()
+
+    print(f"{suscriptores} suscriptores, {eventos} eventos")
+    print(f"  memoria por suscriptor: {memoria / suscriptores:8.0f} bytes")
+    print(f"  entregas por segundo:   {suscriptores * eventos / duracion:8.0f}")
+    print(f"  todos recibidos en:     {duracion * 1000:8.1f} ms")
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as estado:
+        for linea in estado:
+            if linea.startswith("VmRSS:"):
+                return int(linea.split()[1])
+    return 0
+
+
+def probar_http(suscriptores: int, eventos: int, puerto: int):
+    directorio = tempfile.mkdtemp(prefix="bench_eventos_")
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto), "--log-level", "warning",
+         "--timeout-graceful-shutdown", "1"],
+        cwd=RAIZ, env=dict(os.environ, TAREAS_ALMACEN="sqlite",
+                           TAREAS_SQLITE_RUTA=os.path.join(directorio, "tareas.db"))
+    )
+    conexiones = []
+    try:
+        for _ in range(100):
+            try:
+                conexion = http.client.HTTPConnection("127.0.0.1", puerto)
+                conexion.request("GET", "/salud")
+                conexion.getresponse().read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        antes = rss_kb(proceso.pid)
+        for _ in range(suscriptores):
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto)
+            conexion.request("GET", "/tareas/eventos")
+            respuesta = conexion.getresponse()
+            respuesta.fp.readline()  # primer trozo: retry
+            conexiones.append((conexion, respuesta))
+        despues = rss_kb(proceso.pid)
+
+        inicio = time.perf_counter()
+        escritor = http.client.HTTPConnection("127.0.0.1", puerto)
+        for i in range(eventos):
+            escritor.request("POST", "/tareas", body=json.dumps({"titulo": f"Tarea {i}"}),
+                             headers={"Content-Type": "application/json"})
+            escritor.getresponse().read()
+        recibidos = 0
+        for _, respuesta in conexiones:
+            vistos = 0
+            while vistos < eventos:
+                if respuesta.fp.readline().startswith(b"event: crear"):
+                    vistos += 1
+            recibidos += vistos
+        duracion = time.perf_counter() - inicio
+
+        assert recibidos == suscriptores * eventos, "Alguna conexión no recibió todos los eventos"
+        print(f"{suscriptores} conexiones SSE, {eventos} eventos")
+        print(f"  RSS del servidor por conexión: {(despues - antes) * 1024 / suscriptores:8.0f} bytes")
+        print(f"  entregas por segundo:          {recibidos / duracion:8.0f}")
+    finally:
+        for conexion, _ in conexiones:
+            conexion.close()
+        proceso.terminate()
+        proceso.wait()
+        shutil.rmtree(directorio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modo", choices=("bus", "http"))
+    parser.add_argument("--suscriptores", type=int, default=10000)
+    parser.add_argument("--eventos", type=int, default=200)
+    parser.add_argument("--puerto", type=int, default=8766)
+    args = parser.parse_args()
+
+    if args.modo == "bus":
+        asyncio.run(probar_bus(args.suscriptores, args.eventos))
+    else:
+        probar_http(args.suscriptores, args.eventos, args.puerto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Micro-benchmarks de GestorTareas con distintos números de tareas.
+
+Para cada almacén y tamaño (en un proceso aparte, para que la memoria pico
+sea la de ese tamaño) crea las tareas con crear_tareas y mide:
+- crear_tarea, obtener_tarea, actualizar_tarea, marcar_completada,
+- listar (página de 50, por cursor) y listar_pendientes (filtro por estado),
+- contar_pendientes, estadisticas y vencidas,
+- persistencia: confirmar (un cambio hasta que es durable), guardar_todo
+  (estado completo) y cargar (arranque con todas las tareas).
+Imprime p50/p99, operaciones por segundo y RSS pico, y con --salida los
+guarda en JSON (comparables con benchmarks/comparar.py).
+
+Uso:
+    python benchmarks/bench_gestor.py --tamanos 1000 100000 --salida gestor.json
+    python benchmarks/bench_gestor.py --tamanos 1000000 --almacen memoria sqlite --presupuesto 5
+"""
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gestor import GestorTareas
+from almacenamiento import crear_almacen
+from medicion import medir, resumir, imprimir, guardar
+
+TIPOS = ("simple", "prioritaria", "con_fecha")
+PRIORIDADES = ("alta", "media", "baja")
+ESTADOS = ("pendiente", "pendiente", "en_progreso", "completada")
+
+
+def datos_tarea(i: int, ahora: datetime) -> dict:
+    """Mezcla de tipos, estados y prioridades; la mitad de las fechas límite ya han pasado"""
+    datos = {"tipo": TIPOS[i % 3], "titulo": f"Tarea {i}", "descripcion": f"Descripción de la tarea {i}",
+             "estado": ESTADOS[i % len(ESTADOS)]}
+    if datos["tipo"] == "prioritaria":
+        datos["prioridad"] = PRIORIDADES[i % 3]
+    elif datos["tipo"] == "con_fecha":
+        datos["fecha_limite"] = ahora + timedelta(hours=(i % 200) - 100)
+    return datos
+
+
+def crear_gestor(almacen: str, persistencia: str, directorio: str) -> GestorTareas:
+    return GestorTareas(almacen=crear_almacen(
+        almacen, modo_persistencia=persistencia, ruta_sqlite=os.path.join(directorio, "tareas.db")
+    ))
+
+
+def medir_tamano(almacen: str, persistencia: str, tamano: int, repeticiones: int,
+                 presupuesto: float, semilla: int) -> list:
+    """Mide todas las operaciones con tamano tareas (se ejecuta en un proceso nuevo)"""
+    directorio = tempfile.mkdtemp(prefix="bench_gestor_")
+    os.chdir(directorio)
+    try:
+        # Los modelos escriben mensajes (p. ej. al completar una tarea prioritaria)
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            return medir_operaciones(almacen, persistencia, directorio, tamano, repeticiones, presupuesto, semilla)
+    finally:
+        os.chdir(RAIZ)
+        shutil.rmtree(directorio)
+
+
+def medir_operaciones(almacen: str, persistencia: str, directorio: str, tamano: int, repeticiones: int,
+                      presupuesto: float, semilla: int) -> list:
+    etiquetas = {"almacen": almacen, "tamano": tamano}
+    resultados = []
+    aleatorio = random.Random(semilla)
+    gestor = crear_gestor(almacen, persistencia, directorio)
+    ahora = datetime.now()
+    inicio = time.perf_counter()
+    bloques = []
+    for desde in range(0, tamano, 10000):
+        inicio_bloque = time.perf_counter()
+        gestor.crear_tareas([datos_tarea(i, ahora) for i in range(desde, min(desde + 10000, tamano))])
+        bloques.append(time.perf_counter() - inicio_bloque)
+    gestor.confirmar_persistencia().result()
+    resultados.append(resumir("crear_tareas (lotes de 10000)", bloques, time.perf_counter() - inicio,
+                              **etiquetas))
+
+    ids = [tarea.id for tarea in gestor.listar_tareas()]
+
+    def al_azar(_):
+        return aleatorio.choice(ids)
+
+    operaciones = {
+        "crear_tarea": lambda i: ids.append(gestor.crear_tarea("simple", f"Nueva {i}").id),
+        "obtener_tarea": lambda i: gestor.obtener_tarea(al_azar(i)),
+        "actualizar_tarea": lambda i: gestor.actualizar_tarea(al_azar(i), descripcion=f"Cambio {i}"),
+        "marcar_completada": lambda i: gestor.marcar_completada(al_azar(i)),
+        "listar": lambda i: gestor.listar_tareas(limite=50, despues_de=al_azar(i)),
+        "listar_pendientes": lambda i: gestor.listar_tareas(estado="pendiente", limite=50),
+        "contar_pendientes": lambda i: gestor.contar_tareas(estado="pendiente"),
+        "estadisticas": lambda i: gestor.obtener_estadisticas(),
+        "vencidas": lambda i: gestor.obtener_tareas_vencidas(),
+        "confirmar": lambda i: (gestor.actualizar_tarea(al_azar(i), descripcion=f"Durable {i}"),
+                                gestor.confirmar_persistencia().result()),
+        "guardar_todo": lambda i: (gestor.guardar_tareas(), gestor.confirmar_persistencia().result()),
+    }
+    for nombre, operacion in operaciones.items():
+        resultados.append(resumir(nombre, medir(operacion, repeticiones, presupuesto), **etiquetas))
+
+    # Arranque: se vuelven a cargar todas las tareas desde disco
+    gestor.cerrar()
+
+    def cargar(_):
+        crear_gestor(almacen, persistencia, directorio).cerrar()
+
+    resultados.append(resumir("cargar", medir(cargar, repeticiones, presupuesto, minimo=1), **etiquetas))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--almacen", nargs="+", choices=("memoria", "sqlite"), default=["memoria"])
+    parser.add_argument("--persistencia", choices=("json", "journal", "binario"), default="journal",
+                        help="Modo de persistencia del almacén en memoria")
+    parser.add_argument("--repeticiones", type=int, default=200, help="Máximo de repeticiones por operación")
+    parser.add_argument("--presupuesto", type=float, default=2.0, help="Segundos como máximo por operación")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="Archivo JSON de resultados (- para la salida estándar)")
+    args = parser.parse_args()
+
+    resultados = []
+    for almacen in args.almacen:
+        for tamano in args.tamanos:
+            print(f"{almacen}, {tamano} tareas")
+            # Un proceso por tamaño: la memoria pico no arrastra la de los anteriores
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as proceso:
+                medidos = proceso.submit(medir_tamano, almacen, args.persistencia, tamano,
+                                         args.repeticiones, args.presupuesto, args.semilla).result()
+            imprimir(medidos)
+            resultados.extend(medidos)
+    guardar(args.salida, "gestor", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
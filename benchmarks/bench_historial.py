@@ -0,0 +1,179 @@
+"""
+Benchmark del historial de cambios (historial.py).
+
+Crea --tareas tareas y les aplica --cambios cambios al azar (título, descripción,
+estado o prioridad); además, unas pocas tareas reciben 10, 100, 1000 y 10000
+revisiones. Mide:
+- actualizar: una modificación con y sin historial (el coste de anotar cada cambio),
+- en fecha: el estado de una tarea en un instante al azar (GET /tareas/{id}?at=) según
+  cuántas revisiones tiene, con puntos de control y, como referencia, con un segundo
+  historial sin ellos, que aplica todos los deltas desde la primera revisión
+  (--sin-referencia para no llevarlo),
+- historial: la primera página de GET /tareas/{id}/historial,
+- arranque: abrir el log (perezoso) e indexarlo entero,
+- compactar: quitar la primera mitad de las revisiones (retención),
+y cuánta memoria ocupa el índice por revisión frente a guardar una copia de la tarea en cada una,
+y cuánto ocupa cada revisión en el log.
+
+Uso:
+    python benchmarks/bench_historial.py --tareas 10000 --cambios 100000
+    python benchmarks/bench_historial.py --tareas 100000 --cambios 1000000 --salida historial.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gestor import GestorTareas
+from almacenamiento import AlmacenMemoria
+from historial import HistorialTareas
+from persistencia import crear_persistencia
+from models import desde_epoca_us, ahora_us
+from medicion import medir, resumir, imprimir, guardar
+
+# Revisiones de las tareas con historial largo
+LARGOS = (10, 100, 1000, 10000)
+
+
+def cambio_al_azar(aleatorio: random.Random, paso: int) -> dict:
+    return aleatorio.choice((
+        {"titulo": f"Tarea revisada {paso}"},
+        {"descripcion": f"Descripción de la revisión {paso} " * 2},
+        {"estado": aleatorio.choice(("pendiente", "en_progreso", "completada"))},
+        {"prioridad": aleatorio.choice(("baja", "media", "alta"))},
+    ))
+
+
+def poblar(gestor: GestorTareas, tareas: int, cambios: int, aleatorio: random.Random) -> list:
+    """Crea las tareas (prioritarias, para que todos los cambios apliquen) y les aplica los cambios"""
+    for desde in range(0, tareas, 10000):
+        gestor.crear_tareas([{"tipo": "prioritaria", "titulo": f"Tarea {i}", "prioridad": "media"}
+                             for i in range(desde, min(desde + 10000, tareas))])
+    for paso in range(cambios):
+        gestor.actualizar_tarea(aleatorio.randint(1, tareas), **cambio_al_azar(aleatorio, paso))
+    # Tareas nuevas con historiales largos: (id, instante de la primera revisión)
+    largas = []
+    for revisiones in LARGOS:
+        tarea = gestor.crear_tarea("prioritaria", f"Larga {revisiones}", prioridad="media")
+        largas.append((tarea.id, revisiones, ahora_us()))
+        for paso in range(revisiones - 1):
+            gestor.actualizar_tarea(tarea.id, **cambio_al_azar(aleatorio, paso))
+    return largas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tareas", type=int, default=10000)
+    parser.add_argument("--cambios", type=int, default=100000)
+    parser.add_argument("--cada", type=int, default=16, help="Revisiones entre puntos de control")
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    parser.add_argument("--sin-referencia", action="store_true",
+                        help="No medir la reconstrucción sin puntos de control")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="Archivo JSON de resultados (- para la salida estándar)")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="bench_historial_")
+    ruta = os.path.join(directorio, "historial.log")
+    etiquetas = {"tareas": args.tareas, "cambios": args.cambios}
+    aleatorio = random.Random(args.semilla)
+    resultados = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            historial = HistorialTareas(ruta, cada=args.cada)
+            gestor = GestorTareas(almacen=AlmacenMemoria(crear_persistencia("journal", os.path.join(directorio, "con"))),
+                                  historial=historial)
+            referencia = None
+            if not args.sin_referencia:
+                referencia = HistorialTareas(os.path.join(directorio, "referencia.log"), cada=10 ** 9)
+                gestor.agregar_observador(lambda operacion, id_tarea, tarea, version:
+                                          referencia.registrar(operacion, id_tarea, tarea) if poblando else None)
+            sin_historial = GestorTareas(almacen=AlmacenMemoria(crear_persistencia("journal", os.path.join(directorio, "sin"))))
+            poblando = True
+            primero = ahora_us()
+            inicio = time.perf_counter()
+            largas = poblar(gestor, args.tareas, args.cambios, aleatorio)
+            print(f"poblar: {time.perf_counter() - inicio:.1f} s", file=sys.stderr)
+            sin_historial.crear_tareas([{"tipo": "prioritaria", "titulo": f"Tarea {i}", "prioridad": "media"}
+                                        for i in range(args.tareas)])
+
+            # La referencia no cuenta en el coste de actualizar
+            poblando = False
+            for nombre, medido in (("actualizar (sin historial)", sin_historial), ("actualizar (con historial)", gestor)):
+                resultados.append(resumir(nombre, medir(
+                    lambda i: medido.actualizar_tarea(aleatorio.randint(1, args.tareas),
+                                                      **cambio_al_azar(aleatorio, i)), args.repeticiones
+                ), **etiquetas))
+        gestor.confirmar_persistencia().result()
+
+        # Estado en un instante al azar entre la primera revisión y ahora
+        fin = ahora_us()
+        for id_tarea, revisiones, primera in largas:
+            instantes = [aleatorio.randint(primera, fin) for _ in range(args.repeticiones)]
+            resultados.append(resumir(f"en fecha ({revisiones} revisiones)", medir(
+                lambda i: gestor.obtener_tarea_en(id_tarea, desde_epoca_us(instantes[i])), args.repeticiones
+            ), **etiquetas))
+            if referencia is not None:
+                resultados.append(resumir(f"en fecha sin puntos ({revisiones} revisiones)", medir(
+                    lambda i: referencia.estado_en(id_tarea, instantes[i]), args.repeticiones
+                ), **etiquetas))
+        if referencia is not None:
+            referencia.cerrar()
+        id_larga = largas[-1][0]
+        resultados.append(resumir("historial (50 de 10000)", medir(
+            lambda i: gestor.historial_tarea(id_larga, 50), args.repeticiones
+        ), **etiquetas))
+
+        revisiones = gestor.metricas_historial()["revisiones"]
+        gestor.cerrar()
+        sin_historial.cerrar()
+
+        inicio = time.perf_counter()
+        releido = HistorialTareas(ruta, cada=args.cada)
+        resultados.append(resumir("arranque (abrir el log)", [time.perf_counter() - inicio], **etiquetas))
+        # Memoria: el índice del log frente a una copia de la tarea (con sus propios
+        # textos, como to_dict) por revisión
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        while releido.continuar_carga():
+            pass
+        indexar = time.perf_counter() - inicio
+        memoria = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        resultados.append(resumir("arranque (indexar el log)", [indexar], **etiquetas))
+        estados = [releido.estado_en(id_tarea, fin) for id_tarea in range(1, args.tareas + 1)]
+        tracemalloc.start()
+        copias = [json.loads(json.dumps(estado)) for estado in estados for _ in range(releido.cantidad(estado["id"]))]
+        memoria_copias = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{revisiones} revisiones: {memoria / revisiones:.0f} bytes por revisión en memoria "
+              f"(una copia de la tarea en cada una: {memoria_copias / len(copias):.0f}); "
+              f"{os.path.getsize(ruta) / revisiones:.0f} bytes por revisión en el log")
+        del copias
+
+        # Retención: todo lo anterior a la mitad del tiempo de la prueba
+        inicio = time.perf_counter()
+        quitadas = releido.compactar((primero + fin) // 2)
+        resultados.append(resumir("compactar (la mitad)", [time.perf_counter() - inicio], **etiquetas))
+        print(f"compactar: {quitadas} revisiones quitadas, {os.path.getsize(ruta) / 1e6:.1f} MB de log")
+        releido.cerrar()
+    finally:
+        shutil.rmtree(directorio)
+
+    imprimir(resultados)
+    guardar(args.salida, "historial", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
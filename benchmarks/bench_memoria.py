@@ -0,0 +1,86 @@
+"""
+Benchmark de memoria por tarea.
+
+Compara la representación actual (__slots__, fechas como enteros) con la
+anterior (atributos en __dict__, datetime por fecha), medida con tracemalloc.
+
+Uso:
+    python benchmarks/bench_memoria.py --tareas 100000
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from models import EstadoTarea, PrioridadTarea, TareaSimple, TareaPrioritaria, TareaConFecha
+
+
+class _TareaAnterior:
+    """Réplica del diseño anterior: un __dict__ y un datetime por instancia"""
+    def __init__(self, id, titulo, descripcion="", prioridad=None, fecha_limite=None):
+        self._id = id
+        self._titulo = titulo
+        self._descripcion = descripcion
+        self._fecha_creacion = datetime.now()
+        self._estado = EstadoTarea.PENDIENTE
+        if prioridad is not None:
+            self._prioridad = prioridad
+        if fecha_limite is not None:
+            self._fecha_limite = fecha_limite
+
+
+def crear_actuales(cantidad: int, fecha: datetime) -> list:
+    tareas = []
+    for i in range(cantidad):
+        if i % 3 == 0:
+            tareas.append(TareaSimple(i, "Tarea"))
+        elif i % 3 == 1:
+            tareas.append(TareaPrioritaria(i, "Tarea", "", PrioridadTarea.ALTA))
+        else:
+            tareas.append(TareaConFecha(i, "Tarea", "", fecha))
+    return tareas
+
+
+def crear_anteriores(cantidad: int, fecha: datetime) -> list:
+    tareas = []
+    for i in range(cantidad):
+        if i % 3 == 0:
+            tareas.append(_TareaAnterior(i, "Tarea"))
+        elif i % 3 == 1:
+            tareas.append(_TareaAnterior(i, "Tarea", prioridad=PrioridadTarea.ALTA))
+        else:
+            tareas.append(_TareaAnterior(i, "Tarea", fecha_limite=fecha + timedelta(microseconds=i)))
+    return tareas
+
+
+def bytes_por_tarea(crear, cantidad: int, fecha: datetime) -> float:
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    tareas = crear(cantidad, fecha)
+    total = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    del tareas
+    return total / cantidad
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tareas", type=int, default=100000)
+    args = parser.parse_args()
+
+    fecha = datetime(2030, 1, 1)
+    anterior = bytes_por_tarea(crear_anteriores, args.tareas, fecha)
+    actual = bytes_por_tarea(crear_actuales, args.tareas, fecha)
+
+    print(f"{args.tareas} tareas (1/3 de cada tipo), sin contar índices ni el almacén")
+    print(f"  anterior (__dict__ + datetime): {anterior:8.1f} bytes/tarea")
+    print(f"  actual (__slots__ + enteros):   {actual:8.1f} bytes/tarea")
+    print(f"  ahorro:                         {100 * (1 - actual / anterior):8.1f} %")
+
+
+if __name__ == "__main__":
+    main()
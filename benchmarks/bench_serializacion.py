@@ -0,0 +1,86 @@
+"""
+Benchmark de serialización de GET /tareas.
+
+Compara el camino anterior (to_dict -> TareaResponse -> ListaTareasResponse ->
+validación de FastAPI) con el camino directo a bytes (TareaBase.to_json cacheado).
+
+Uso:
+    python benchmarks/bench_serializacion.py --tareas 10000 --repeticiones 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mejor tiempo (en segundos) de varias ejecuciones"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tareas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    # El gestor global de main.py guarda sus archivos en el directorio actual
+    os.chdir(tempfile.mkdtemp(prefix="bench_serializacion_"))
+    os.environ.setdefault("TAREAS_PERSISTENCIA", "journal")
+
+    from fastapi.testclient import TestClient
+    import main
+    from schemas import TareaResponse, ListaTareasResponse
+    from serializacion import lista_a_json
+
+    tipos = ("simple", "prioritaria", "con_fecha")
+    for i in range(args.tareas):
+        main.gestor.crear_tarea(tipos[i % 3], f"Tarea {i}", "Descripción de prueba",
+                                prioridad="alta", fecha_limite="2030-01-01T00:00:00")
+    tareas = main.gestor.listar_tareas()
+
+    # Ruta con el camino anterior, solo para comparar de extremo a extremo
+    @main.app.get("/bench/tareas-pydantic", response_model=ListaTareasResponse)
+    async def listar_pydantic():
+        lista = main.gestor.listar_tareas()
+        return ListaTareasResponse(tareas=[TareaResponse(**t.to_dict()) for t in lista], total=len(lista))
+
+    def pydantic():
+        ListaTareasResponse(
+            tareas=[TareaResponse(**t.to_dict()) for t in tareas], total=len(tareas)
+        ).model_dump_json()
+
+    def directo_sin_cache():
+        for tarea in tareas:
+            tarea._invalidar_json()
+        lista_a_json((t.to_json() for t in tareas), len(tareas))
+
+    def directo():
+        lista_a_json((t.to_json() for t in tareas), len(tareas))
+
+    cliente = TestClient(main.app)
+    resultados = {
+        "serializar: to_dict + Pydantic": medir(pydantic, args.repeticiones),
+        "serializar: to_json sin caché": medir(directo_sin_cache, args.repeticiones),
+        "serializar: to_json con caché": medir(directo, args.repeticiones),
+        "GET /bench/tareas-pydantic": medir(lambda: cliente.get("/bench/tareas-pydantic"), args.repeticiones),
+        "GET /tareas": medir(lambda: cliente.get("/tareas"), args.repeticiones),
+    }
+
+    print(f"{args.tareas} tareas, mejor de {args.repeticiones} repeticiones")
+    for nombre, segundos in resultados.items():
+        print(f"  {nombre:<34} {segundos * 1000:9.2f} ms  {args.tareas / segundos:12.0f} tareas/s")
+    main.gestor.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark de las series de estadísticas (GET /estadisticas/series, analitica.py).
+
+Genera --tareas tareas de los tres tipos creadas a lo largo de --dias días (la
+mayoría ya completadas, las tareas con fecha con la mitad de las fechas
+vencidas) y mide sobre la vista columnar:
+- construir: la vista a partir de las tareas (la primera consulta del gestor),
+- las series por hora y por día, con y sin filtro de tipo,
+- actualizar: mantener la vista al día con cada cambio,
+- bucle: el mismo cálculo de las series por hora recorriendo las tareas en
+  Python, como referencia (--sin-bucle para no medirlo).
+
+Uso:
+    python benchmarks/bench_series.py --tareas 1000000
+    python benchmarks/bench_series.py --tareas 1000000 --dias 365 --salida series.json
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analitica import VistaColumnar
+from models import EstadoTarea, PrioridadTarea, ahora_us, tarea_desde_campos
+from medicion import medir, resumir, imprimir, guardar
+
+_HORA_US = 3600 * 10 ** 6
+
+
+def generar_tareas(cantidad: int, dias: float, semilla: int) -> list:
+    aleatorio = random.Random(semilla)
+    ahora = ahora_us()
+    ventana = int(dias * 24 * _HORA_US)
+    estados = (EstadoTarea.COMPLETADA,) * 6 + (EstadoTarea.PENDIENTE,) * 3 + (EstadoTarea.EN_PROGRESO,)
+    tareas = []
+    for id_tarea in range(1, cantidad + 1):
+        tipo = ("TareaSimple", "TareaPrioritaria", "TareaConFecha")[id_tarea % 3]
+        creacion = ahora - aleatorio.randrange(ventana)
+        estado = aleatorio.choice(estados)
+        completada = (creacion + aleatorio.randrange(max(1, ahora - creacion))
+                      if estado == EstadoTarea.COMPLETADA else None)
+        tareas.append(tarea_desde_campos(
+            tipo, id_tarea, f"Tarea {id_tarea}", "", estado, creacion,
+            aleatorio.choice(tuple(PrioridadTarea)) if tipo == "TareaPrioritaria" else None,
+            ahora + aleatorio.randint(-240, 240) * _HORA_US if tipo == "TareaConFecha" else None,
+            completada
+        ))
+    return tareas
+
+
+def series_con_bucle(tareas: list, desde_us: int, hasta_us: int, ahora: int) -> tuple:
+    """Creadas y completadas por hora y edad de las pendientes, recorriendo las tareas"""
+    creadas, completadas, edades = Counter(), Counter(), []
+    for tarea in tareas:
+        tipo, estado, prioridad, creacion_us, completada_us, limite_us = tarea.valores_analitica()
+        if desde_us <= creacion_us < hasta_us:
+            creadas[(creacion_us - desde_us) // _HORA_US] += 1
+        if estado == EstadoTarea.COMPLETADA:
+            if desde_us <= completada_us < hasta_us:
+                completadas[(completada_us - desde_us) // _HORA_US] += 1
+        else:
+            edades.append(ahora - creacion_us)
+    edades.sort()
+    return creadas, completadas, edades[len(edades) // 2] if edades else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tareas", type=int, default=1000000)
+    parser.add_argument("--dias", type=float, default=90.0, help="Días en los que se reparten las creaciones")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--sin-bucle", action="store_true", help="No medir el cálculo con un bucle de Python")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="Archivo JSON de resultados (- para la salida estándar)")
+    args = parser.parse_args()
+
+    tareas = generar_tareas(args.tareas, args.dias, args.semilla)
+    etiquetas = {"tareas": args.tareas}
+    resultados = []
+
+    inicio = time.perf_counter()
+    vista = VistaColumnar.construir((tarea.id, tarea.valores_analitica()) for tarea in tareas)
+    resultados.append(resumir("construir", [time.perf_counter() - inicio], **etiquetas))
+
+    ahora = ahora_us()
+    dia_us = 24 * _HORA_US
+    consultas = (
+        ("series hora (24 h)", "hora", None, None),
+        ("series dia (30 días)", "dia", None, None),
+        ("series dia (todo)", "dia", ahora - int(args.dias * dia_us) - dia_us, None),
+        ("series hora con tipo", "hora", None, "TareaConFecha"),
+    )
+    for nombre, intervalo, desde_us, tipo in consultas:
+        tiempos = medir(lambda i: vista.series(intervalo, desde_us, None, ahora, ahora, tipo), args.repeticiones)
+        resultados.append(resumir(nombre, tiempos, **etiquetas))
+
+    aleatorio = random.Random(args.semilla)
+    cambiadas = [aleatorio.choice(tareas) for _ in range(10000)]
+    resultados.append(resumir("actualizar", medir(
+        lambda i: vista.actualizar(cambiadas[i].id, cambiadas[i].valores_analitica()), len(cambiadas)
+    ), **etiquetas))
+
+    if not args.sin_bucle:
+        hasta_us = ahora - ahora % _HORA_US + _HORA_US
+        tiempos = medir(lambda i: series_con_bucle(tareas, hasta_us - 24 * _HORA_US, hasta_us, ahora), 3)
+        resultados.append(resumir("bucle python (hora, 24 h)", tiempos, **etiquetas))
+
+    print(f"{args.tareas} tareas en {args.dias} días: {len(vista)} en la vista")
+    imprimir(resultados)
+    guardar(args.salida, "series", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark del planificador de vencimientos (vencimientos.py) con muchas fechas límite.
+
+Crea --tareas tareas con fechas repartidas en --ventana segundos (a partir de
+--antelacion segundos), arranca el planificador en un event loop y espera a
+que venzan todas. Mide:
+- retraso: desde la fecha límite hasta que la tarea se marca como vencida
+  (lo ve un observador del gestor con la operación "vencer"),
+- retraso_webhook: hasta que llega al webhook, un servidor HTTP local que hace
+  de destino (--sin-webhook para no usarlo),
+- el tiempo de CPU del proceso mientras espera y cuántas veces despertó el planificador.
+
+Uso:
+    python benchmarks/bench_vencimientos.py --tareas 200000 --ventana 10
+    python benchmarks/bench_vencimientos.py --tareas 200000 --almacen sqlite --salida vencimientos.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gestor import GestorTareas
+from almacenamiento import crear_almacen
+from vencimientos import PlanificadorVencimientos, NotificadorWebhook
+from medicion import resumir, imprimir, guardar
+
+
+def iniciar_receptor(retrasos: list) -> ThreadingHTTPServer:
+    """Servidor HTTP local que hace de destino del webhook y anota el retraso de cada tarea"""
+    class Receptor(BaseHTTPRequestHandler):
+        def do_POST(self):
+            cuerpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            ahora = datetime.now()
+            retrasos.extend((ahora - datetime.fromisoformat(tarea["fecha_limite"])).total_seconds()
+                            for tarea in cuerpo["tareas"])
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Receptor)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+async def probar(args, gestor: GestorTareas, retrasos: list, retrasos_webhook: list,
+                 notificador) -> dict:
+    planificador = PlanificadorVencimientos(gestor)
+
+    def anotar(operacion, id_tarea, tarea, version):
+        if operacion == "vencer":
+            retrasos.append((datetime.now() - tarea.fecha_limite).total_seconds())
+
+    gestor.agregar_observador(anotar)
+    await planificador.iniciar()
+    inicio = time.perf_counter()
+    cpu = time.process_time()
+    limite = time.perf_counter() + args.ventana + 30
+    while len(retrasos) < args.tareas and time.perf_counter() < limite:
+        await asyncio.sleep(0.1)
+    cpu = time.process_time() - cpu
+    duracion = time.perf_counter() - inicio
+    await planificador.detener()
+    if notificador is not None:
+        notificador.cerrar()
+    return {"cpu_s": round(cpu, 2), "duracion_s": round(duracion, 2), "despertares": planificador.despertares}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tareas", type=int, default=100000)
+    parser.add_argument("--ventana", type=float, default=10.0, help="Segundos en los que vencen todas las tareas")
+    parser.add_argument("--antelacion", type=float,
+                        help="Segundos hasta la primera fecha, para crear antes las tareas (por defecto según --tareas)")
+    parser.add_argument("--almacen", choices=("memoria", "sqlite"), default="memoria")
+    parser.add_argument("--sin-webhook", action="store_true")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (- para la salida estándar)")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="bench_vencimientos_")
+    os.chdir(directorio)
+    retrasos, retrasos_webhook = [], []
+    try:
+        gestor = GestorTareas(almacen=crear_almacen(
+            args.almacen, modo_persistencia="journal", ruta_sqlite=os.path.join(directorio, "tareas.db")
+        ))
+        notificador = None
+        if not args.sin_webhook:
+            receptor = iniciar_receptor(retrasos_webhook)
+            notificador = NotificadorWebhook(f"http://127.0.0.1:{receptor.server_port}/vencidas")
+            gestor.agregar_observador(notificador)
+        # A partir de aquí todas las fechas que lleguen se avisan, también las que
+        # venzan mientras se crean las tareas (se procesan al arrancar, con más retraso)
+        gestor.procesar_vencimientos()
+        antelacion = args.antelacion if args.antelacion is not None else 2 + args.tareas / 5000
+        primera = datetime.now() + timedelta(seconds=antelacion)
+        for desde in range(0, args.tareas, 10000):
+            gestor.crear_tareas([
+                {"tipo": "con_fecha", "titulo": f"Tarea {i}",
+                 "fecha_limite": primera + timedelta(seconds=args.ventana * i / args.tareas)}
+                for i in range(desde, min(desde + 10000, args.tareas))
+            ])
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            extra = asyncio.run(probar(args, gestor, retrasos, retrasos_webhook, notificador))
+        gestor.cerrar()
+    finally:
+        os.chdir(RAIZ)
+        shutil.rmtree(directorio)
+
+    etiquetas = {"almacen": args.almacen, "tareas": args.tareas}
+    resultados = [resumir("retraso", retrasos, extra["duracion_s"], **etiquetas)]
+    if retrasos_webhook:
+        resultados.append(resumir("retraso_webhook", retrasos_webhook, extra["duracion_s"], **etiquetas))
+    print(f"{args.almacen}, {args.tareas} tareas en {args.ventana} s: {len(retrasos)} vencidas, "
+          f"{extra['despertares']} despertares, {extra['cpu_s']} s de CPU en {extra['duracion_s']} s")
+    imprimir(resultados)
+    guardar(args.salida, "vencimientos", vars(args), resultados)
+
+
+if __name__ == "__main__":
+    main()
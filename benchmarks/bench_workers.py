@@ -0,0 +1,132 @@
+"""
+Prueba local con varios workers de uvicorn compartiendo una base de datos SQLite.
+
+Arranca el servidor con --workers N, lanza clientes en paralelo (procesos, cada
+uno con su conexión) que crean tareas y comprueba que:
+- no hay IDs repetidos entre workers,
+- todas las tareas creadas se ven desde cualquier worker,
+- un cambio hecho en un worker se ve en los demás (invalidación de caché).
+Muestra también las peticiones por segundo para cada número de workers.
+
+Uso:
+    python benchmarks/bench_workers.py --workers 1 4 --peticiones 4000 --clientes 8
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peticion(conexion: http.client.HTTPConnection, metodo: str, ruta: str, cuerpo=None):
+    cabeceras = {"Content-Type": "application/json"} if cuerpo is not None else {}
+    conexion.request(metodo, ruta, body=json.dumps(cuerpo) if cuerpo is not None else None, headers=cabeceras)
+    respuesta = conexion.getresponse()
+    return respuesta.status, json.loads(respuesta.read() or b"null")
+
+
+def cliente(puerto: int, cantidad: int, numero: int) -> list:
+    """Crea cantidad tareas con una conexión persistente y devuelve sus IDs"""
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto)
+    ids = []
+    for i in range(cantidad):
+        estado, tarea = peticion(conexion, "POST", "/tareas", {"titulo": f"Cliente {numero} tarea {i}"})
+        if estado != 201:
+            raise RuntimeError(f"POST /tareas devolvió {estado}: {tarea}")
+        ids.append(tarea["id"])
+    conexion.close()
+    return ids
+
+
+def esperar_servidor(puerto: int, proceso: subprocess.Popen):
+    for _ in range(300):
+        if proceso.poll() is not None:
+            raise RuntimeError("El servidor ha terminado al arrancar")
+        try:
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=1)
+            if peticion(conexion, "GET", "/salud")[0] == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("El servidor no ha arrancado")
+
+
+def socket_escucha(puerto: int) -> socket.socket:
+    """
+    Socket compartido por los workers. Con --workers, uvicorn no activa TCP_NODELAY
+    en las conexiones y cada respuesta espera al ACK retardado del cliente (~40 ms);
+    las conexiones aceptadas heredan la opción del socket de escucha.
+    """
+    escucha = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    escucha.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    escucha.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    escucha.bind(("127.0.0.1", puerto))
+    escucha.set_inheritable(True)
+    return escucha
+
+
+def probar(workers: int, peticiones: int, clientes: int, puerto: int) -> float:
+    directorio = tempfile.mkdtemp(prefix="bench_workers_")
+    entorno = dict(os.environ, TAREAS_ALMACEN="sqlite",
+                   TAREAS_SQLITE_RUTA=os.path.join(directorio, "tareas.db"))
+    escucha = socket_escucha(puerto)
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--fd", str(escucha.fileno()),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=RAIZ, env=entorno, pass_fds=(escucha.fileno(),)
+    )
+    try:
+        esperar_servidor(puerto, proceso)
+        inicio = time.perf_counter()
+        with ProcessPoolExecutor(clientes) as ejecutor:
+            lotes = list(ejecutor.map(cliente, [puerto] * clientes, [peticiones // clientes] * clientes,
+                                      range(clientes)))
+        duracion = time.perf_counter() - inicio
+        ids = [id_tarea for lote in lotes for id_tarea in lote]
+
+        assert len(ids) == len(set(ids)), "Hay IDs repetidos entre workers"
+        estado, lista = peticion(http.client.HTTPConnection("127.0.0.1", puerto), "GET", "/tareas?limit=1")
+        assert lista["total"] == len(ids), f"Se esperaban {len(ids)} tareas y hay {lista['total']}"
+
+        # Cada conexión nueva puede caer en otro worker: el cambio debe verse en todos
+        for id_tarea in ids[:20]:
+            titulo = f"Cambiada {id_tarea}"
+            estado, _ = peticion(http.client.HTTPConnection("127.0.0.1", puerto), "PUT",
+                                 f"/tareas/{id_tarea}", {"titulo": titulo})
+            assert estado == 200
+            for _ in range(workers * 2):
+                estado, tarea = peticion(http.client.HTTPConnection("127.0.0.1", puerto), "GET",
+                                         f"/tareas/{id_tarea}")
+                assert tarea["titulo"] == titulo, f"Un worker devolvió una versión antigua de {id_tarea}"
+        return len(ids) / duracion
+    finally:
+        proceso.terminate()
+        proceso.wait()
+        escucha.close()
+        shutil.rmtree(directorio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--peticiones", type=int, default=4000)
+    parser.add_argument("--clientes", type=int, default=8)
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{args.peticiones} POST /tareas con {args.clientes} clientes ({os.cpu_count()} CPU)")
+    for workers in args.workers:
+        por_segundo = probar(workers, args.peticiones, args.clientes, args.puerto)
+        print(f"  {workers} worker(s): {por_segundo:8.0f} peticiones/s  (IDs únicos, cambios visibles en todos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compara dos archivos de resultados de bench_gestor.py o bench_api.py (--salida).
+
+Empareja los resultados por sus etiquetas (nombre, almacén, tamaño, modo...) y
+muestra el cambio de p50, p99 y operaciones por segundo. Marca como regresión
+lo que empeora más que el umbral en las métricas elegidas y en ese caso
+termina con código 1 (para usarlo en integración continua).
+
+Uso:
+    python benchmarks/comparar.py antes.json despues.json
+    python benchmarks/comparar.py antes.json despues.json --umbral 0.2 --metricas p50_ms p99_ms por_segundo
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from medicion import METRICAS
+
+# Métricas en las que un valor mayor es mejor
+MAYOR_ES_MEJOR = ("por_segundo",)
+
+
+def clave(resultado: dict) -> tuple:
+    return tuple((campo, valor) for campo, valor in resultado.items() if campo not in METRICAS)
+
+
+def cambio(antes, despues) -> float:
+    """Cambio relativo (0.1 = un 10 % más)"""
+    if not antes or despues is None:
+        return 0.0
+    return despues / antes - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("antes")
+    parser.add_argument("despues")
+    parser.add_argument("--umbral", type=float, default=0.1, help="Empeoramiento relativo tolerado")
+    parser.add_argument("--metricas", nargs="+", choices=("p50_ms", "p99_ms", "por_segundo"),
+                        default=["p50_ms", "por_segundo"], help="Métricas que cuentan como regresión")
+    args = parser.parse_args()
+
+    with open(args.antes, encoding="utf-8") as archivo:
+        antes = json.load(archivo)
+    with open(args.despues, encoding="utf-8") as archivo:
+        despues = json.load(archivo)
+    print(f"antes:   {antes['benchmark']} {antes['commit']} ({antes['fecha']})")
+    print(f"después: {despues['benchmark']} {despues['commit']} ({despues['fecha']})")
+
+    anteriores = {clave(resultado): resultado for resultado in antes["resultados"]}
+    regresiones = 0
+    for resultado in despues["resultados"]:
+        anterior = anteriores.pop(clave(resultado), None)
+        etiqueta = " ".join(str(valor) for _, valor in clave(resultado))
+        if anterior is None:
+            print(f"  {etiqueta}: nuevo")
+            continue
+        partes, empeora = [], False
+        for metrica in ("p50_ms", "p99_ms", "por_segundo"):
+            relativo = cambio(anterior[metrica], resultado[metrica])
+            # Empeorar es subir la latencia o bajar el rendimiento
+            peor = -relativo if metrica in MAYOR_ES_MEJOR else relativo
+            if metrica in args.metricas and peor > args.umbral:
+                empeora = True
+            partes.append(f"{metrica} {anterior[metrica]} -> {resultado[metrica]} ({relativo:+.0%})")
+        regresiones += empeora
+        print(f"  {'REGRESIÓN ' if empeora else ''}{etiqueta}: {', '.join(partes)}")
+    for anterior in anteriores.values():
+        print(f"  {' '.join(str(valor) for _, valor in clave(anterior))}: ya no se mide")
+
+    print(f"{regresiones} regresiones (umbral {args.umbral:.0%} en {', '.join(args.metricas)})")
+    sys.exit(1 if regresiones else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Prueba de estrés del gestor con varios hilos (handlers en el threadpool).
+
+Lanza hilos que usan el mismo GestorTareas a la vez y comprueba que:
+- crear tareas en paralelo nunca repite IDs ni pierde tareas,
+- los incrementos leer-modificar-escribir hechos con gestor.escritura() no se pierden,
+- las estadísticas y los listados son consistentes aunque otras tareas cambien
+  de estado mientras se leen (total = suma de estados, página = recuento).
+Con --sin-cerrojos se sustituye el cerrojo del gestor por uno que no bloquea,
+para ver que la prueba detecta las actualizaciones perdidas.
+
+Uso:
+    python benchmarks/estres_concurrencia.py --hilos 8 --operaciones 4000
+    python benchmarks/estres_concurrencia.py --sin-cerrojos
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from gestor import GestorTareas
+from almacenamiento import crear_almacen
+
+ESTADOS = ("pendiente", "en_progreso", "completada")
+
+
+class CerrojoNulo:
+    """Cerrojo que no bloquea: reproduce el gestor sin sincronización"""
+
+    @contextmanager
+    def lectura(self):
+        yield
+
+    @contextmanager
+    def escritura(self):
+        yield
+
+
+def en_paralelo(hilos: int, trabajo, *args) -> list:
+    """Ejecuta trabajo(numero, *args) en varios hilos y devuelve las excepciones producidas"""
+    errores = []
+    barrera = threading.Barrier(hilos)
+
+    def ejecutar(numero: int):
+        barrera.wait()
+        try:
+            trabajo(numero, *args)
+        except Exception as e:
+            errores.append(e)
+
+    lanzados = [threading.Thread(target=ejecutar, args=(numero,)) for numero in range(hilos)]
+    for hilo in lanzados:
+        hilo.start()
+    for hilo in lanzados:
+        hilo.join()
+    return errores
+
+
+def probar_creacion(gestor: GestorTareas, hilos: int, operaciones: int) -> list:
+    ids = []
+
+    def crear(numero: int):
+        for i in range(operaciones // hilos):
+            ids.append(gestor.crear_tarea("simple", f"Hilo {numero} tarea {i}").id)
+
+    fallos = [f"excepción: {e!r}" for e in en_paralelo(hilos, crear)]
+    if len(ids) != len(set(ids)):
+        fallos.append(f"{len(ids) - len(set(ids))} IDs repetidos")
+    if gestor.contar_tareas() != len(ids):
+        fallos.append(f"se crearon {len(ids)} tareas y hay {gestor.contar_tareas()}")
+    return fallos
+
+
+def probar_incrementos(gestor: GestorTareas, hilos: int, operaciones: int) -> list:
+    id_contador = gestor.crear_tarea("simple", "Contador", "0").id
+    por_hilo = operaciones // hilos
+
+    def incrementar(numero: int):
+        for _ in range(por_hilo):
+            # Leer y escribir con el mismo cerrojo: ningún incremento se pierde
+            with gestor.escritura():
+                valor = int(gestor.obtener_tarea(id_contador).descripcion)
+                gestor.actualizar_tarea(id_contador, descripcion=str(valor + 1))
+
+    fallos = [f"excepción: {e!r}" for e in en_paralelo(hilos, incrementar)]
+    final = int(gestor.obtener_tarea(id_contador).descripcion)
+    if final != por_hilo * hilos:
+        fallos.append(f"se esperaban {por_hilo * hilos} incrementos y hay {final} "
+                      f"({por_hilo * hilos - final} perdidos)")
+    return fallos
+
+
+def probar_lecturas(gestor: GestorTareas, hilos: int, operaciones: int) -> list:
+    ids = [tarea["id"] for tarea in gestor.crear_tareas([{"tipo": "simple", "titulo": f"Móvil {i}"} for i in range(200)])]
+    inconsistencias = []
+    escritores = max(1, hilos // 2)
+
+    def trabajar(numero: int):
+        for i in range(operaciones // hilos):
+            if numero < escritores:
+                # Mueve tareas de un estado a otro y crea y elimina tareas
+                gestor.actualizar_tarea(ids[(numero * 7 + i) % len(ids)], estado=ESTADOS[i % 3])
+                if i % 10 == 0:
+                    gestor.eliminar_tarea(gestor.crear_tarea("simple", "Temporal").id)
+            elif i % 2:
+                stats = gestor.obtener_estadisticas()
+                suma = stats["pendientes"] + stats["en_progreso"] + stats["completadas"]
+                if suma != stats["total"] or sum(stats["por_tipo"].values()) != stats["total"]:
+                    inconsistencias.append(f"estadísticas: total {stats['total']}, suma de estados {suma}")
+            else:
+                with gestor.lectura():
+                    pendientes = gestor.listar_tareas(estado="pendiente")
+                    total = gestor.contar_tareas(estado="pendiente")
+                if len(pendientes) != total:
+                    inconsistencias.append(f"listado: {len(pendientes)} tareas y total {total}")
+
+    fallos = [f"excepción: {e!r}" for e in en_paralelo(hilos, trabajar)]
+    if inconsistencias:
+        fallos.append(f"{len(inconsistencias)} lecturas inconsistentes, p. ej. {inconsistencias[0]}")
+    return fallos
+
+
+PRUEBAS = {
+    "creación concurrente": probar_creacion,
+    "incrementos sin pérdidas": probar_incrementos,
+    "lecturas consistentes": probar_lecturas,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--operaciones", type=int, default=4000, help="Operaciones por prueba (entre todos los hilos)")
+    parser.add_argument("--almacen", nargs="+", choices=("memoria", "sqlite"), default=["memoria", "sqlite"])
+    parser.add_argument("--sin-cerrojos", action="store_true", help="Desactiva el cerrojo del gestor")
+    args = parser.parse_args()
+
+    # Cambios de hilo muy frecuentes: las carreras aparecen en pocas operaciones
+    sys.setswitchinterval(1e-6)
+    directorio = tempfile.mkdtemp(prefix="estres_concurrencia_")
+    correcto = True
+    try:
+        os.chdir(directorio)
+        for tipo in args.almacen:
+            print(f"{tipo} ({args.hilos} hilos, {args.operaciones} operaciones por prueba"
+                  f"{', sin cerrojos' if args.sin_cerrojos else ''})")
+            for nombre, prueba in PRUEBAS.items():
+                gestor = GestorTareas(almacen=crear_almacen(
+                    tipo, modo_persistencia="journal", ruta_sqlite=os.path.join(directorio, f"{nombre}.db")
+                ))
+                if args.sin_cerrojos:
+                    gestor._cerrojo = CerrojoNulo()
+                inicio = time.perf_counter()
+                fallos = prueba(gestor, args.hilos, args.operaciones)
+                duracion = time.perf_counter() - inicio
+                gestor.cerrar()
+                for archivo in os.listdir(directorio):
+                    os.remove(os.path.join(directorio, archivo))
+                correcto = correcto and not fallos
+                print(f"  {nombre:<26} {'OK' if not fallos else 'FALLO'}  ({duracion:.2f} s)")
+                for fallo in fallos[:3]:
+                    print(f"    - {fallo}")
+    finally:
+        os.chdir(RAIZ)
+        shutil.rmtree(directorio)
+    sys.exit(0 if correcto else 1)
+
+
+if __name__ == "__main__":
+    main()
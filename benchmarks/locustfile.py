@@ -0,0 +1,40 @@
+"""
+Escenario de carga para locust con la misma mezcla de peticiones que bench_api.py.
+locust no es una dependencia del proyecto: pip install locust
+
+Uso:
+    uvicorn main:app --port 8000
+    locust -f benchmarks/locustfile.py --host http://127.0.0.1:8000 --headless -u 50 -r 10 -t 60s --csv resultados
+"""
+import os
+import random
+import sys
+
+from locust import HttpUser, between
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_api import ESCENARIO, lotes_iniciales
+
+# Tareas que se crean si el servidor no tiene ninguna
+TAREAS_INICIALES = 1000
+
+
+def peticion(nombre: str, metodo: str, ruta: str, cuerpo):
+    """Tarea de locust para una entrada del escenario (las estadísticas se agrupan por nombre)"""
+    def lanzar(usuario: "UsuarioTareas"):
+        usuario.client.request(metodo, ruta.format(id=random.choice(usuario.ids)), json=cuerpo, name=nombre)
+    return lanzar
+
+
+class UsuarioTareas(HttpUser):
+    wait_time = between(0, 0.05)
+    tasks = {peticion(nombre, metodo, ruta, cuerpo): peso for nombre, peso, metodo, ruta, cuerpo in ESCENARIO}
+
+    def on_start(self):
+        self.ids = [tarea["id"] for tarea in self.client.get("/tareas?limit=1000", name="inicio").json()["tareas"]]
+        if not self.ids:
+            for lote in lotes_iniciales(TAREAS_INICIALES):
+                self.client.post("/tareas/bulk", data=lote, headers={"Content-Type": "application/json"},
+                                 name="inicio")
+            self.ids = list(range(1, TAREAS_INICIALES + 1))
@@ -0,0 +1,126 @@
+"""
+Utilidades comunes de la suite de benchmarks (bench_gestor.py, bench_api.py):
+medir operaciones, resumirlas en percentiles, leer la memoria pico y
+guardar los resultados en JSON para compararlos con benchmarks/comparar.py.
+
+Formato del JSON:
+    {"benchmark": "gestor", "fecha": ..., "commit": ..., "python": ..., "plataforma": ...,
+     "cpus": ..., "parametros": {...},
+     "resultados": [{"nombre": "crear_tarea", "almacen": "memoria", "tamano": 1000,
+                     "operaciones": 200, "p50_ms": ..., "p99_ms": ..., "media_ms": ...,
+                     "max_ms": ..., "por_segundo": ..., "rss_pico_kb": ...}, ...]}
+Los campos que no son métricas (nombre, almacen, tamano, modo...) identifican cada resultado.
+"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Campos de un resultado que son medidas (el resto lo identifican)
+METRICAS = ("operaciones", "p50_ms", "p99_ms", "media_ms", "max_ms", "por_segundo", "rss_pico_kb", "errores")
+
+
+def percentil(ordenados: List[float], fraccion: float) -> float:
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * fraccion))]
+
+
+def resumir(nombre: str, tiempos: List[float], duracion: Optional[float] = None, **etiquetas) -> Dict[str, Any]:
+    """
+    Resume los tiempos (en segundos) de cada operación. duracion es el tiempo
+    total transcurrido para calcular el rendimiento (por defecto, la suma de
+    los tiempos: operaciones hechas una detrás de otra).
+    """
+    ordenados = sorted(tiempos)
+    duracion = sum(tiempos) if duracion is None else duracion
+    return {
+        "nombre": nombre,
+        **etiquetas,
+        "operaciones": len(tiempos),
+        "p50_ms": round(percentil(ordenados, 0.50) * 1000, 4),
+        "p99_ms": round(percentil(ordenados, 0.99) * 1000, 4),
+        "media_ms": round(sum(tiempos) / len(tiempos) * 1000, 4),
+        "max_ms": round(ordenados[-1] * 1000, 4),
+        "por_segundo": round(len(tiempos) / duracion, 1) if duracion > 0 else None,
+        "rss_pico_kb": rss_pico_kb(),
+    }
+
+
+def medir(operacion: Callable[[int], Any], repeticiones: int, presupuesto: float = 2.0,
+          minimo: int = 3) -> List[float]:
+    """
+    Ejecuta operacion(i) hasta repeticiones veces y devuelve el tiempo de cada llamada.
+    Se para antes si se agota el presupuesto (segundos), pero hace al menos minimo
+    llamadas: las operaciones lentas con muchas tareas no alargan la suite sin límite.
+    """
+    tiempos = []
+    limite = time.perf_counter() + presupuesto
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        operacion(i)
+        fin = time.perf_counter()
+        tiempos.append(fin - inicio)
+        if fin > limite and len(tiempos) >= minimo:
+            break
+    return tiempos
+
+
+def rss_pico_kb(pid: Optional[int] = None) -> int:
+    """Memoria residente pico (KB) de este proceso o de otro (VmHWM en /proc)"""
+    if pid is None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(f"/proc/{pid}/status") as estado:
+        for linea in estado:
+            if linea.startswith("VmHWM:"):
+                return int(linea.split()[1])
+    return 0
+
+
+def entorno() -> Dict[str, Any]:
+    """Dónde y sobre qué versión del código se ha medido"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def imprimir(resultados: List[Dict[str, Any]]):
+    """Tabla legible de los resultados"""
+    etiquetas = [resultado["nombre"] + "".join(f" {clave}={valor}" for clave, valor in resultado.items()
+                                               if clave != "nombre" and clave not in METRICAS)
+                 for resultado in resultados]
+    ancho = max(map(len, etiquetas), default=0)
+    for resultado, etiqueta in zip(resultados, etiquetas):
+        por_segundo = resultado["por_segundo"]
+        print(f"  {etiqueta:<{ancho}}  p50 {resultado['p50_ms']:10.3f} ms  p99 {resultado['p99_ms']:10.3f} ms  "
+              f"{por_segundo if por_segundo is not None else '-':>10} op/s  "
+              f"RSS {resultado['rss_pico_kb'] / 1024:7.0f} MiB  ({resultado['operaciones']} op)")
+
+
+def guardar(ruta: Optional[str], benchmark: str, parametros: Dict[str, Any], resultados: List[Dict[str, Any]]):
+    """Escribe los resultados en JSON (ruta "-": salida estándar; None: no se guardan)"""
+    if ruta is None:
+        return
+    datos = {"benchmark": benchmark, **entorno(), "parametros": parametros, "resultados": resultados}
+    if ruta == "-":
+        json.dump(datos, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(datos, archivo, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en {ruta}")
@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+def etiqueta(version: Tuple[int, ...]) -> str:
+    """ETag (fuerte) que identifica una versión de los datos"""
+    return '"' + "-".join(format(parte, "x") for parte in version) + '"'
+
+
+def coincide_etag(si_no_coincide: Optional[str], etag: str) -> bool:
+    """
+    Comprueba la cabecera If-None-Match contra la ETag actual.
+    Admite varias ETags separadas por comas, "*" y ETags débiles (W/"...").
+    """
+    if not si_no_coincide:
+        return False
+    for candidata in si_no_coincide.split(","):
+        candidata = candidata.strip()
+        if candidata == "*" or candidata.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class CacheRespuestas:
+    """
+    Caché LRU de respuestas ya serializadas, limitada en bytes.
+    ENCAPSULACIÓN: Las claves incluyen la versión de los datos, así que una
+    respuesta nunca se invalida: cuando los datos cambian deja de pedirse
+    y acaba saliendo de la caché.
+    """
+
+    def __init__(self, capacidad_bytes: int = 32 * 1024 * 1024):
+        self._capacidad = capacidad_bytes
+        # Respuestas más grandes que esto no se guardan (desplazarían todas las demás)
+        self._maximo_respuesta = capacidad_bytes // 4
+        self._respuestas: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._tamano = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._cerrojo = threading.Lock()
+
+    def obtener(self, clave: Hashable) -> Optional[bytes]:
+        with self._cerrojo:
+            contenido = self._respuestas.get(clave)
+            if contenido is not None:
+                self._respuestas.move_to_end(clave)
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+            return contenido
+
+    def guardar(self, clave: Hashable, contenido: bytes):
+        if len(contenido) > self._maximo_respuesta:
+            return
+        with self._cerrojo:
+            anterior = self._respuestas.pop(clave, None)
+            if anterior is not None:
+                self._tamano -= len(anterior)
+            self._respuestas[clave] = contenido
+            self._tamano += len(contenido)
+            while self._tamano > self._capacidad:
+                self._tamano -= len(self._respuestas.popitem(last=False)[1])
+
+    @property
+    def tamano(self) -> int:
+        """Bytes ocupados por las respuestas guardadas"""
+        return self._tamano
@@ -0,0 +1,255 @@
+import gzip
+import hashlib
+import zlib
+from typing import Dict, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from cache_respuestas import CacheRespuestas, coincide_etag
+from metricas import registro_metricas
+
+# brotli es opcional: sin él solo se ofrece gzip
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+# Codificaciones que se pueden ofrecer, de la preferida a la menos preferida
+CODIFICACIONES = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Niveles por defecto para las respuestas dinámicas. Las listas de tareas en JSON son
+# muy repetitivas: gzip 3 ya las reduce ~20 veces y cuesta la mitad que gzip 6, que
+# solo gana un ~8 %; brotli 4 comprime más que gzip 6 a un coste parecido al de gzip 3
+NIVELES = {"gzip": 3, "br": 4}
+# Niveles máximos para el contenido estático, que se comprime una sola vez
+NIVELES_MAXIMOS = {"gzip": 9, "br": 11}
+
+# Respuestas más pequeñas no se comprimen: caben en un paquete y no ganan nada
+MINIMO_BYTES = 1400
+# Los cuerpos más grandes se comprimen en el threadpool para no detener el event loop
+# (zlib y brotli sueltan el GIL mientras comprimen)
+MINIMO_EN_HILO = 64 * 1024
+
+# Tipos de contenido que merece la pena comprimir (text/event-stream no: cada evento
+# tiene que llegar en cuanto se publica)
+_TIPOS_COMPRIMIBLES = ("application/json", "application/x-ndjson", "text/html", "text/plain", "text/css",
+                       "application/javascript")
+
+BYTES_COMPRESION = registro_metricas.contador(
+    "tareas_compresion_bytes_total", "Bytes de las respuestas comprimidas, antes y después de comprimir",
+    ("codificacion", "etapa")
+)
+DURACION_COMPRESION = registro_metricas.histograma(
+    "tareas_compresion_segundos", "Duración de la compresión de las respuestas", ("codificacion",)
+)
+
+
+def elegir_codificacion(aceptadas: Optional[str], disponibles: Sequence[str] = CODIFICACIONES) -> Optional[str]:
+    """
+    Codificación de disponibles que prefiere el cliente según Accept-Encoding
+    (con pesos q y "*"); a igual peso, la primera de disponibles. None: sin comprimir.
+    """
+    if not aceptadas:
+        return None
+    pesos: Dict[str, float] = {}
+    for parte in aceptadas.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        peso = 1.0
+        parametro = parametros.strip()
+        if parametro.startswith("q="):
+            try:
+                peso = float(parametro[2:])
+            except ValueError:
+                peso = 0.0
+        pesos[nombre.strip().lower()] = peso
+    comodin = pesos.get("*", 0.0)
+    mejor, peso_mejor = None, 0.0
+    for codificacion in disponibles:
+        peso = pesos.get(codificacion, comodin)
+        if peso > peso_mejor:
+            mejor, peso_mejor = codificacion, peso
+    return mejor
+
+
+def comprimir(contenido: bytes, codificacion: str, nivel: Optional[int] = None) -> bytes:
+    """Comprime un cuerpo completo con gzip o brotli"""
+    nivel = NIVELES[codificacion] if nivel is None else nivel
+    with DURACION_COMPRESION.medir(codificacion):
+        if codificacion == "br":
+            comprimido = brotli.compress(contenido, quality=nivel)
+        else:
+            # mtime=0: el mismo contenido da siempre los mismos bytes
+            comprimido = gzip.compress(contenido, compresslevel=nivel, mtime=0)
+    BYTES_COMPRESION.incrementar(codificacion, "entrada", cantidad=len(contenido))
+    BYTES_COMPRESION.incrementar(codificacion, "salida", cantidad=len(comprimido))
+    return comprimido
+
+
+class CompresorFlujo:
+    """
+    Comprime una respuesta que se envía por trozos (streaming): cada trozo sale
+    comprimido en cuanto llega, sin esperar al final del cuerpo
+    """
+
+    def __init__(self, codificacion: str, nivel: Optional[int] = None):
+        self.codificacion = codificacion
+        nivel = NIVELES[codificacion] if nivel is None else nivel
+        if codificacion == "br":
+            self._compresor = brotli.Compressor(quality=nivel)
+        else:
+            self._compresor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, trozo: bytes, final: bool = False) -> bytes:
+        with DURACION_COMPRESION.medir(self.codificacion):
+            if self.codificacion == "br":
+                comprimido = self._compresor.process(trozo)
+                comprimido += self._compresor.finish() if final else self._compresor.flush()
+            else:
+                comprimido = self._compresor.compress(trozo)
+                comprimido += self._compresor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        BYTES_COMPRESION.incrementar(self.codificacion, "entrada", cantidad=len(trozo))
+        BYTES_COMPRESION.incrementar(self.codificacion, "salida", cantidad=len(comprimido))
+        return comprimido
+
+
+class PaginaPrecomprimida:
+    """
+    Contenido estático (la página principal ya renderizada) guardado en memoria
+    junto con sus versiones comprimidas, calculadas una vez al arrancar con el nivel máximo.
+    ENCAPSULACIÓN: Cada versión tiene su propia ETag fuerte (son bytes distintos);
+    con If-None-Match se responde 304 sin cuerpo.
+    """
+
+    def __init__(self, contenido: bytes, tipo: str, max_age: int = 300):
+        resumen = hashlib.sha256(contenido).hexdigest()[:16]
+        self._tipo = tipo
+        self._cache_control = f"public, max-age={max_age}"
+        # codificación (None: sin comprimir) -> (ETag, cuerpo)
+        self._versiones: Dict[Optional[str], Tuple[str, bytes]] = {None: (f'"{resumen}"', contenido)}
+        for codificacion in CODIFICACIONES:
+            comprimido = comprimir(contenido, codificacion, NIVELES_MAXIMOS[codificacion])
+            if len(comprimido) < len(contenido):
+                self._versiones[codificacion] = (f'"{resumen}-{codificacion}"', comprimido)
+
+    def respuesta(self, aceptadas: Optional[str], si_no_coincide: Optional[str]) -> Response:
+        codificacion = elegir_codificacion(aceptadas, [c for c in CODIFICACIONES if c in self._versiones])
+        etag, cuerpo = self._versiones[codificacion]
+        cabeceras = {"ETag": etag, "Cache-Control": self._cache_control, "Vary": "Accept-Encoding"}
+        if coincide_etag(si_no_coincide, etag):
+            return Response(status_code=304, headers=cabeceras)
+        if codificacion is not None:
+            cabeceras["Content-Encoding"] = codificacion
+        return Response(content=cuerpo, media_type=self._tipo, headers=cabeceras)
+
+
+class MiddlewareCompresion:
+    """
+    Middleware ASGI que comprime (gzip o brotli, según Accept-Encoding) las respuestas
+    de las rutas que empiezan por prefijos: las de un solo cuerpo si pasan de
+    minimo bytes, y las que van por trozos (exportación NDJSON) trozo a trozo.
+    No toca los eventos (text/event-stream) ni las respuestas ya codificadas.
+    ENCAPSULACIÓN: Las respuestas con ETag (GET condicional) identifican su contenido,
+    así que su versión comprimida se guarda en cache y no se vuelve a comprimir.
+    Al comprimir, la ETag pasa a ser débil (W/"..."): el contenido es el mismo,
+    pero no los bytes.
+    """
+
+    def __init__(self, app, prefijos: Sequence[str] = ("/tareas",), minimo: int = MINIMO_BYTES,
+                 niveles: Optional[Dict[str, int]] = None, cache: Optional[CacheRespuestas] = None):
+        self.app = app
+        self._prefijos = tuple(prefijos)
+        self._minimo = minimo
+        self._niveles = dict(NIVELES, **(niveles or {}))
+        self._cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self._prefijos):
+            await self.app(scope, receive, send)
+            return
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding"))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+        nivel = self._niveles[codificacion]
+        # El inicio de la respuesta se retiene hasta ver el primer trozo del cuerpo
+        estado = {"inicio": None, "flujo": None, "directo": False}
+
+        async def enviar(mensaje):
+            if estado["directo"]:
+                await send(mensaje)
+                return
+            if mensaje["type"] == "http.response.start":
+                cabeceras = MutableHeaders(scope=mensaje)
+                tipo = cabeceras.get("content-type", "")
+                # Depende de Accept-Encoding aunque al final no se comprima
+                cabeceras.add_vary_header("Accept-Encoding")
+                self._debilitar_etag(cabeceras)
+                if (mensaje["status"] < 200 or mensaje["status"] in (204, 304) or "content-encoding" in cabeceras
+                        or not tipo.startswith(_TIPOS_COMPRIMIBLES)):
+                    estado["directo"] = True
+                    await send(mensaje)
+                else:
+                    estado["inicio"] = mensaje
+                return
+            if mensaje["type"] != "http.response.body":
+                await send(mensaje)
+                return
+            cuerpo = mensaje.get("body", b"")
+            mas = mensaje.get("more_body", False)
+            if estado["flujo"] is not None:
+                await send({"type": "http.response.body", "more_body": mas,
+                            "body": await self._comprimir_trozo(estado["flujo"], cuerpo, not mas)})
+                return
+            inicio = estado["inicio"]
+            cabeceras = MutableHeaders(scope=inicio)
+            if not mas:
+                # Cuerpo completo en un solo mensaje
+                if len(cuerpo) < self._minimo:
+                    estado["directo"] = True
+                    await send(inicio)
+                    await send(mensaje)
+                    return
+                comprimido = await self._comprimir(cuerpo, codificacion, nivel, cabeceras.get("etag"))
+                cabeceras["Content-Encoding"] = codificacion
+                cabeceras["Content-Length"] = str(len(comprimido))
+                await send(inicio)
+                await send({"type": "http.response.body", "body": comprimido})
+                return
+            # Respuesta por trozos: se comprime cada uno según llega
+            estado["flujo"] = CompresorFlujo(codificacion, nivel)
+            cabeceras["Content-Encoding"] = codificacion
+            if "content-length" in cabeceras:
+                del cabeceras["Content-Length"]
+            await send(inicio)
+            await send({"type": "http.response.body", "more_body": True,
+                        "body": await self._comprimir_trozo(estado["flujo"], cuerpo, False)})
+
+        await self.app(scope, receive, enviar)
+
+    @staticmethod
+    def _debilitar_etag(cabeceras: MutableHeaders):
+        etag = cabeceras.get("etag")
+        if etag and not etag.startswith("W/"):
+            cabeceras["ETag"] = "W/" + etag
+
+    async def _comprimir(self, cuerpo: bytes, codificacion: str, nivel: int, etag: Optional[str]) -> bytes:
+        clave = (etag, codificacion, nivel)
+        if etag and self._cache is not None:
+            comprimido = self._cache.obtener(clave)
+            if comprimido is not None:
+                return comprimido
+        if len(cuerpo) >= MINIMO_EN_HILO:
+            comprimido = await run_in_threadpool(comprimir, cuerpo, codificacion, nivel)
+        else:
+            comprimido = comprimir(cuerpo, codificacion, nivel)
+        if etag and self._cache is not None:
+            self._cache.guardar(clave, comprimido)
+        return comprimido
+
+    @staticmethod
+    async def _comprimir_trozo(flujo: CompresorFlujo, trozo: bytes, final: bool) -> bytes:
+        if len(trozo) >= MINIMO_EN_HILO:
+            return await run_in_threadpool(flujo.comprimir, trozo, final)
+        return flujo.comprimir(trozo, final)
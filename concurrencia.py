@@ -0,0 +1,107 @@
+import functools
+import threading
+from contextlib import contextmanager
+
+
+class CerrojoLecturaEscritura:
+    """
+    Cerrojo de lectura/escritura: varios lectores a la vez o un único escritor.
+    - Da prioridad a los escritores que esperan, para que las lecturas continuas no los bloqueen.
+    - Es reentrante por hilo: quien ya lee puede volver a leer, y quien escribe puede leer y escribir.
+    - No se puede pasar de lectura a escritura (dos lectores que lo intentan se bloquearían).
+    """
+
+    def __init__(self):
+        self._condicion = threading.Condition(threading.Lock())
+        self._lectores = 0
+        self._escritores_esperando = 0
+        # Hilo que tiene el cerrojo de escritura y cuántas veces lo ha tomado
+        self._escritor = None
+        self._profundidad_escritura = 0
+        # Por hilo: pila con True por cada lectura contada en _lectores
+        self._local = threading.local()
+
+    def _pila_lecturas(self) -> list:
+        pila = getattr(self._local, "pila", None)
+        if pila is None:
+            pila = self._local.pila = []
+        return pila
+
+    def adquirir_lectura(self):
+        pila = self._pila_lecturas()
+        if self._escritor == threading.get_ident():
+            # El escritor ya excluye a todos: la lectura no cuenta como lector
+            pila.append(False)
+            return
+        with self._condicion:
+            # Un hilo que ya lee no espera a los escritores (se bloquearían mutuamente)
+            if not any(pila):
+                while self._escritor is not None or self._escritores_esperando:
+                    self._condicion.wait()
+            self._lectores += 1
+        pila.append(True)
+
+    def liberar_lectura(self):
+        if self._pila_lecturas().pop():
+            with self._condicion:
+                self._lectores -= 1
+                if self._lectores == 0:
+                    self._condicion.notify_all()
+
+    def adquirir_escritura(self):
+        hilo = threading.get_ident()
+        if self._escritor == hilo:
+            self._profundidad_escritura += 1
+            return
+        if any(self._pila_lecturas()):
+            raise RuntimeError("No se puede pasar de lectura a escritura con el cerrojo tomado")
+        with self._condicion:
+            self._escritores_esperando += 1
+            try:
+                while self._escritor is not None or self._lectores:
+                    self._condicion.wait()
+            finally:
+                self._escritores_esperando -= 1
+            self._escritor = hilo
+            self._profundidad_escritura = 1
+
+    def liberar_escritura(self):
+        self._profundidad_escritura -= 1
+        if self._profundidad_escritura == 0:
+            with self._condicion:
+                self._escritor = None
+                self._condicion.notify_all()
+
+    @contextmanager
+    def lectura(self):
+        self.adquirir_lectura()
+        try:
+            yield
+        finally:
+            self.liberar_lectura()
+
+    @contextmanager
+    def escritura(self):
+        self.adquirir_escritura()
+        try:
+            yield
+        finally:
+            self.liberar_escritura()
+
+
+def con_lectura(metodo):
+    """Decorador: ejecuta el método con el cerrojo de lectura del objeto (self._cerrojo)"""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._cerrojo.lectura():
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
+
+def con_escritura(metodo):
+    """Decorador: ejecuta el método con el cerrojo de escritura del objeto (self._cerrojo)"""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._cerrojo.escritura():
+            return metodo(self, *args, **kwargs)
+    return envoltura
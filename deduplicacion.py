@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from metricas import registro_metricas
+
+CONSULTAS_COMPARTIDAS = registro_metricas.contador(
+    "tareas_consultas_compartidas_total",
+    "Consultas de lectura por resultado: calculadas o compartidas con otra idéntica en curso", ("resultado",)
+)
+PETICIONES_IDEMPOTENTES = registro_metricas.contador(
+    "tareas_idempotencia_total", "Peticiones con Idempotency-Key por resultado", ("resultado",)
+)
+
+# Cabecera que marca las respuestas repetidas desde la caché de Idempotency-Key
+CABECERA_REPETIDA = b"idempotent-replayed"
+
+
+class ConsultasCompartidas:
+    """
+    Agrupa las consultas idénticas simultáneas (single-flight): la primera se calcula
+    y las que llegan mientras tanto esperan su resultado en lugar de repetirla.
+    ENCAPSULACIÓN: Es un observador del gestor. Cada cambio de las tareas abre una
+    generación nueva y una consulta solo se comparte dentro de su generación: quien
+    llega después de un cambio no recibe un resultado calculado antes.
+    Se usa desde el event loop (sin cerrojos); el cálculo se ejecuta como una tarea
+    asyncio aparte, así que si la petición que lo empezó se cancela las demás lo reciben igual.
+    """
+
+    def __init__(self):
+        self._en_curso: Dict[Hashable, asyncio.Task] = {}
+        self._generacion = 0
+
+    def __call__(self, operacion: str, id_tarea: int, tarea, version: int):
+        # Con el cerrojo de escritura del gestor: solo avanza un contador
+        self._generacion += 1
+
+    async def ejecutar(self, clave: Hashable, funcion: Callable[..., Awaitable], *args):
+        """Resultado de await funcion(*args), compartido con las llamadas con la misma clave en curso"""
+        clave = (clave, self._generacion)
+        tarea = self._en_curso.get(clave)
+        if tarea is not None:
+            CONSULTAS_COMPARTIDAS.incrementar("compartida")
+        else:
+            CONSULTAS_COMPARTIDAS.incrementar("calculada")
+            tarea = asyncio.ensure_future(funcion(*args))
+            self._en_curso[clave] = tarea
+            tarea.add_done_callback(lambda terminada: self._terminar(clave, terminada))
+        return await asyncio.shield(tarea)
+
+    def _terminar(self, clave: Hashable, tarea: asyncio.Task):
+        del self._en_curso[clave]
+        # Marca la excepción como recogida aunque todas las peticiones se hayan cancelado
+        if not tarea.cancelled():
+            tarea.exception()
+
+    def __len__(self) -> int:
+        return len(self._en_curso)
+
+
+class ResultadosIdempotentes:
+    """
+    Respuestas de las peticiones con Idempotency-Key, con caducidad (ttl segundos)
+    y límites de entradas y de bytes: al pasarse sale la menos usada (LRU).
+    Cada entrada guarda la huella de la petición (método, ruta y cuerpo) para
+    detectar una clave reutilizada con otra petición.
+    """
+
+    def __init__(self, ttl: float = 24 * 3600, max_entradas: int = 10000,
+                 capacidad_bytes: int = 64 * 1024 * 1024):
+        self._ttl = ttl
+        self._max_entradas = max_entradas
+        self._capacidad = capacidad_bytes
+        # Respuestas más grandes que esto no se guardan (desplazarían todas las demás)
+        self._maximo_respuesta = capacidad_bytes // 4
+        # clave -> (caduca, huella, estado, cabeceras, cuerpo)
+        self._respuestas: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tamano = 0
+
+    def obtener(self, clave: str) -> Optional[tuple]:
+        """(huella, estado, cabeceras, cuerpo) guardados con la clave, o None"""
+        entrada = self._respuestas.get(clave)
+        if entrada is None:
+            return None
+        if entrada[0] <= time.monotonic():
+            self._quitar(clave)
+            return None
+        self._respuestas.move_to_end(clave)
+        return entrada[1:]
+
+    def guardar(self, clave: str, huella: bytes, estado: int, cabeceras: List[Tuple[bytes, bytes]],
+                cuerpo: bytes) -> bool:
+        if len(cuerpo) > self._maximo_respuesta:
+            return False
+        self._quitar(clave)
+        self._respuestas[clave] = (time.monotonic() + self._ttl, huella, estado, cabeceras, cuerpo)
+        self._tamano += len(cuerpo)
+        ahora = time.monotonic()
+        while self._respuestas and (len(self._respuestas) > self._max_entradas or self._tamano > self._capacidad):
+            self._quitar(next(iter(self._respuestas)))
+        # Las caducadas salen también cuando son las más antiguas
+        while self._respuestas and next(iter(self._respuestas.values()))[0] <= ahora:
+            self._quitar(next(iter(self._respuestas)))
+        return True
+
+    def _quitar(self, clave: str):
+        entrada = self._respuestas.pop(clave, None)
+        if entrada is not None:
+            self._tamano -= len(entrada[4])
+
+    def __len__(self) -> int:
+        return len(self._respuestas)
+
+    @property
+    def tamano(self) -> int:
+        """Bytes ocupados por las respuestas guardadas"""
+        return self._tamano
+
+
+def _respuesta_error(estado: int, detalle: str) -> Tuple[dict, dict]:
+    cuerpo = json.dumps({"detail": detalle}, ensure_ascii=False).encode("utf-8")
+    return (
+        {"type": "http.response.start", "status": estado,
+         "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(cuerpo)).encode())]},
+        {"type": "http.response.body", "body": cuerpo},
+    )
+
+
+class MiddlewareIdempotencia:
+    """
+    Middleware ASGI para las peticiones que modifican datos (POST, PUT, PATCH, DELETE)
+    con la cabecera Idempotency-Key: la primera se ejecuta y su respuesta se guarda;
+    los reintentos con la misma clave reciben esa respuesta (con Idempotent-Replayed: true)
+    sin volver a pasar por la aplicación, así que no crean tareas duplicadas ni escriben.
+    - Misma clave con otra petición (método, ruta o cuerpo distintos): 422.
+    - Misma clave mientras la primera todavía se ejecuta: 409 (el cliente reintenta después).
+    - Las respuestas 5xx no se guardan: el reintento vuelve a ejecutar la petición.
+    Las claves y respuestas viven en la memoria de cada proceso.
+    """
+
+    def __init__(self, app, resultados: ResultadosIdempotentes,
+                 metodos: Tuple[str, ...] = ("POST", "PUT", "PATCH", "DELETE"), max_clave: int = 255):
+        self.app = app
+        self._resultados = resultados
+        self._metodos = metodos
+        self._max_clave = max_clave
+        # Claves de las peticiones que se están ejecutando
+        self._en_curso: set = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self._metodos:
+            await self.app(scope, receive, send)
+            return
+        clave = next((valor.decode("latin-1") for nombre, valor in scope["headers"]
+                      if nombre == b"idempotency-key"), None)
+        if clave is None:
+            await self.app(scope, receive, send)
+            return
+        if not clave or len(clave) > self._max_clave:
+            await self._enviar_error(send, 400, f"Idempotency-Key debe tener entre 1 y {self._max_clave} caracteres")
+            return
+
+        huella = hashlib.sha256(f"{scope['method']} {scope['path']}?".encode()
+                                + scope.get("query_string", b"") + b"\n")
+        guardada = self._resultados.obtener(clave)
+        if guardada is not None or clave in self._en_curso:
+            # Hay que leer el cuerpo para comprobar que es la misma petición
+            while True:
+                mensaje = await receive()
+                huella.update(mensaje.get("body", b""))
+                if not mensaje.get("more_body", False):
+                    break
+            if clave in self._en_curso and guardada is None:
+                PETICIONES_IDEMPOTENTES.incrementar("en_curso")
+                await self._enviar_error(send, 409, "Ya hay una petición en curso con esta Idempotency-Key")
+                return
+            huella_guardada, estado, cabeceras, cuerpo = guardada
+            if huella.digest() != huella_guardada:
+                PETICIONES_IDEMPOTENTES.incrementar("otra_peticion")
+                await self._enviar_error(send, 422, "Idempotency-Key ya usada con otra petición")
+                return
+            PETICIONES_IDEMPOTENTES.incrementar("repetida")
+            await send({"type": "http.response.start", "status": estado,
+                        "headers": cabeceras + [(CABECERA_REPETIDA, b"true")]})
+            await send({"type": "http.response.body", "body": cuerpo})
+            return
+
+        PETICIONES_IDEMPOTENTES.incrementar("nueva")
+        respuesta = {"estado": None, "cabeceras": [], "trozos": []}
+
+        async def recibir():
+            # El cuerpo se resume a medida que la aplicación lo lee
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                huella.update(mensaje.get("body", b""))
+            return mensaje
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                # Copia de las cabeceras: los middlewares exteriores modifican el mensaje (p. ej. al comprimir)
+                respuesta["estado"] = mensaje["status"]
+                respuesta["cabeceras"] = list(mensaje.get("headers", ()))
+            elif mensaje["type"] == "http.response.body":
+                respuesta["trozos"].append(mensaje.get("body", b""))
+            await send(mensaje)
+
+        self._en_curso.add(clave)
+        try:
+            await self.app(scope, recibir, enviar)
+        finally:
+            self._en_curso.discard(clave)
+        if respuesta["estado"] is not None and respuesta["estado"] < 500:
+            self._resultados.guardar(clave, huella.digest(), respuesta["estado"], respuesta["cabeceras"],
+                                     b"".join(respuesta["trozos"]))
+
+    @staticmethod
+    async def _enviar_error(send, estado: int, detalle: str):
+        inicio, cuerpo = _respuesta_error(estado, detalle)
+        await send(inicio)
+        await send(cuerpo)
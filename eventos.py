@@ -0,0 +1,133 @@
+import asyncio
+from collections import deque
+from typing import List, Optional, Set
+
+# Políticas cuando la cola de un suscriptor se llena (cliente lento):
+# - "resincronizar": se descartan sus eventos pendientes y recibe un único evento
+#   "resincronizar" para que vuelva a pedir el estado completo
+# - "desconectar": se cierra su conexión (EventSource se reconecta solo)
+POLITICAS = ("resincronizar", "desconectar")
+
+MENSAJE_RESINCRONIZAR = b"event: resincronizar\ndata: {}\n\n"
+# Comentario SSE periódico: mantiene viva la conexión y detecta clientes desconectados
+MENSAJE_LATIDO = b": latido\n\n"
+
+
+def mensaje_sse(evento: str, id_evento: int, datos: bytes) -> bytes:
+    """Codifica un evento en formato text/event-stream (datos es JSON en una sola línea)"""
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (id_evento, evento.encode(), datos)
+
+
+class Suscripcion:
+    """
+    Cola acotada de mensajes de un suscriptor.
+    ENCAPSULACIÓN: Solo guarda referencias a mensajes ya codificados, compartidos
+    por todos los suscriptores; la memoria por conexión es la cola y un asyncio.Event.
+    """
+    __slots__ = ("_cola", "_aviso", "_maximo", "cerrada")
+
+    def __init__(self, maximo: int):
+        self._cola: deque = deque()
+        self._aviso = asyncio.Event()
+        self._maximo = maximo
+        self.cerrada = False
+
+    def entregar(self, mensaje: bytes) -> bool:
+        """Encola un mensaje; False si la cola está llena"""
+        if len(self._cola) >= self._maximo:
+            return False
+        self._cola.append(mensaje)
+        self._aviso.set()
+        return True
+
+    def resincronizar(self):
+        self._cola.clear()
+        self._cola.append(MENSAJE_RESINCRONIZAR)
+        self._aviso.set()
+
+    def cerrar(self):
+        self.cerrada = True
+        self._aviso.set()
+
+    def pendientes(self) -> int:
+        return len(self._cola)
+
+    async def recibir(self) -> List[bytes]:
+        """Espera y devuelve todos los mensajes pendientes (lista vacía si se ha cerrado)"""
+        while not self._cola and not self.cerrada:
+            self._aviso.clear()
+            await self._aviso.wait()
+        if self.cerrada:
+            return []
+        mensajes = list(self._cola)
+        self._cola.clear()
+        return mensajes
+
+
+class BusEventos:
+    """
+    Reparto (fan-out) de eventos a los suscriptores de un event loop.
+    publicar() se puede llamar desde cualquier hilo: los mensajes se reparten
+    en el event loop en el mismo orden en que se publicaron.
+    """
+
+    def __init__(self, maximo_cola: int = 256, politica: str = "resincronizar", latido: float = 15.0):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de eventos no válida: {politica}")
+        self._maximo_cola = maximo_cola
+        self._politica = politica
+        self._latido = latido
+        self._suscripciones: Set[Suscripcion] = set()
+        self._bucle: Optional[asyncio.AbstractEventLoop] = None
+        self._tarea_latido: Optional[asyncio.Task] = None
+        self.descartados = 0
+
+    def iniciar(self):
+        """Asocia el bus al event loop en ejecución (en el arranque de la aplicación)"""
+        self._bucle = asyncio.get_running_loop()
+        self._tarea_latido = self._bucle.create_task(self._latir())
+
+    def detener(self):
+        """Cierra todas las suscripciones (sus respuestas terminan)"""
+        if self._tarea_latido is not None:
+            self._tarea_latido.cancel()
+        for suscripcion in self._suscripciones:
+            suscripcion.cerrar()
+        self._suscripciones.clear()
+        self._bucle = None
+
+    def suscribir(self) -> Suscripcion:
+        suscripcion = Suscripcion(self._maximo_cola)
+        self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        self._suscripciones.discard(suscripcion)
+
+    def suscriptores(self) -> int:
+        return len(self._suscripciones)
+
+    def publicar(self, evento: str, id_evento: int, datos: bytes):
+        """Codifica el evento una sola vez y lo reparte en el event loop"""
+        if self._bucle is None:
+            return
+        self._bucle.call_soon_threadsafe(self._repartir, mensaje_sse(evento, id_evento, datos))
+
+    def _repartir(self, mensaje: bytes):
+        for suscripcion in tuple(self._suscripciones):
+            if suscripcion.entregar(mensaje):
+                continue
+            self.descartados += 1
+            if self._politica == "resincronizar":
+                suscripcion.resincronizar()
+            else:
+                suscripcion.cerrar()
+                self._suscripciones.discard(suscripcion)
+
+    async def _latir(self):
+        while True:
+            await asyncio.sleep(self._latido)
+            for suscripcion in self._suscripciones:
+                # Solo a quien no tiene nada pendiente: el latido no ocupa sitio en la cola
+                if not suscripcion.pendientes():
+                    suscripcion.entregar(MENSAJE_LATIDO)
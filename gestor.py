@@ -1,34 +1,159 @@
-import json
-from typing import List, Optional, Dict, Any
-from datetime import datetime
-from models import TareaBase, TareaSimple, TareaPrioritaria, TareaConFecha, EstadoTarea, PrioridadTarea
+import os
+import threading
+import time
+from concurrent.futures import Future
+from itertools import chain
+from typing import List, Optional, Dict, Any, Callable, Iterator, Set, Tuple
+from datetime import datetime, timedelta
+from models import TareaBase, TareaSimple, TareaPrioritaria, TareaConFecha, EstadoTarea, PrioridadTarea, a_epoca_us
+from persistencia import Persistencia
+from almacenamiento import AlmacenTareas, AlmacenMemoria
+from concurrencia import CerrojoLecturaEscritura, con_lectura, con_escritura
+from metricas import registro_metricas, cronometrado
+from analitica import VistaColumnar
+from archivo import ArchivoTareas
+from historial import HistorialTareas
+
+# Nombre de la clase de cada tipo de tarea que acepta la API
+TIPOS_TAREA = {
+    "simple": TareaSimple.__name__,
+    "prioritaria": TareaPrioritaria.__name__,
+    "con_fecha": TareaConFecha.__name__,
+}
+
+# Duración de las operaciones del gestor (incluida la espera del cerrojo), en GET /metrics
+DURACION_OPERACION = registro_metricas.histograma(
+    "tareas_gestor_operacion_segundos", "Duración de las operaciones de GestorTareas", ("operacion",)
+)
+medido = cronometrado(DURACION_OPERACION)
 
 class GestorTareas:
     """
     ENCAPSULACIÓN: Gestiona una colección privada de tareas
     ABSTRACCIÓN: Proporciona una interfaz simple para operaciones CRUD
+    
+    Se puede usar desde varios hilos: las consultas toman el cerrojo de lectura
+    y las modificaciones el de escritura, así que cada operación ve un estado
+    consistente y ninguna modificación se pierde.
     """
     
-    def __init__(self):
-        # ENCAPSULACIÓN: Lista privada de tareas
-        self._tareas: Dict[int, TareaBase] = {}
-        self._siguiente_id = 1
+    def __init__(self, persistencia: Optional[Persistencia] = None, almacen: Optional[AlmacenTareas] = None,
+                 archivo: Optional[ArchivoTareas] = None, historial: Optional[HistorialTareas] = None):
+        # ENCAPSULACIÓN: Almacén privado de tareas
+        # ABSTRACCIÓN: El gestor no conoce el motor concreto de almacenamiento
+        self._almacen = almacen if almacen is not None else AlmacenMemoria(persistencia)
+        # Varios lectores a la vez o un único escritor
+        self._cerrojo = CerrojoLecturaEscritura()
+        # Versiones: un contador que crece con cada cambio y, por tarea, el valor
+        # del contador en su último cambio (las que no han cambiado desde el arranque no
+        # aparecen). El proceso y el momento de arranque distinguen versiones de otras ejecuciones.
+        self._origen = (os.getpid(), time.time_ns())
+        self._version = 0
+        self._versiones: Dict[int, int] = {}
+        # Observadores de cambios y cambios retenidos mientras se aplica un lote
+        self._observadores: List[Callable[[str, int, Optional[TareaBase], int], None]] = []
+        self._cambios_lote: Optional[List[tuple]] = None
+        # Instante hasta el que se han procesado los vencimientos (None: nunca)
+        self._vencimientos_hasta: Optional[datetime] = None
+        # Vista columnar para las series de estadísticas: se construye en la primera
+        # consulta y después se actualiza con cada cambio (None hasta entonces)
+        self._columnas: Optional[VistaColumnar] = None
+        self._version_columnas: Optional[int] = None
+        self._cerrojo_columnas = threading.Lock()
+        # Archivo de las tareas completadas hace tiempo (None: sin archivo) e IDs archivados
+        # que se han vuelto a modificar: están otra vez en el almacén, y su copia archivada
+        # se descarta en el siguiente archivado
+        self._archivo = archivo
+        self._restauradas: Set[int] = set()
+        # Historial de cambios de cada tarea (None: sin historial)
+        self._historial = historial
         self.cargar_tareas()
+    
+    def lectura(self):
+        """
+        Cerrojo de lectura para agrupar varias consultas (y su serialización)
+        en una vista consistente: with gestor.lectura(): ...
+        """
+        return self._cerrojo.lectura()
+    
+    def escritura(self):
+        """Cerrojo de escritura para leer y modificar tareas sin que otro hilo intervenga"""
+        return self._cerrojo.escritura()
 
     def _generar_id(self) -> int:
         """Método privado para generar IDs únicos"""
-        id_actual = self._siguiente_id
-        self._siguiente_id += 1
-        return id_actual
+        return self._almacen.generar_id()
+    
+    def agregar_observador(self, observador: Callable[[str, int, Optional[TareaBase], int], None]):
+        """
+        Registra una función observador(operacion, id_tarea, tarea, version) que se llama
+        tras cada cambio: operacion es "crear", "actualizar", "completar", "eliminar"
+        (con tarea None), "vencer" (ha llegado su fecha límite, ver procesar_vencimientos)
+        o "archivar" (con tarea None, ver archivar_completadas). Se llama en el hilo que hace
+        el cambio y con el cerrojo de escritura tomado, así que debe ser rápida y no usar el gestor.
+        """
+        self._observadores.append(observador)
+    
+    def _anotar_cambio(self, operacion: str, id_tarea: int, tarea: Optional[TareaBase] = None):
+        """
+        Método privado que avanza las versiones tras modificar una tarea (con el cerrojo
+        de escritura) y avisa a los observadores; dentro de un lote, al terminarlo
+        """
+        self._version += 1
+        self._versiones[id_tarea] = self._version
+        cambio = (operacion, id_tarea, tarea, self._version)
+        if self._cambios_lote is not None:
+            self._cambios_lote.append(cambio)
+        else:
+            self._notificar(cambio)
+    
+    def _notificar(self, cambio: tuple):
+        operacion, id_tarea, tarea, _ = cambio
+        # La vista columnar (si ya se ha construido) y el historial se actualizan antes que los observadores.
+        # Una tarea archivada no cambia: su fila sigue contando en las series
+        if self._columnas is not None and operacion != "archivar":
+            if tarea is None:
+                self._columnas.quitar(id_tarea)
+            else:
+                self._columnas.actualizar(id_tarea, tarea.valores_analitica())
+        if self._historial is not None:
+            self._historial.registrar(operacion, id_tarea, tarea, self._almacen.version_externa())
+        for observador in self._observadores:
+            observador(*cambio)
+    
+    @con_lectura
+    def version(self) -> tuple:
+        """
+        Versión de la colección completa: cambia con cualquier creación, modificación
+        o eliminación, con los cambios de otros procesos y cuando vence alguna tarea
+        (el campo "vencida" y las estadísticas dependen de la hora)
+        """
+        return self._origen + (self._almacen.version_externa(), self._version,
+                               self._almacen.contar_vencidas(self._ahora_vencimientos()))
+    
+    @con_lectura
+    def version_tarea(self, id_tarea: int) -> Optional[tuple]:
+        """Versión de una tarea (None si no existe): cambia cuando cambia su respuesta"""
+        tarea = self._almacen.obtener(id_tarea)
+        if tarea is None:
+            # Una tarea archivada no cambia: su versión es el bloque del archivo en que está
+            if self._archivo is not None and self._archivo.contiene(id_tarea):
+                return self._origen + (self._almacen.version_externa(), 0, 0, self._archivo.bloque_de(id_tarea))
+            return None
+        return self._origen + (self._almacen.version_externa(), self._versiones.get(id_tarea, 0),
+                               int(tarea.esta_vencida()))
     
     # POLIMORFISMO: Método que acepta diferentes tipos de tareas
+    @medido
+    @con_escritura
     def crear_tarea(self, tipo: str, titulo: str, descripcion: str = "", **kwargs) -> TareaBase:
         """
         Crea una tarea según el tipo especificado
         POLIMORFISMO: Maneja diferentes tipos de tareas de forma uniforme
         """
-        if not titulo.strip():
-            raise ValueError("El título no puede estar vacío")
+        error = self._validar_creacion({"titulo": titulo})
+        if error:
+            raise ValueError(error)
         
         id_tarea = self._generar_id()
         
@@ -54,38 +179,130 @@ class GestorTareas:
             # Por defecto, crear tarea simple
             tarea = TareaSimple(id_tarea, titulo, descripcion)
         
-        self._tareas[id_tarea] = tarea
-        self.guardar_tareas()
+        # Estado inicial opcional (por ejemplo, al importar tareas exportadas)
+        if kwargs.get("estado"):
+            try:
+                tarea.estado = EstadoTarea(kwargs["estado"])
+            except ValueError:
+                pass  # Ignorar estados inválidos
+        
+        self._almacen.insertar(tarea)
+        self._anotar_cambio("crear", tarea.id, tarea)
         return tarea
     
+    @staticmethod
+    def _validar_creacion(datos: Dict[str, Any]) -> Optional[str]:
+        """Método privado que devuelve el motivo por el que no se puede crear la tarea"""
+        if not str(datos.get("titulo", "")).strip():
+            return "El título no puede estar vacío"
+        return None
+    
+    @staticmethod
+    def _validar_actualizacion(datos: Dict[str, Any]) -> Optional[str]:
+        """
+        Método privado que devuelve el motivo por el que actualizar_tarea fallaría con estos
+        campos (el setter del título es el único que rechaza valores: estados, prioridades
+        y fechas no válidos se ignoran)
+        """
+        if "titulo" in datos and not str(datos["titulo"]).strip():
+            return "El título no puede estar vacío"
+        return None
+    
+    @medido
+    @con_lectura
     def obtener_tarea(self, id_tarea: int) -> Optional[TareaBase]:
-        """Obtiene una tarea por su ID"""
-        return self._tareas.get(id_tarea)
+        """Obtiene una tarea por su ID (también si está archivada)"""
+        tarea = self._almacen.obtener(id_tarea)
+        if tarea is None and self._archivo is not None:
+            tarea = self._archivo.obtener(id_tarea)
+        return tarea
+    
+    def _existe(self, id_tarea: int) -> bool:
+        """Método privado que comprueba si una tarea está en el almacén o en el archivo"""
+        return (self._almacen.obtener(id_tarea) is not None
+                or (self._archivo is not None and self._archivo.contiene(id_tarea)))
     
-    def listar_tareas(self, estado: Optional[str] = None) -> List[TareaBase]:
+    def _obtener_para_modificar(self, id_tarea: int) -> Optional[TareaBase]:
         """
-        Lista todas las tareas o filtradas por estado
-        POLIMORFISMO: Maneja diferentes tipos de tareas uniformemente
+        Método privado que devuelve una tarea del almacén; si está archivada, la devuelve
+        antes al almacén (con el cerrojo de escritura), donde se puede modificar
         """
-        tareas = list(self._tareas.values())
-        
+        tarea = self._almacen.obtener(id_tarea)
+        if tarea is None and self._archivo is not None:
+            tarea = self._archivo.obtener(id_tarea)
+            if tarea is not None:
+                self._almacen.insertar(tarea)
+                self._restauradas.add(id_tarea)
+        return tarea
+    
+    def _filtros(self, estado: Optional[str], tipo: Optional[str], prioridad: Optional[str]) -> Dict[str, Any]:
+        """Método privado que convierte los filtros de texto (los no válidos se ignoran)"""
+        estado_enum = None
         if estado:
             try:
                 estado_enum = EstadoTarea(estado)
-                tareas = [t for t in tareas if t.estado == estado_enum]
             except ValueError:
                 pass  # Si el estado no es válido, devolver todas
         
-        return tareas
+        prioridad_enum = None
+        if prioridad:
+            try:
+                prioridad_enum = PrioridadTarea(prioridad)
+            except ValueError:
+                pass
+        
+        clase_tipo = TIPOS_TAREA.get(tipo.lower()) if tipo else None
+        return {"estado": estado_enum, "tipo": clase_tipo, "prioridad": prioridad_enum}
+    
+    @medido
+    @con_lectura
+    def listar_tareas(self, estado: Optional[str] = None, tipo: Optional[str] = None,
+                      prioridad: Optional[str] = None, orden: str = "id",
+                      limite: Optional[int] = None, despues_de: Optional[int] = None) -> List[TareaBase]:
+        """
+        Lista todas las tareas o filtradas por estado, tipo y/o prioridad
+        Admite paginación por cursor: limite tareas a partir de la tarea despues_de
+        POLIMORFISMO: Maneja diferentes tipos de tareas uniformemente
+        """
+        return self._almacen.listar(orden=orden, limite=limite, despues_de=despues_de,
+                                    **self._filtros(estado, tipo, prioridad))
+    
+    @con_lectura
+    def iterar_tareas(self) -> Iterator[TareaBase]:
+        """
+        Recorre todas las tareas sin construir una lista con ellas (exportación).
+        Con SQLite el recorrido se hace por bloques después de soltar el cerrojo:
+        cada bloque es consistente, pero no el recorrido completo.
+        """
+        return self._almacen.iterar()
+    
+    @medido
+    @con_lectura
+    def contar_tareas(self, estado: Optional[str] = None, tipo: Optional[str] = None,
+                      prioridad: Optional[str] = None) -> int:
+        """Cuenta las tareas que cumplen los filtros sin materializarlas"""
+        return self._almacen.contar(**self._filtros(estado, tipo, prioridad))
+    
+    @medido
+    @con_lectura
+    def buscar_tareas(self, consulta: str, limite: int = 20) -> Tuple[List[TareaBase], int]:
+        """
+        Busca las palabras de la consulta en el título y la descripción de las tareas
+        y devuelve las limite más relevantes junto con el total de coincidencias
+        """
+        return self._almacen.buscar(consulta, limite)
     
+    @medido
+    @con_escritura
     def actualizar_tarea(self, id_tarea: int, **kwargs) -> Optional[TareaBase]:
         """
         Actualiza una tarea existente
         POLIMORFISMO: Maneja diferentes tipos de tareas
         """
-        tarea = self._tareas.get(id_tarea)
+        tarea = self._obtener_para_modificar(id_tarea)
         if not tarea:
             return None
+        vencida = tarea.esta_vencida()
         
         # Actualizar campos comunes
         if "titulo" in kwargs:
@@ -114,74 +331,408 @@ class GestorTareas:
                     fecha = None
             tarea.fecha_limite = fecha
         
-        self.guardar_tareas()
+        if isinstance(tarea, TareaConFecha) and ("estado" in kwargs or "fecha_limite" in kwargs):
+            # Una tarea reabierta o con otra fecha límite: "vencida" se compara con el mismo
+            # instante que las listas y los conteos (el planificador no volverá a mirarla)
+            tarea.recalcular_vencida(a_epoca_us(self._ahora_vencimientos()))
+        
+        self._almacen.actualizar(tarea)
+        self._anotar_cambio("actualizar", id_tarea, tarea)
+        if TareaConFecha.vencimientos_planificados and not vencida and tarea.esta_vencida():
+            self._anotar_cambio("vencer", id_tarea, tarea)
         return tarea
     
+    @medido
+    @con_escritura
     def eliminar_tarea(self, id_tarea: int) -> bool:
-        """Elimina una tarea por su ID"""
-        if id_tarea in self._tareas:
-            del self._tareas[id_tarea]
-            self.guardar_tareas()
-            return True
-        return False
+        """Elimina una tarea por su ID (también si está archivada)"""
+        archivada = self._archivo is not None and self._archivo.quitar(id_tarea)
+        if archivada:
+            self._restauradas.discard(id_tarea)
+        if not self._almacen.eliminar(id_tarea) and not archivada:
+            return False
+        self._anotar_cambio("eliminar", id_tarea)
+        # Los IDs no se reutilizan: la versión de la tarea ya no hace falta
+        del self._versiones[id_tarea]
+        return True
     
+    @medido
+    @con_escritura
     def marcar_completada(self, id_tarea: int) -> Optional[TareaBase]:
         """
         Marca una tarea como completada
         POLIMORFISMO: Utiliza el método específico de cada tipo de tarea
         """
-        tarea = self._tareas.get(id_tarea)
+        tarea = self._obtener_para_modificar(id_tarea)
         if tarea:
             tarea.marcar_completada()  # Polimorfismo en acción
-            self.guardar_tareas()
+            self._almacen.actualizar(tarea, "completar")
+            self._anotar_cambio("completar", id_tarea, tarea)
             return tarea
         return None
     
-    def obtener_estadisticas(self) -> Dict[str, Any]:
-        """Obtiene estadísticas básicas de las tareas"""
-        total = len(self._tareas)
-        if total == 0:
-            return {"total": 0, "pendientes": 0, "en_progreso": 0, "completadas": 0}
+    # --- Operaciones por lotes ---
+    
+    @medido
+    @con_escritura
+    def crear_tareas(self, datos: List[Dict[str, Any]], transaccional: bool = False) -> List[Dict[str, Any]]:
+        """
+        Crea varias tareas y las persiste de una sola vez.
+        Cada elemento tiene los argumentos de crear_tarea (tipo, titulo, descripcion, ...).
+        """
+        return self._aplicar_lote(
+            datos, [None] * len(datos), self._validar_creacion,
+            lambda elemento: self.crear_tarea(**elemento), transaccional
+        )
+    
+    @medido
+    @con_escritura
+    def actualizar_tareas(self, datos: List[Dict[str, Any]], transaccional: bool = False) -> List[Dict[str, Any]]:
+        """
+        Actualiza varias tareas y las persiste de una sola vez.
+        Cada elemento tiene el "id" de la tarea y los campos de actualizar_tarea.
+        """
+        def validar(elemento: Dict[str, Any]) -> Optional[str]:
+            if not self._existe(elemento["id"]):
+                return f"No se encontró la tarea con ID {elemento['id']}"
+            # Se comprueba todo antes de modificar nada: en memoria los cambios no se deshacen
+            return self._validar_actualizacion(elemento)
         
-        pendientes = sum(1 for t in self._tareas.values() if t.estado == EstadoTarea.PENDIENTE)
-        en_progreso = sum(1 for t in self._tareas.values() if t.estado == EstadoTarea.EN_PROGRESO)
-        completadas = sum(1 for t in self._tareas.values() if t.estado == EstadoTarea.COMPLETADA)
+        def aplicar(elemento: Dict[str, Any]) -> Optional[TareaBase]:
+            campos = {campo: valor for campo, valor in elemento.items() if campo != "id"}
+            return self.actualizar_tarea(elemento["id"], **campos)
+        
+        return self._aplicar_lote(datos, [elemento["id"] for elemento in datos],
+                                  validar, aplicar, transaccional)
+    
+    @medido
+    @con_escritura
+    def eliminar_tareas(self, ids: List[int], transaccional: bool = False) -> List[Dict[str, Any]]:
+        """Elimina varias tareas y persiste el cambio de una sola vez"""
+        eliminados = set()
+        
+        def validar(id_tarea: int) -> Optional[str]:
+            # Un ID repetido en el lote ya no existirá cuando se aplique
+            if id_tarea in eliminados or not self._existe(id_tarea):
+                return f"No se encontró la tarea con ID {id_tarea}"
+            eliminados.add(id_tarea)
+            return None
+        
+        def aplicar(id_tarea: int) -> None:
+            self.eliminar_tarea(id_tarea)
+        
+        return self._aplicar_lote(ids, list(ids), validar, aplicar, transaccional)
+    
+    def _aplicar_lote(self, elementos: List[Any], ids: List[Optional[int]],
+                      validar: Callable[[Any], Optional[str]], aplicar: Callable[[Any], Optional[TareaBase]],
+                      transaccional: bool) -> List[Dict[str, Any]]:
+        """
+        Método privado que valida todos los elementos y aplica los válidos dentro
+        de un único lote del almacén, así la persistencia escribe una sola vez.
+        Devuelve un resultado por elemento: {"id", "tarea", "error"}.
+        Con transaccional=True, si algún elemento falla no se aplica ninguno.
+        Los observadores reciben los cambios cuando el lote ya se ha confirmado.
+        """
+        resultados = [{"id": id_tarea, "tarea": None, "error": validar(elemento)}
+                      for elemento, id_tarea in zip(elementos, ids)]
+        if transaccional and any(resultado["error"] for resultado in resultados):
+            return resultados
+        
+        self._cambios_lote = []
+        try:
+            with self._almacen.lote():
+                for elemento, resultado in zip(elementos, resultados):
+                    if resultado["error"] is not None:
+                        continue
+                    try:
+                        tarea = aplicar(elemento)
+                    except ValueError as e:
+                        resultado["error"] = str(e)
+                        if transaccional:
+                            raise
+                        continue
+                    if tarea is not None:
+                        resultado["id"] = tarea.id
+                        resultado["tarea"] = tarea
+        except ValueError:
+            # Solo en modo transaccional, tras la validación previa: SQLite deshace la
+            # transacción y la memoria no persiste el lote (la validación previa comprueba
+            # lo mismo que los setters, así que en memoria no debería llegarse aquí)
+            for resultado in resultados:
+                resultado["tarea"] = None
+            self._cambios_lote = []
+        finally:
+            cambios, self._cambios_lote = self._cambios_lote, None
+        for cambio in cambios:
+            self._notificar(cambio)
+        return resultados
+    
+    @medido
+    @con_lectura
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """Obtiene estadísticas de las tareas por estado, tipo y prioridad"""
+        # Los conteos se mantienen en el almacén, no se recorren las tareas
+        conteos = self._almacen.conteos()
+        por_estado = conteos["estado"]
         
         return {
-            "total": total,
-            "pendientes": pendientes,
-            "en_progreso": en_progreso,
-            "completadas": completadas
+            "total": sum(por_estado.values()),
+            "pendientes": por_estado.get(EstadoTarea.PENDIENTE, 0),
+            "en_progreso": por_estado.get(EstadoTarea.EN_PROGRESO, 0),
+            "completadas": por_estado.get(EstadoTarea.COMPLETADA, 0),
+            "por_tipo": {clase: conteos["tipo"].get(clase, 0) for clase in TIPOS_TAREA.values()},
+            "por_prioridad": {p.value: conteos["prioridad"].get(p, 0) for p in PrioridadTarea},
+            "vencidas": self._almacen.contar_vencidas(self._ahora_vencimientos()),
+            "archivadas": self._contar_archivadas()
         }
     
+    @medido
+    @con_lectura
+    def series_estadisticas(self, intervalo: str = "hora", desde: Optional[datetime] = None,
+                            hasta: Optional[datetime] = None, tipo: Optional[str] = None,
+                            ahora: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Tareas creadas y completadas por hora o por día, antigüedad de las tareas sin
+        completar y proporción de vencidas por prioridad (ver VistaColumnar.series).
+        Se calcula sobre la vista columnar, sin recorrer las tareas; sin NumPy lanza RuntimeError.
+        """
+        ahora = ahora or datetime.now()
+        return self._vista_columnar().series(
+            intervalo, a_epoca_us(desde) if desde else None, a_epoca_us(hasta) if hasta else None,
+            a_epoca_us(ahora), a_epoca_us(self._ahora_vencimientos()), TIPOS_TAREA.get(tipo) if tipo else None
+        )
+    
+    def _vista_columnar(self) -> VistaColumnar:
+        """
+        Método privado que devuelve la vista columnar (con el cerrojo de lectura tomado),
+        construyéndola la primera vez con las tareas del almacén y las archivadas. Con SQLite,
+        los cambios de otros procesos no pasan por este gestor: si los hay, la vista se
+        vuelve a construir
+        """
+        version = self._almacen.version_externa()
+        with self._cerrojo_columnas:
+            if self._columnas is None or version != self._version_columnas:
+                filas = self._almacen.valores_analitica()
+                if self._archivo is not None:
+                    # Las restauradas siguen en el archivo hasta descartarlas: manda el almacén
+                    archivadas = ((id_tarea, valores) for id_tarea, valores in self._archivo.valores_analitica()
+                                  if self._almacen.obtener(id_tarea) is None)
+                    filas = chain(filas, archivadas)
+                self._columnas = VistaColumnar.construir(filas)
+                self._version_columnas = version
+            return self._columnas
+    
+    @medido
+    @con_lectura
     def obtener_tareas_vencidas(self) -> List[TareaBase]:
-        """Obtiene tareas con fecha límite vencida"""
-        tareas_vencidas = []
-        for tarea in self._tareas.values():
-            if isinstance(tarea, TareaConFecha) and tarea.esta_vencida():
-                tareas_vencidas.append(tarea)
-        return tareas_vencidas
+        """Obtiene tareas sin completar con fecha límite vencida"""
+        return self._almacen.listar_por_fecha_limite(hasta=self._ahora_vencimientos())
+    
+    @medido
+    @con_lectura
+    def obtener_tareas_por_vencer(self, horas: float) -> List[TareaBase]:
+        """Obtiene tareas sin completar que vencen dentro de las próximas horas"""
+        ahora = self._ahora_vencimientos()
+        return self._almacen.listar_por_fecha_limite(hasta=ahora + timedelta(hours=horas), desde=ahora)
+    
+    def _ahora_vencimientos(self) -> datetime:
+        """
+        Método privado con el instante que separa las tareas vencidas de las demás: con el
+        planificador, el último procesado (así las listas, los conteos y el campo "vencida"
+        coinciden); sin él, la hora actual
+        """
+        if TareaConFecha.vencimientos_planificados and self._vencimientos_hasta is not None:
+            return self._vencimientos_hasta
+        return datetime.now()
+    
+    @con_lectura
+    def proximo_vencimiento(self) -> Optional[datetime]:
+        """Fecha límite pendiente de procesar más cercana (None si no hay ninguna)"""
+        return self._almacen.proximo_vencimiento(self._vencimientos_hasta)
+    
+    @medido
+    @con_escritura
+    def procesar_vencimientos(self) -> List[TareaBase]:
+        """
+        Marca como vencidas las tareas cuya fecha límite ha llegado desde la llamada
+        anterior y avisa de cada una a los observadores con la operación "vencer".
+        La primera llamada solo marca las que ya estaban vencidas, sin avisar.
+        Devuelve las tareas que han vencido.
+        """
+        ahora = datetime.now()
+        anterior = self._vencimientos_hasta
+        vencidas = self._almacen.listar_por_fecha_limite(hasta=ahora, desde=anterior)
+        self._vencimientos_hasta = ahora
+        for tarea in vencidas:
+            tarea.marcar_vencida()
+            if anterior is not None:
+                self._anotar_cambio("vencer", tarea.id, tarea)
+        return vencidas if anterior is not None else []
+
+    # --- Archivo de tareas completadas ---
+    
+    @medido
+    @con_escritura
+    def archivar_completadas(self, antiguedad: timedelta, limite: int = 1000) -> int:
+        """
+        Mueve al archivo hasta limite tareas completadas hace más de antiguedad (las que no
+        tienen fecha de completado, por su fecha de creación) y las quita del almacén;
+        los observadores reciben la operación "archivar" (con tarea None).
+        Devuelve cuántas se han archivado: si son limite, puede que queden más.
+        """
+        if self._archivo is None:
+            return 0
+        self._descartar_restauradas()
+        corte = datetime.now() - antiguedad
+        tareas = self._almacen.listar_completadas_antes(corte, limite)
+        if not tareas:
+            return 0
+        # Primero el archivo (con fsync) y después el almacén: tras una caída entre
+        # los dos la tarea queda en ambos, y manda la copia del almacén
+        self._archivo.archivar(tareas)
+        
+        def aplicar(tarea: TareaBase) -> None:
+            self._almacen.eliminar(tarea.id)
+            self._anotar_cambio("archivar", tarea.id)
+            del self._versiones[tarea.id]
+        
+        self._aplicar_lote(tareas, [tarea.id for tarea in tareas], lambda tarea: None, aplicar, False)
+        return len(tareas)
+    
+    def _descartar_restauradas(self):
+        """
+        Método privado que quita del archivo la copia de las tareas restauradas cuando el
+        almacén ya las tiene en disco (antes, una caída dejaría solo la copia archivada)
+        """
+        if not self._restauradas:
+            return
+        self._almacen.confirmar().result()
+        for id_tarea in self._restauradas:
+            self._archivo.quitar(id_tarea)
+        self._restauradas.clear()
+    
+    def _contar_archivadas(self) -> int:
+        if self._archivo is None:
+            return 0
+        return len(self._archivo) - len(self._restauradas)
+    
+    def metricas_archivo(self) -> Dict[str, int]:
+        """Tareas archivadas y bytes que ocupan sus segmentos"""
+        return {"tareas": self._contar_archivadas(),
+                "bytes": self._archivo.tamano_disco() if self._archivo is not None else 0}
+    
+    @medido
+    @con_lectura
+    def listar_archivadas(self, limite: int = 50, despues_de: Optional[int] = None) -> Tuple[List[TareaBase], int]:
+        """
+        Tareas archivadas por orden de ID, a partir de la siguiente a despues_de (cursor),
+        y cuántas hay. Las que han vuelto al almacén no aparecen.
+        """
+        if self._archivo is None:
+            return [], 0
+        tareas: List[TareaBase] = []
+        while len(tareas) < limite:
+            pagina = self._archivo.listar(limite - len(tareas), despues_de)
+            if not pagina:
+                break
+            tareas.extend(tarea for tarea in pagina if self._almacen.obtener(tarea.id) is None)
+            despues_de = pagina[-1].id
+        return tareas, self._contar_archivadas()
+    
+    def metricas_historial(self) -> Dict[str, int]:
+        """Revisiones en el historial y bytes de su log"""
+        if self._historial is None:
+            return {"revisiones": 0, "bytes": 0}
+        return {"revisiones": len(self._historial), "bytes": self._historial.tamano_disco()}
+    
+    def _historial_activo(self) -> HistorialTareas:
+        if self._historial is None:
+            raise RuntimeError("El historial de cambios no está activado")
+        return self._historial
+    
+    @con_lectura
+    def version_historial(self, id_tarea: int) -> Optional[tuple]:
+        """Versión del historial de una tarea (None si no tiene historial ni existe): cambia con cada revisión"""
+        generacion, revisiones = self._historial_activo().version(id_tarea)
+        if not revisiones and not self._existe(id_tarea):
+            return None
+        return self._origen + (generacion, revisiones)
+    
+    @medido
+    @con_lectura
+    def historial_tarea(self, id_tarea: int, limite: int = 50,
+                        despues_de: Optional[int] = None) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """
+        Revisiones de una tarea (instante, operación y campos que cambiaron), de la más
+        antigua a la más reciente, a partir de la siguiente a despues_de, y cuántas hay.
+        None si la tarea no tiene historial ni existe; sin historial activado lanza RuntimeError.
+        """
+        resultado = self._historial_activo().revisiones(id_tarea, limite, despues_de)
+        if resultado is None and self._existe(id_tarea):
+            # Sin cambios desde que se activó el historial
+            return [], 0
+        return resultado
+    
+    @medido
+    @con_lectura
+    def obtener_tarea_en(self, id_tarea: int, instante: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Campos de la tarea (como to_dict) tal como estaba en instante, reconstruidos desde
+        el historial. None si entonces no existía o el historial no llega tan atrás.
+        """
+        return self._historial_activo().estado_en(id_tarea, a_epoca_us(instante))
+    
+    @medido
+    def compactar_historial(self, antiguedad: timedelta) -> int:
+        """
+        Quita del historial las revisiones de hace más de antiguedad (ver HistorialTareas.compactar).
+        No necesita el cerrojo del gestor: el historial tiene el suyo. Devuelve cuántas ha quitado
+        """
+        if self._historial is None:
+            return 0
+        return self._historial.compactar(a_epoca_us(datetime.now() - antiguedad))
+    
+    def continuar_carga_historial(self) -> bool:
+        """Indexa otro trozo del log del historial (arranque perezoso); False cuando ha terminado"""
+        return self._historial is not None and self._historial.continuar_carga()
+
+    def confirmar_persistencia(self) -> Future:
+        """Devuelve un Future que se resuelve cuando los cambios hechos hasta ahora son durables"""
+        return self._almacen.confirmar()
+
+    def metricas_persistencia(self) -> Dict[str, Any]:
+        """Métricas de escritura del almacén (latencia de flush y tamaño de lote)"""
+        return self._almacen.metricas_persistencia()
+
+    @con_escritura
+    def continuar_carga(self, tamano_bloque: int = 2000) -> bool:
+        """Carga otro bloque de tareas del snapshot (arranque perezoso); False cuando ha terminado"""
+        return self._almacen.continuar_carga(tamano_bloque)
 
+    def estado_carga(self) -> Dict[str, Any]:
+        """Si las tareas están ya cargadas ("lista") o aún cargando, y el progreso"""
+        return self._almacen.estado_carga()
+
+    @con_escritura
+    def cerrar(self):
+        """Escribe los cambios pendientes y libera el almacén"""
+        self._almacen.cerrar()
+        if self._archivo is not None:
+            self._archivo.cerrar()
+        if self._historial is not None:
+            self._historial.cerrar()
+
+    @medido
+    @con_lectura
     def guardar_tareas(self):
-        """Guardar tareas en un archivo JSON"""
-        with open("tareas.json", "w") as file:
-            tareas_data = {id_tarea: tarea.to_dict() for id_tarea, tarea in self._tareas.items()}
-            json.dump(tareas_data, file, indent=4)
+        """Guarda el estado completo de todas las tareas"""
+        self._almacen.guardar_todo()
 
+    @medido
+    @con_escritura
     def cargar_tareas(self):
-        """Cargar tareas desde un archivo JSON"""
-        try:
-            with open("tareas.json", "r") as file:
-                tareas_data = json.load(file)
-                for id_tarea, tarea_data in tareas_data.items():
-                    tarea_data["id"] = int(id_tarea)
-                    if tarea_data["tipo"] == "TareaSimple":
-                        tarea = TareaSimple(**tarea_data)
-                    elif tarea_data["tipo"] == "TareaPrioritaria":
-                        tarea = TareaPrioritaria(**tarea_data)
-                    elif tarea_data["tipo"] == "TareaConFecha":
-                        tarea = TareaConFecha(**tarea_data)
-                    self._tareas[tarea.id] = tarea
-                    self._siguiente_id = max(self._siguiente_id, tarea.id + 1)
-        except FileNotFoundError:
-            pass
\ No newline at end of file
+        """Carga las tareas guardadas (o abre la base de datos)"""
+        self._almacen.cargar()
+        if self._archivo is not None:
+            # Los IDs de las tareas archivadas no se reutilizan
+            self._almacen.avanzar_ids(self._archivo.ultimo_id)
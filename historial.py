@@ -0,0 +1,607 @@
+import json
+import logging
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import TareaBase, ahora_us, desde_epoca_us
+from persistencia import _sincronizar_directorio
+from serializacion import a_json
+
+# Bloqueo del log compartido entre procesos: fcntl en POSIX (sin él, un log
+# compartido no se compacta)
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - depende del sistema operativo
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Operaciones que quedan en el historial ("archivar" no cambia la tarea)
+OPERACIONES = ("crear", "actualizar", "completar", "vencer", "eliminar")
+_CODIGO_OPERACION = {operacion: codigo for codigo, operacion in enumerate(OPERACIONES)}
+_ELIMINAR = _CODIGO_OPERACION["eliminar"]
+
+# El log se indexa y se compacta por trozos de este tamaño
+_TROZO_LECTURA = 4 * 1024 * 1024
+# Principio de cada línea: basta para indexarla sin decodificar el JSON
+_CABECERA = re.compile(rb'\{"id":(\d+),"t":(-?\d+),"op":"([a-z]+)"')
+# Los puntos de control llevan además el estado completo de la tarea
+_MARCA_PUNTO = b',"completo":{'
+# Las líneas de una tarea separadas por menos de esto se leen con una sola llamada
+_HUECO_LECTURA = 4096
+# Segundos entre reintentos del hilo escritor cuando no puede escribir en el log
+_ESPERA_REINTENTO = 1.0
+
+# Cada revisión se indexa en un entero sin signo: posición de su línea en el log
+# (desde el bit 24), longitud (20 bits), si es punto de control y operación (3 bits)
+_PUNTO = 1 << 3
+_MASCARA_OPERACION = 7
+_MASCARA_LONGITUD = (1 << 20) - 1
+
+
+def _indexado(posicion: int, longitud: int, punto: bool, codigo: int) -> int:
+    return posicion << 24 | longitud << 4 | (_PUNTO if punto else 0) | codigo
+
+
+def _posicion(dato: int) -> int:
+    return dato >> 24
+
+
+def _longitud(dato: int) -> int:
+    return dato >> 4 & _MASCARA_LONGITUD
+
+
+def _cabecera(linea: bytes) -> Optional[Tuple[int, int, int]]:
+    """(id de la tarea, instante, código de la operación) de una línea del log; None si no es válida"""
+    cabecera = _CABECERA.match(linea)
+    codigo = _CODIGO_OPERACION.get(cabecera.group(3).decode()) if cabecera else None
+    if codigo is None:
+        return None
+    return int(cabecera.group(1)), int(cabecera.group(2)), codigo
+
+
+def _lineas(trozo: bytes):
+    """Líneas completas de un trozo del log con su posición dentro de él, y hasta dónde llegan"""
+    completas = trozo.rfind(b"\n") + 1
+    lineas, posicion = [], 0
+    for linea in trozo[:completas - 1].split(b"\n") if completas else ():
+        lineas.append((posicion, linea))
+        posicion += len(linea) + 1
+    return lineas, completas
+
+
+class _Revisiones:
+    """Índice de las revisiones de una tarea, en columnas de solo añadir"""
+    __slots__ = ("instantes", "datos")
+
+    def __init__(self):
+        # Instante (microsegundos desde 1970) de cada revisión y dónde está su línea (ver _indexado)
+        self.instantes = array("q")
+        self.datos = array("Q")
+
+
+class HistorialTareas:
+    """
+    Historial de los cambios de cada tarea: de cada revisión se guarda el instante,
+    la operación y solo los campos que cambiaron (delta), no una copia de la tarea.
+    ENCAPSULACIÓN: Las revisiones están en un log NDJSON de solo añadir (ruta); en memoria
+    solo queda un índice (instante y posición de la línea, 16 bytes por revisión) y el
+    último estado de las tareas cambiadas hace poco (recientes), para calcular el delta
+    siguiente sin leer el log. Cada cierto número de revisiones (cada), la línea lleva
+    además el estado completo (punto de control): reconstruir una tarea en una fecha es
+    buscar la revisión (bisección), volver al punto de control anterior y leer como mucho
+    cada líneas del log: O(log revisiones + cada).
+    El log se indexa por trozos en segundo plano tras arrancar (continuar_carga); lo que
+    lo necesite antes termina de indexarlo. Las líneas las escribe un hilo dedicado,
+    juntas las que se acumulan mientras escribe.
+    Con compartido=True (workers con SQLite) varios procesos comparten el log: cada uno
+    escribe sus líneas al momento con una sola escritura (O_APPEND), indexa las de los
+    demás antes de registrar o consultar y guarda el estado completo cuando otro proceso
+    ha cambiado las tareas desde su última revisión (su delta podría partir de un estado viejo).
+    compactar() aplica la retención: quita las revisiones anteriores a un instante.
+    GestorTareas lo mantiene al día con cada cambio, con su cerrojo de escritura tomado.
+    """
+
+    def __init__(self, ruta: str, cada: int = 16, compartido: bool = False, recientes: int = 10000):
+        self._ruta = ruta
+        self._cada = cada
+        self._compartido = compartido
+        self._maximo_recientes = recientes
+        self._tareas: Dict[int, _Revisiones] = {}
+        self._cantidad = 0
+        # Cambia cuando una compactación renumera las revisiones
+        self._generacion = 0
+        # Bytes del log ya indexados, y hasta dónde llegaba al abrirlo (carga perezosa)
+        self._leido = 0
+        self._cargado = False
+        # Fin del log contando las líneas en cola, hasta dónde están escritas y el error
+        # de la última escritura (el hilo escritor la reintenta)
+        self._fin = 0
+        self._escrito = 0
+        self._fallo: Optional[OSError] = None
+        # version_externa del almacén en la última revisión registrada
+        self._version_externa: Optional[int] = None
+        self._recientes: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._cerrojo = threading.Lock()
+        self._escritas = threading.Condition(self._cerrojo)
+        # Líneas pendientes de escribir por el hilo escritor
+        self._pendientes: List[bytes] = []
+        self._condicion = threading.Condition()
+        self._activo = True
+        self._hilo: Optional[threading.Thread] = None
+        self._fd_bloqueo: Optional[int] = None
+        if compartido and fcntl is not None:
+            self._fd_bloqueo = os.open(f"{ruta}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self._abrir()
+        if not compartido or self._fd_bloqueo is not None:
+            with self._bloqueo(exclusivo=True):
+                self._descartar_linea_cortada()
+        self._fin = self._escrito = self._fin_carga = os.fstat(self._fd).st_size
+        if not compartido:
+            self._hilo = threading.Thread(target=self._bucle, name="escritor-historial", daemon=True)
+            self._hilo.start()
+
+    def _abrir(self):
+        self._fd = os.open(self._ruta, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._inodo = os.fstat(self._fd).st_ino
+
+    def _descartar_linea_cortada(self):
+        """Método privado que quita del final del log una línea a medias (de una caída)"""
+        tamano = os.fstat(self._fd).st_size
+        cola = os.pread(self._fd, min(tamano, _TROZO_LECTURA), tamano - min(tamano, _TROZO_LECTURA))
+        if cola and not cola.endswith(b"\n"):
+            os.ftruncate(self._fd, tamano - len(cola) + cola.rfind(b"\n") + 1)
+
+    @contextmanager
+    def _bloqueo(self, exclusivo: bool = False):
+        """Cerrojo entre procesos del log compartido: compartido para añadir, exclusivo para sustituirlo"""
+        if self._fd_bloqueo is None:
+            yield
+            return
+        fcntl.flock(self._fd_bloqueo, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd_bloqueo, fcntl.LOCK_UN)
+
+    def continuar_carga(self) -> bool:
+        """Indexa otro trozo del log (arranque perezoso); False cuando ha terminado"""
+        with self._cerrojo:
+            if self._cargado:
+                return False
+            if self._indexar(self._fin_carga, _TROZO_LECTURA):
+                return True
+            self._cargado = True
+            return False
+
+    def _preparar(self):
+        """
+        Método privado (con el cerrojo) que termina de indexar el log y, si es compartido,
+        incorpora las revisiones de los demás procesos
+        """
+        if not self._cargado:
+            self._indexar(self._fin_carga)
+            self._cargado = True
+        if self._compartido:
+            if os.stat(self._ruta).st_ino != self._inodo:
+                self._reabrir()
+            self._indexar(os.fstat(self._fd).st_size)
+
+    def _reabrir(self):
+        """Método privado que vuelve a indexar el log después de que otro proceso lo haya compactado"""
+        os.close(self._fd)
+        self._abrir()
+        self._tareas = {}
+        self._cantidad = 0
+        self._leido = 0
+        self._generacion += 1
+        self._indexar(os.fstat(self._fd).st_size)
+
+    def _indexar(self, fin: int, maximo: Optional[int] = None) -> bool:
+        """
+        Método privado que indexa las líneas completas del log entre lo ya leído y fin
+        (como mucho maximo bytes). True si queda algo por indexar
+        """
+        limite = fin if maximo is None else min(fin, self._leido + maximo)
+        while self._leido < limite:
+            # Se lee hasta fin, no hasta limite: una línea cortada solo puede estar al final del log
+            lineas, completas = _lineas(os.pread(self._fd, min(_TROZO_LECTURA, fin - self._leido), self._leido))
+            if not completas:
+                # Una línea que otro proceso está escribiendo: se indexará en la próxima lectura
+                return False
+            for posicion, linea in lineas:
+                cabecera = _cabecera(linea)
+                if cabecera is not None:
+                    id_tarea, instante, codigo = cabecera
+                    self._recientes.pop(id_tarea, None)
+                    self._anadir(id_tarea, instante, codigo, self._leido + posicion, len(linea),
+                                 _MARCA_PUNTO in linea)
+            self._leido += completas
+        return self._leido < fin
+
+    def _anadir(self, id_tarea: int, instante: int, codigo: int, posicion: int, longitud: int, punto: bool):
+        """Método privado que añade una revisión al índice (la primera de cada tarea es punto de control)"""
+        revisiones = self._tareas.get(id_tarea)
+        if revisiones is None:
+            revisiones = self._tareas[id_tarea] = _Revisiones()
+        indice = len(revisiones.instantes)
+        # Los instantes no retroceden aunque lo haga el reloj (la bisección los necesita ordenados)
+        revisiones.instantes.append(max(instante, revisiones.instantes[-1]) if indice else instante)
+        revisiones.datos.append(_indexado(posicion, longitud, punto or not indice, codigo))
+        self._cantidad += 1
+
+    @staticmethod
+    def _ultimo_punto(revisiones: _Revisiones, indice: int) -> int:
+        """Punto de control en o antes de la revisión indice"""
+        while not revisiones.datos[indice] & _PUNTO:
+            indice -= 1
+        return indice
+
+    def _leer(self, revisiones: _Revisiones, inicio: int, fin: int) -> List[dict]:
+        """
+        Método privado (con el cerrojo) que lee del log las revisiones inicio..fin-1 de una
+        tarea; las líneas cercanas se leen juntas
+        """
+        datos = revisiones.datos[inicio:fin]
+        if not self._compartido:
+            self._esperar_escritas(_posicion(datos[-1]) + _longitud(datos[-1]))
+        registros = []
+        primero = 0
+        while primero < len(datos):
+            desde = _posicion(datos[primero])
+            hasta = desde + _longitud(datos[primero])
+            ultimo = primero + 1
+            while ultimo < len(datos) and _posicion(datos[ultimo]) - hasta <= _HUECO_LECTURA:
+                hasta = _posicion(datos[ultimo]) + _longitud(datos[ultimo])
+                ultimo += 1
+            bloque = os.pread(self._fd, hasta - desde, desde)
+            for dato in datos[primero:ultimo]:
+                posicion = _posicion(dato) - desde
+                registros.append(json.loads(bloque[posicion:posicion + _longitud(dato)]))
+            primero = ultimo
+        return registros
+
+    def _esperar_escritas(self, hasta: int):
+        """
+        Método privado (con el cerrojo) que espera a que el hilo escritor haya escrito el log
+        hasta la posición hasta; si no puede escribirlo, lanza RuntimeError
+        """
+        while self._escrito < hasta:
+            if self._fallo is not None:
+                raise RuntimeError(f"No se puede escribir el historial de cambios: {self._fallo}")
+            self._escritas.wait()
+
+    def _estado(self, revisiones: _Revisiones, indice: int) -> Dict[str, Any]:
+        """Método privado con el estado completo en la revisión indice: punto de control anterior + sus deltas"""
+        registros = self._leer(revisiones, self._ultimo_punto(revisiones, indice), indice + 1)
+        estado = dict(registros[0].get("completo") or registros[0]["cambios"])
+        for registro in registros[1:]:
+            estado.update(registro["cambios"])
+        return estado
+
+    def _ultimo_estado(self, id_tarea: int, revisiones: _Revisiones) -> Dict[str, Any]:
+        estado = self._recientes.get(id_tarea)
+        if estado is None:
+            return self._estado(revisiones, len(revisiones.instantes) - 1)
+        self._recientes.move_to_end(id_tarea)
+        return estado
+
+    def _recordar(self, id_tarea: int, estado: Optional[Dict[str, Any]]):
+        if estado is None:
+            self._recientes.pop(id_tarea, None)
+            return
+        self._recientes[id_tarea] = estado
+        self._recientes.move_to_end(id_tarea)
+        if len(self._recientes) > self._maximo_recientes:
+            self._recientes.popitem(last=False)
+
+    def registrar(self, operacion: str, id_tarea: int, tarea: Optional[TareaBase], version_externa: int = 0):
+        """
+        Anota un cambio de la tarea (tarea None: eliminada). version_externa es la del
+        almacén: si ha cambiado desde la última revisión, la revisión lleva el estado completo
+        """
+        codigo = _CODIGO_OPERACION.get(operacion)
+        if codigo is None:
+            return
+        estado = None
+        if tarea is not None:
+            estado = tarea.to_dict()
+            del estado["id"]
+        with self._cerrojo:
+            self._preparar()
+            revisiones = self._tareas.get(id_tarea)
+            externa = self._version_externa is not None and version_externa != self._version_externa
+            self._version_externa = version_externa
+            anterior = None
+            if revisiones is not None:
+                try:
+                    anterior = self._ultimo_estado(id_tarea, revisiones)
+                except RuntimeError:
+                    # Su última revisión aún no está en el log (el hilo escritor la reintenta):
+                    # esta lleva el estado completo
+                    pass
+            if anterior is None:
+                if revisiones is None and estado is None:
+                    return
+                cambios, punto = estado or {}, revisiones is not None and estado is not None
+            else:
+                cambios = {campo: valor for campo, valor in (estado or {}).items()
+                           if campo not in anterior or anterior[campo] != valor}
+                if not cambios and codigo != _ELIMINAR:
+                    return
+                ultima = len(revisiones.instantes) - 1
+                punto = estado is not None and (
+                    externa or ultima + 1 - self._ultimo_punto(revisiones, ultima) >= self._cada
+                )
+            registro = {"id": id_tarea, "t": ahora_us(), "op": operacion, "cambios": cambios}
+            if punto:
+                registro["completo"] = estado
+            linea = a_json(registro)
+            self._recordar(id_tarea, estado)
+            if self._compartido:
+                self._escribir_compartido(id_tarea, registro["t"], codigo, linea, punto)
+                return
+            self._anadir(id_tarea, registro["t"], codigo, self._fin, len(linea), punto)
+            self._fin += len(linea) + 1
+        with self._condicion:
+            self._pendientes.append(linea + b"\n")
+            self._condicion.notify()
+
+    def _escribir_compartido(self, id_tarea: int, instante: int, codigo: int, linea: bytes, punto: bool):
+        """Método privado (con el cerrojo) que añade una línea al log compartido con una sola escritura"""
+        with self._bloqueo():
+            if os.stat(self._ruta).st_ino != self._inodo:
+                # Otro proceso ha compactado el log después de la última lectura
+                self._reabrir()
+            os.write(self._fd, linea + b"\n")
+            fin = os.lseek(self._fd, 0, os.SEEK_CUR)
+        inicio = fin - len(linea) - 1
+        # Líneas de otros procesos escritas entre la última lectura y esta
+        self._indexar(inicio)
+        self._anadir(id_tarea, instante, codigo, inicio, len(linea), punto)
+        self._leido = fin
+
+    def _bucle(self):
+        """
+        Hilo escritor: escribe de una vez todas las líneas pendientes. Si falla, lo que no se
+        ha escrito vuelve a la cola y se reintenta: el índice ya cuenta con esas posiciones,
+        así que nada puede escribirse antes
+        """
+        while True:
+            with self._condicion:
+                while not self._pendientes and self._activo:
+                    self._condicion.wait()
+                if not self._pendientes:
+                    return
+                datos = b"".join(self._pendientes)
+                self._pendientes.clear()
+            escritos = 0
+            fallo = None
+            try:
+                while escritos < len(datos):
+                    escritos += os.write(self._fd, datos[escritos:])
+            except OSError as error:
+                logger.exception("No se pudo escribir en el historial %s", self._ruta)
+                fallo = error
+            with self._cerrojo:
+                self._escrito += escritos
+                self._fallo = fallo
+                self._escritas.notify_all()
+            if fallo is None:
+                continue
+            with self._condicion:
+                self._pendientes.insert(0, datos[escritos:])
+                if not self._activo:
+                    logger.error("Se pierden %d bytes del historial %s al cerrarlo", len(datos) - escritos, self._ruta)
+                    return
+                self._condicion.wait(_ESPERA_REINTENTO)
+
+    def compactar(self, antes_us: int) -> int:
+        """
+        Retención: quita del log las revisiones anteriores a antes_us. De cada tarea se
+        conserva la revisión vigente en ese instante (como punto de control) y las
+        posteriores, así que las fechas desde antes_us se siguen reconstruyendo; las tareas
+        eliminadas antes de antes_us desaparecen. Las revisiones se renumeran.
+        El log se reescribe sin el cerrojo (solo se toma para copiar lo añadido mientras
+        tanto y sustituirlo). Devuelve cuántas revisiones se han quitado.
+        """
+        if self._compartido and self._fd_bloqueo is None:
+            return 0
+        # Qué se conserva de cada tarea, y el estado de las revisiones que pasan a ser punto de control
+        with self._cerrojo:
+            self._preparar()
+            self._esperar_escritas(self._fin)
+            corte = self._leido if self._compartido else self._fin
+            inodo, tareas = self._inodo, self._tareas
+            conservadas: Dict[int, int] = {}
+            bases: Dict[int, Dict[str, Any]] = {}
+            quitadas = 0
+            for id_tarea, revisiones in tareas.items():
+                vigente = bisect_right(revisiones.instantes, antes_us) - 1
+                total = len(revisiones.instantes)
+                if vigente == total - 1 and revisiones.datos[vigente] & _MASCARA_OPERACION == _ELIMINAR:
+                    quitadas += total
+                    continue
+                desde = max(vigente, 0)
+                conservadas[id_tarea] = desde
+                quitadas += desde
+                if desde and not revisiones.datos[desde] & _PUNTO:
+                    bases[id_tarea] = self._estado(revisiones, desde)
+            if not quitadas:
+                return 0
+            fd = os.dup(self._fd)
+        temporal = f"{self._ruta}.{os.getpid()}.tmp"
+        try:
+            nuevas, escrito = self._copiar_conservadas(fd, temporal, corte, tareas, conservadas, bases)
+            with self._cerrojo, self._bloqueo(exclusivo=True):
+                if os.stat(self._ruta).st_ino != inodo:
+                    # Otro proceso lo ha compactado mientras tanto
+                    return 0
+                self._sustituir(temporal, corte, escrito, nuevas)
+            return quitadas
+        finally:
+            os.close(fd)
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+    def _copiar_conservadas(self, fd: int, temporal: str, corte: int, tareas: Dict[int, _Revisiones],
+                            conservadas: Dict[int, int], bases: Dict[int, Dict[str, Any]]):
+        """
+        Método privado (sin el cerrojo) que copia a temporal las revisiones conservadas del
+        log hasta corte, en el mismo orden, y devuelve su índice y los bytes escritos
+        """
+        nuevas: Dict[int, _Revisiones] = {}
+        vistas: Dict[int, int] = {}
+        leido = escrito = 0
+        with open(temporal, "wb") as salida:
+            while leido < corte:
+                lineas, completas = _lineas(os.pread(fd, min(_TROZO_LECTURA, corte - leido), leido))
+                if not completas:
+                    break
+                for _, linea in lineas:
+                    cabecera = _cabecera(linea)
+                    if cabecera is None:
+                        continue
+                    id_tarea, _, codigo = cabecera
+                    # Las líneas de cada tarea están en el orden de sus revisiones
+                    indice = vistas.get(id_tarea, 0)
+                    vistas[id_tarea] = indice + 1
+                    desde = conservadas.get(id_tarea)
+                    if desde is None or indice < desde:
+                        continue
+                    punto = _MARCA_PUNTO in linea
+                    if indice == desde and id_tarea in bases:
+                        registro = json.loads(linea)
+                        registro["completo"] = bases[id_tarea]
+                        linea, punto = a_json(registro), True
+                    revisiones = nuevas.get(id_tarea)
+                    if revisiones is None:
+                        revisiones = nuevas[id_tarea] = _Revisiones()
+                    revisiones.instantes.append(tareas[id_tarea].instantes[indice])
+                    revisiones.datos.append(_indexado(escrito, len(linea), punto or indice == desde, codigo))
+                    salida.write(linea + b"\n")
+                    escrito += len(linea) + 1
+                leido += completas
+        return nuevas, escrito
+
+    def _sustituir(self, temporal: str, corte: int, escrito: int, nuevas: Dict[int, _Revisiones]):
+        """
+        Método privado (con el cerrojo y el bloqueo exclusivo) que añade a temporal lo escrito
+        en el log desde corte, lo pone en su lugar e indexa el resultado
+        """
+        if self._compartido:
+            self._indexar(os.fstat(self._fd).st_size)
+        self._esperar_escritas(self._fin)
+        fin = self._leido if self._compartido else self._fin
+        with open(temporal, "ab") as salida:
+            for inicio in range(corte, fin, _TROZO_LECTURA):
+                salida.write(os.pread(self._fd, min(_TROZO_LECTURA, fin - inicio), inicio))
+            salida.flush()
+            os.fsync(salida.fileno())
+        # Las revisiones de después del corte se han copiado tal cual, desplazadas
+        desplazamiento = escrito - corte
+        for id_tarea, revisiones in self._tareas.items():
+            recientes = len(revisiones.datos)
+            while recientes and _posicion(revisiones.datos[recientes - 1]) >= corte:
+                recientes -= 1
+            if recientes == len(revisiones.datos):
+                continue
+            copia = nuevas.get(id_tarea)
+            if copia is None:
+                copia = nuevas[id_tarea] = _Revisiones()
+            for indice in range(recientes, len(revisiones.datos)):
+                dato = revisiones.datos[indice]
+                copia.instantes.append(revisiones.instantes[indice])
+                copia.datos.append(_indexado(_posicion(dato) + desplazamiento, _longitud(dato),
+                                             bool(dato & _PUNTO) or not len(copia.datos),
+                                             dato & _MASCARA_OPERACION))
+        os.replace(temporal, self._ruta)
+        _sincronizar_directorio(os.path.dirname(os.path.abspath(self._ruta)))
+        os.close(self._fd)
+        self._abrir()
+        self._tareas = nuevas
+        self._cantidad = sum(len(revisiones.instantes) for revisiones in nuevas.values())
+        self._leido = self._fin = self._escrito = escrito + fin - corte
+        self._generacion += 1
+
+    def revisiones(self, id_tarea: int, limite: int = 50,
+                   despues_de: Optional[int] = None) -> Optional[Tuple[List[dict], int]]:
+        """
+        Página de revisiones de la tarea, de la más antigua a la más reciente (a partir
+        de la siguiente a despues_de), y cuántas hay. None si la tarea no tiene historial.
+        """
+        with self._cerrojo:
+            self._preparar()
+            revisiones = self._tareas.get(id_tarea)
+            if revisiones is None:
+                return None
+            total = len(revisiones.instantes)
+            inicio = min(despues_de or 0, total)
+            fin = min(inicio + limite, total)
+            registros = self._leer(revisiones, inicio, fin) if inicio < fin else []
+            return [
+                {
+                    "revision": indice + 1,
+                    "fecha": desde_epoca_us(revisiones.instantes[indice]),
+                    "operacion": OPERACIONES[revisiones.datos[indice] & _MASCARA_OPERACION],
+                    "cambios": registro["cambios"],
+                }
+                for indice, registro in zip(range(inicio, fin), registros)
+            ], total
+
+    def estado_en(self, id_tarea: int, instante_us: int) -> Optional[Dict[str, Any]]:
+        """
+        Campos de la tarea (como to_dict) tal como estaba en instante_us: los de su última
+        revisión hasta ese momento. None si todavía no existía, ya estaba eliminada
+        o el historial no llega tan atrás.
+        """
+        with self._cerrojo:
+            self._preparar()
+            revisiones = self._tareas.get(id_tarea)
+            if revisiones is None:
+                return None
+            indice = bisect_right(revisiones.instantes, instante_us) - 1
+            if indice < 0 or revisiones.datos[indice] & _MASCARA_OPERACION == _ELIMINAR:
+                return None
+            return {"id": id_tarea, **self._estado(revisiones, indice)}
+
+    def version(self, id_tarea: int) -> Tuple[int, int]:
+        """Versión del historial de una tarea: las compactaciones y cuántas revisiones tiene"""
+        with self._cerrojo:
+            self._preparar()
+            revisiones = self._tareas.get(id_tarea)
+            return self._generacion, len(revisiones.instantes) if revisiones is not None else 0
+
+    def cantidad(self, id_tarea: int) -> int:
+        """Número de revisiones de una tarea"""
+        return self.version(id_tarea)[1]
+
+    def __len__(self) -> int:
+        """Número total de revisiones indexadas"""
+        return self._cantidad
+
+    def tamano_disco(self) -> int:
+        """Bytes del log"""
+        return os.fstat(self._fd).st_size if self._fd is not None else 0
+
+    def cerrar(self):
+        """Escribe lo pendiente y cierra el log"""
+        with self._condicion:
+            self._activo = False
+            self._condicion.notify()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+        with self._cerrojo:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            if self._fd_bloqueo is not None:
+                os.close(self._fd_bloqueo)
+                self._fd_bloqueo = None
@@ -0,0 +1,278 @@
+import heapq
+import math
+import re
+import sys
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+class IndiceSecundario:
+    """
+    Índice secundario en memoria: valor -> conjunto de IDs de tareas.
+    Permite filtrar en O(resultado) en lugar de recorrer todas las tareas.
+    """
+
+    def __init__(self):
+        # ENCAPSULACIÓN: Conjuntos privados por valor
+        self._ids: Dict[Hashable, Set[int]] = defaultdict(set)
+
+    def agregar(self, valor: Hashable, id_tarea: int):
+        self._ids[valor].add(id_tarea)
+
+    def quitar(self, valor: Hashable, id_tarea: int):
+        ids = self._ids.get(valor)
+        if ids is not None:
+            ids.discard(id_tarea)
+            if not ids:
+                del self._ids[valor]
+
+    def mover(self, anterior: Hashable, nuevo: Hashable, id_tarea: int):
+        """Cambia un ID de valor (por ejemplo, de pendiente a completada)"""
+        if anterior != nuevo:
+            self.quitar(anterior, id_tarea)
+            self.agregar(nuevo, id_tarea)
+
+    def ids(self, valor: Hashable) -> Set[int]:
+        """Conjunto de IDs con ese valor (no debe modificarse desde fuera)"""
+        return self._ids.get(valor, set())
+
+    def contar(self, valor: Hashable) -> int:
+        return len(self._ids.get(valor, ()))
+
+    def conteos(self) -> Dict[Any, int]:
+        return {valor: len(ids) for valor, ids in self._ids.items()}
+
+
+class IndiceOrdenado:
+    """
+    Índice ordenado en memoria: lista de pares (clave, id) mantenida con bisect.
+    Permite contar y recorrer rangos de claves sin recorrer todas las tareas.
+    """
+
+    def __init__(self, entradas: Iterable[Tuple[Any, int]] = ()):
+        # ENCAPSULACIÓN: Lista privada ordenada por (clave, id)
+        self._entradas: List[Tuple[Any, int]] = sorted(entradas)
+
+    def agregar(self, clave: Any, id_tarea: int):
+        insort(self._entradas, (clave, id_tarea))
+
+    def quitar(self, clave: Any, id_tarea: int):
+        posicion = bisect_left(self._entradas, (clave, id_tarea))
+        if posicion < len(self._entradas) and self._entradas[posicion] == (clave, id_tarea):
+            del self._entradas[posicion]
+
+    def contar_menores(self, clave: Any) -> int:
+        """Número de entradas con clave estrictamente menor que la dada"""
+        return bisect_left(self._entradas, (clave,))
+
+    def primera_clave(self, desde: Optional[Any] = None) -> Optional[Any]:
+        """Menor clave que sea >= desde (None si no hay ninguna)"""
+        posicion = bisect_left(self._entradas, (desde,)) if desde is not None else 0
+        return self._entradas[posicion][0] if posicion < len(self._entradas) else None
+
+    def rango(self, desde: Optional[Any] = None, hasta: Optional[Any] = None) -> Iterator[int]:
+        """IDs con desde <= clave < hasta, en orden de clave"""
+        inicio = bisect_left(self._entradas, (desde,)) if desde is not None else 0
+        fin = bisect_left(self._entradas, (hasta,)) if hasta is not None else len(self._entradas)
+        for posicion in range(inicio, fin):
+            yield self._entradas[posicion][1]
+
+    def pagina(self, despues: Optional[Tuple[Any, int]] = None, limite: Optional[int] = None,
+               incluir: Optional[Set[int]] = None) -> List[int]:
+        """
+        Paginación por cursor (keyset): IDs posteriores a la entrada (clave, id)
+        dada que estén en incluir, hasta limite. Coste O(página + saltadas).
+        """
+        posicion = bisect_right(self._entradas, despues) if despues is not None else 0
+        resultado = []
+        while posicion < len(self._entradas) and (limite is None or len(resultado) < limite):
+            id_tarea = self._entradas[posicion][1]
+            if incluir is None or id_tarea in incluir:
+                resultado.append(id_tarea)
+            posicion += 1
+        return resultado
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+# Búsqueda de texto: minúsculas, sin acentos (NFKD sin marcas combinantes) y por palabras
+_MARCAS = re.compile("[\u0300-\u036f]")
+_PALABRA = re.compile(r"\w+")
+# Los términos más cortos solo coinciden completos (un prefijo de una letra abarca demasiados)
+MIN_PREFIJO = 2
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Palabras normalizadas del texto, sin repetir y en orden de aparición"""
+    normalizado = _MARCAS.sub("", unicodedata.normalize("NFKD", texto.casefold()))
+    return list(dict.fromkeys(_PALABRA.findall(normalizado)))
+
+
+class IndiceTexto:
+    """
+    Índice invertido en memoria sobre título y descripción: término -> IDs.
+    Cada palabra de la consulta coincide con los términos que empiezan por ella;
+    las tareas deben contener todas las palabras. El orden de los resultados
+    premia las coincidencias exactas, el título y los términos poco frecuentes
+    (a igual puntuación, en el orden interno del índice).
+    """
+    # Peso de cada campo y de una coincidencia por prefijo frente a una exacta
+    PESO_TITULO = 2.0
+    PESO_DESCRIPCION = 1.0
+    PESO_PREFIJO = 0.5
+    # Términos como máximo en que se expande un prefijo (los más cortos primero)
+    MAX_EXPANSION = 64
+    # Combinaciones de coincidencias que se recorren antes de puntuar una a una
+    MAX_COMBINACIONES = 512
+
+    def __init__(self):
+        # ENCAPSULACIÓN: IDs por término (en cualquier campo y solo en el título),
+        # vocabulario ordenado (para buscar prefijos con bisect) y términos de
+        # cada tarea (para quitarla o ver qué ha cambiado)
+        self._ids: Dict[str, Set[int]] = {}
+        self._titulo: Dict[str, Set[int]] = {}
+        self._vocabulario: List[str] = []
+        self._terminos: Dict[int, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+
+    def indexar(self, id_tarea: int, titulo: str, descripcion: str):
+        """Añade la tarea o actualiza sus términos (solo se tocan los que cambian)"""
+        nuevos = (tuple(sys.intern(t) for t in tokenizar(titulo)),
+                  tuple(sys.intern(t) for t in tokenizar(descripcion)))
+        anteriores = self._terminos.get(id_tarea, ((), ()))
+        if nuevos == anteriores:
+            return
+        self._cambiar(self._titulo, set(anteriores[0]), set(nuevos[0]), id_tarea)
+        self._cambiar(self._ids, set(anteriores[0]).union(anteriores[1]),
+                      set(nuevos[0]).union(nuevos[1]), id_tarea)
+        self._terminos[id_tarea] = nuevos
+
+    def quitar(self, id_tarea: int):
+        anteriores = self._terminos.pop(id_tarea, None)
+        if anteriores is not None:
+            self._cambiar(self._titulo, set(anteriores[0]), set(), id_tarea)
+            self._cambiar(self._ids, set(anteriores[0]).union(anteriores[1]), set(), id_tarea)
+
+    def _cambiar(self, lista: Dict[str, Set[int]], antes: Set[str], ahora: Set[str], id_tarea: int):
+        for termino in antes - ahora:
+            ids = lista[termino]
+            ids.discard(id_tarea)
+            if not ids:
+                del lista[termino]
+                if lista is self._ids:
+                    del self._vocabulario[bisect_left(self._vocabulario, termino)]
+        for termino in ahora - antes:
+            ids = lista.get(termino)
+            if ids is None:
+                ids = lista[termino] = set()
+                if lista is self._ids:
+                    insort(self._vocabulario, termino)
+            ids.add(id_tarea)
+
+    def _expandir(self, palabra: str) -> List[Tuple[str, float]]:
+        """Términos del vocabulario que coinciden con la palabra y su peso (exacto o prefijo)"""
+        if len(palabra) < MIN_PREFIJO:
+            return [(palabra, 1.0)] if palabra in self._ids else []
+        inicio = bisect_left(self._vocabulario, palabra)
+        fin = bisect_left(self._vocabulario, palabra + "\U0010ffff", inicio)
+        terminos = self._vocabulario[inicio:fin]
+        if len(terminos) > self.MAX_EXPANSION:
+            terminos = sorted(terminos, key=len)[:self.MAX_EXPANSION]
+        return [(termino, 1.0 if termino == palabra else self.PESO_PREFIJO) for termino in terminos]
+
+    def buscar(self, consulta: str, limite: int = 20) -> Tuple[List[int], int]:
+        """IDs de las limite mejores coincidencias y el número total de coincidencias"""
+        expansiones = [self._expandir(palabra) for palabra in tokenizar(consulta)]
+        if not expansiones or not all(expansiones):
+            return [], 0
+
+        por_palabra = [[self._ids[termino] for termino, _ in expansion] for expansion in expansiones]
+
+        # Por palabra, grupos (peso, IDs) de mayor a menor peso: campo x exacto/prefijo x rareza (idf).
+        # Una tarea del título también está en _ids, pero su grupo del título pesa más y va antes.
+        total_tareas = len(self._terminos)
+        grupos = []
+        for expansion in expansiones:
+            grupos_palabra = []
+            for termino, peso in expansion:
+                ids = self._ids[termino]
+                idf = math.log(1 + total_tareas / (1 + len(ids)))
+                if termino in self._titulo:
+                    grupos_palabra.append((peso * idf * self.PESO_TITULO, self._titulo[termino]))
+                grupos_palabra.append((peso * idf * self.PESO_DESCRIPCION, ids))
+            grupos_palabra.sort(key=lambda grupo: grupo[0], reverse=True)
+            grupos.append(grupos_palabra)
+
+        # Cada combinación (un grupo por palabra) tiene una puntuación fija; recorriéndolas
+        # de mayor a menor, una tarea aparece por primera vez en la de su puntuación real
+        mejores, vistas = [], set()
+        for numero, combinacion in enumerate(self._combinaciones(grupos)):
+            if numero == self.MAX_COMBINACIONES:
+                break
+            conjuntos = sorted((grupos[palabra][indice][1] for palabra, indice in enumerate(combinacion)), key=len)
+            coinciden = conjuntos[0].intersection(*conjuntos[1:]) if len(conjuntos) > 1 else conjuntos[0]
+            for id_tarea in coinciden:
+                if id_tarea not in vistas:
+                    vistas.add(id_tarea)
+                    mejores.append(id_tarea)
+                    if len(mejores) == limite:
+                        return mejores, self._contar(por_palabra)
+        else:
+            return mejores, self._contar(por_palabra)
+
+        # Demasiadas combinaciones con pocas tareas: se puntúan todas las coincidencias
+        def puntuacion(id_tarea: int) -> float:
+            # Por cada palabra cuenta su mejor coincidencia
+            total = 0.0
+            for grupos_palabra in grupos:
+                for peso, ids in grupos_palabra:
+                    if id_tarea in ids:
+                        total += peso
+                        break
+            return total
+
+        candidatos = self._coincidencias(por_palabra)
+        return heapq.nsmallest(limite, candidatos, key=lambda id_tarea: -puntuacion(id_tarea)), len(candidatos)
+
+    @staticmethod
+    def _coincidencias(por_palabra: List[List[Set[int]]]) -> Set[int]:
+        """
+        Tareas con alguno de los términos de cada palabra. Se parte de la palabra con
+        menos tareas y se interseca con cada término de las demás (recorre el menor de
+        los dos conjuntos), sin unir los conjuntos de las palabras frecuentes.
+        """
+        por_palabra = sorted(por_palabra, key=lambda conjuntos: sum(map(len, conjuntos)))
+        coinciden = por_palabra[0][0] if len(por_palabra[0]) == 1 else set().union(*por_palabra[0])
+        for conjuntos in por_palabra[1:]:
+            coinciden = set().union(*(coinciden.intersection(ids) for ids in conjuntos))
+        return coinciden
+
+    def _contar(self, por_palabra: List[List[Set[int]]]) -> int:
+        """Número de coincidencias; con una sola palabra no se copia su conjunto más grande"""
+        if len(por_palabra) > 1:
+            return len(self._coincidencias(por_palabra))
+        *menores, mayor = sorted(por_palabra[0], key=len)
+        return len(mayor) + (len(set().union(*menores).difference(mayor)) if menores else 0)
+
+    @staticmethod
+    def _combinaciones(grupos: List[List[Tuple[float, Set[int]]]]) -> Iterator[Tuple[int, ...]]:
+        """Índices de un grupo por palabra, de mayor a menor suma de pesos (sin generarlas todas)"""
+        inicial = (0,) * len(grupos)
+        pendientes = [(-sum(grupos_palabra[0][0] for grupos_palabra in grupos), inicial)]
+        generadas = {inicial}
+        while pendientes:
+            peso, combinacion = heapq.heappop(pendientes)
+            yield combinacion
+            for palabra, indice in enumerate(combinacion):
+                if indice + 1 < len(grupos[palabra]):
+                    siguiente = combinacion[:palabra] + (indice + 1,) + combinacion[palabra + 1:]
+                    if siguiente not in generadas:
+                        generadas.add(siguiente)
+                        heapq.heappush(pendientes, (
+                            peso + grupos[palabra][indice][0] - grupos[palabra][indice + 1][0], siguiente
+                        ))
+
+    def __len__(self) -> int:
+        return len(self._terminos)
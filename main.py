@@ -1,26 +1,104 @@
-from fastapi import FastAPI, Request, HTTPException, Query
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request, HTTPException, Query, Body, Header
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.templating import Jinja2Templates
-from typing import Optional, List
-from datetime import datetime
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, Callable, Type, Tuple
+from datetime import datetime, timedelta
+from pydantic import BaseModel, ValidationError
+import asyncio
+import logging
+import os
+import zlib
 
 # Importar nuestras clases y esquemas
-from models import TareaBase
+from models import TareaBase, CAMPOS_RESPUESTA
 from gestor import GestorTareas
+from almacenamiento import crear_almacen
+from archivo import ArchivoTareas
+from historial import HistorialTareas
+from serializacion import a_json, lista_a_json, agrupar_ndjson, lineas_ndjson, DURACION_SERIALIZACION
+from cache_respuestas import CacheRespuestas, etiqueta, coincide_etag
+from compresion import MiddlewareCompresion, PaginaPrecomprimida, NIVELES, MINIMO_BYTES
+from deduplicacion import ConsultasCompartidas, ResultadosIdempotentes, MiddlewareIdempotencia
+from eventos import BusEventos
+from metricas import registro_metricas, MiddlewareMetricas, TIPO_CONTENIDO
+from perfilador import PerfiladorMuestreo
+from vencimientos import PlanificadorVencimientos, NotificadorWebhook
 from schemas import (
     TareaCreate, TareaUpdate, TareaResponse, ListaTareasResponse,
     EstadisticasResponse, ErrorResponse, MensajeResponse,
-    EstadoTareaSchema
+    MetricasPersistenciaResponse, EstadoTareaSchema, TipoTareaSchema, PrioridadTareaSchema,
+    OrdenTareasSchema, TareaUpdateLote, ResultadoLoteResponse,
+    TareaImport, ResultadoImportacionResponse, SaludResponse,
+    IntervaloSeriesSchema, SeriesEstadisticasResponse, HistorialTareaResponse
 )
 
+logger = logging.getLogger(__name__)
+
+async def cargar_en_segundo_plano():
+    """
+    Arranque perezoso: termina de cargar las tareas del snapshot por bloques,
+    cediendo el event loop entre bloque y bloque para seguir atendiendo peticiones
+    """
+    while await ejecutar(gestor.continuar_carga):
+        await asyncio.sleep(0)
+    # Con todas las tareas cargadas, las fechas límite se procesan al llegar
+    await planificador.iniciar()
+    # Después, el índice del historial (lo que lo necesite antes termina de construirlo)
+    while await ejecutar(gestor.continuar_carga_historial):
+        await asyncio.sleep(0)
+    periodicas = []
+    if ANTIGUEDAD_ARCHIVO is not None:
+        periodicas.append(archivar_periodicamente())
+    if RUTA_HISTORIAL and RETENCION_HISTORIAL is not None:
+        periodicas.append(compactar_historial_periodicamente())
+    await asyncio.gather(*periodicas)
+
+async def archivar_periodicamente():
+    """Cada INTERVALO_ARCHIVO segundos, mueve al archivo las tareas completadas hace más de ANTIGUEDAD_ARCHIVO"""
+    while True:
+        try:
+            # Por lotes: entre uno y otro se atienden las demás peticiones
+            while await ejecutar(gestor.archivar_completadas, ANTIGUEDAD_ARCHIVO, LOTE_ARCHIVO) == LOTE_ARCHIVO:
+                await asyncio.sleep(0)
+        except Exception:
+            logger.exception("Error al archivar las tareas completadas")
+        await asyncio.sleep(INTERVALO_ARCHIVO)
+
+async def compactar_historial_periodicamente():
+    """Cada INTERVALO_HISTORIAL segundos, quita del historial las revisiones de hace más de RETENCION_HISTORIAL"""
+    while True:
+        try:
+            await ejecutar(gestor.compactar_historial, RETENCION_HISTORIAL)
+        except Exception:
+            logger.exception("Error al compactar el historial")
+        await asyncio.sleep(INTERVALO_HISTORIAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    carga = asyncio.create_task(cargar_en_segundo_plano())
+    bus_eventos.iniciar()
+    yield
+    bus_eventos.detener()
+    carga.cancel()
+    await planificador.detener()
+    if notificador_webhook is not None:
+        notificador_webhook.cerrar()
+    if perfilador is not None:
+        perfilador.detener()
+    # Escribir los cambios pendientes antes de apagar el servidor
+    gestor.cerrar()
+
 # Crear la aplicación FastAPI
 app = FastAPI(
     title="API Gestor de Tareas",
     description="Una API simple para gestionar tareas aplicando principios de POO",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS para el frontend
@@ -32,40 +110,305 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configurar Jinja2
-templates = Jinja2Templates(directory="templates")
+# Idempotency-Key en las rutas que modifican tareas: los reintentos con la misma clave reciben
+# la respuesta guardada sin volver a ejecutarse. TAREAS_IDEMPOTENCIA_TTL: segundos que se guarda
+# cada respuesta (por defecto 24 h); TAREAS_IDEMPOTENCIA_MAX: número máximo de claves guardadas
+resultados_idempotentes = ResultadosIdempotentes(
+    ttl=float(os.getenv("TAREAS_IDEMPOTENCIA_TTL", str(24 * 3600))),
+    max_entradas=int(os.getenv("TAREAS_IDEMPOTENCIA_MAX", "10000"))
+)
+app.add_middleware(MiddlewareIdempotencia, resultados=resultados_idempotentes)
+
+# Compresión de las respuestas de /tareas (gzip, o brotli si está instalado) según Accept-Encoding.
+# TAREAS_COMPRESION_MINIMO: bytes a partir de los que se comprime una respuesta;
+# TAREAS_COMPRESION_NIVEL_GZIP / TAREAS_COMPRESION_NIVEL_BR: niveles (ver compresion.NIVELES)
+# Las versiones comprimidas de las respuestas con ETag se reutilizan desde esta caché
+cache_comprimidas = CacheRespuestas(16 * 1024 * 1024)
+app.add_middleware(
+    MiddlewareCompresion,
+    prefijos=("/tareas",),
+    minimo=int(os.getenv("TAREAS_COMPRESION_MINIMO", str(MINIMO_BYTES))),
+    niveles={"gzip": int(os.getenv("TAREAS_COMPRESION_NIVEL_GZIP", str(NIVELES["gzip"]))),
+             "br": int(os.getenv("TAREAS_COMPRESION_NIVEL_BR", str(NIVELES["br"])))},
+    cache=cache_comprimidas
+)
+
+# TAREAS_PERFIL_UMBRAL_MS: si se define, las peticiones que tarden más (en milisegundos)
+# guardan un perfil de muestreo en TAREAS_PERFIL_DIRECTORIO (por defecto "perfiles"),
+# con una muestra cada TAREAS_PERFIL_INTERVALO_MS (por defecto 5)
+perfilador = PerfiladorMuestreo(
+    float(os.environ["TAREAS_PERFIL_UMBRAL_MS"]) / 1000,
+    intervalo=float(os.getenv("TAREAS_PERFIL_INTERVALO_MS", "5")) / 1000,
+    directorio=os.getenv("TAREAS_PERFIL_DIRECTORIO", "perfiles")
+) if os.getenv("TAREAS_PERFIL_UMBRAL_MS") else None
+
+# Latencia y número de peticiones por ruta, en GET /metrics
+app.add_middleware(
+    MiddlewareMetricas,
+    duracion=registro_metricas.histograma("tareas_http_peticion_segundos", "Duración de las peticiones HTTP",
+                                          ("metodo", "ruta")),
+    peticiones=registro_metricas.contador("tareas_http_peticiones_total", "Peticiones HTTP atendidas",
+                                          ("metodo", "ruta", "estado")),
+    perfilador=perfilador
+)
+
+# Configurar Jinja2 (la carpeta de plantillas junto a este archivo: la página se renderiza
+# al importar el módulo, y los benchmarks lo importan desde otro directorio)
+templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates"))
+
+# La página principal no depende de la petición: se renderiza y se comprime una vez al arrancar.
+# TAREAS_PAGINA_MAX_AGE: segundos que el navegador la usa sin preguntar (después revalida con la ETag)
+pagina_principal = PaginaPrecomprimida(
+    templates.get_template("index.html").render().encode("utf-8"), "text/html; charset=utf-8",
+    max_age=int(os.getenv("TAREAS_PAGINA_MAX_AGE", "300"))
+)
 
 # Instancia global del gestor de tareas
-gestor = GestorTareas()
+# TAREAS_ALMACEN: "memoria" (por defecto) o "sqlite" (los datos no se cargan en RAM)
+# TAREAS_PERSISTENCIA: "json" (archivo único), "journal" (log + snapshot) o "binario"
+# (log + snapshot binario indexado, con arranque perezoso), solo en memoria
+# Con varios workers (uvicorn --workers N) usar "sqlite": todos comparten la base de datos.
+# TAREAS_SQLITE_BLOQUE_IDS: IDs que reserva cada worker de una vez (1: IDs consecutivos)
+# Archivo (solo en memoria): TAREAS_ARCHIVO_DIAS hace que las tareas completadas hace más de
+# esos días salgan del almacén a segmentos comprimidos en TAREAS_ARCHIVO_DIRECTORIO (por defecto
+# "archivo"), cada TAREAS_ARCHIVO_INTERVALO segundos (por defecto 3600). Siguen en GET /tareas/{id}
+# y en GET /tareas/archivadas
+# TAREAS_HISTORIAL: log del historial de cambios de cada tarea, p. ej. "historial.log" (sin él
+# no hay historial): GET /tareas/{id}/historial y GET /tareas/{id}?at=<fecha>. Con SQLite los
+# workers comparten el log. Cada TAREAS_HISTORIAL_INTERVALO segundos (3600) se quitan las
+# revisiones de hace más de TAREAS_HISTORIAL_DIAS días (90; 0 las conserva todas)
+ALMACEN = os.getenv("TAREAS_ALMACEN", "memoria")
+RUTA_HISTORIAL = os.getenv("TAREAS_HISTORIAL") or None
+gestor = GestorTareas(
+    almacen=crear_almacen(
+        ALMACEN,
+        modo_persistencia=os.getenv("TAREAS_PERSISTENCIA", "json"),
+        ruta_sqlite=os.getenv("TAREAS_SQLITE_RUTA", "tareas.db"),
+        bloque_ids=int(os.getenv("TAREAS_SQLITE_BLOQUE_IDS", "1"))
+    ),
+    archivo=ArchivoTareas(os.getenv("TAREAS_ARCHIVO_DIRECTORIO", "archivo")) if ALMACEN == "memoria" else None,
+    historial=HistorialTareas(RUTA_HISTORIAL, compartido=ALMACEN == "sqlite") if RUTA_HISTORIAL else None
+)
+ANTIGUEDAD_ARCHIVO = (timedelta(days=float(os.environ["TAREAS_ARCHIVO_DIAS"]))
+                      if os.getenv("TAREAS_ARCHIVO_DIAS") and ALMACEN == "memoria" else None)
+INTERVALO_ARCHIVO = float(os.getenv("TAREAS_ARCHIVO_INTERVALO", "3600"))
+DIAS_HISTORIAL = float(os.getenv("TAREAS_HISTORIAL_DIAS", "90"))
+RETENCION_HISTORIAL = timedelta(days=DIAS_HISTORIAL) if DIAS_HISTORIAL > 0 else None
+INTERVALO_HISTORIAL = float(os.getenv("TAREAS_HISTORIAL_INTERVALO", "3600"))
+# Tareas que se archivan de una vez: cada lote retiene el cerrojo de escritura
+# (unos 80 ms por cada 1000 tareas), y entre lote y lote pasan las demás escrituras
+LOTE_ARCHIVO = 1000
+
+# Eventos de cambios para GET /tareas/eventos (Server-Sent Events)
+# TAREAS_EVENTOS_POLITICA: qué hacer con un cliente que no lee a tiempo sus eventos:
+# "resincronizar" (por defecto, recibe un evento para recargar todo) o "desconectar"
+bus_eventos = BusEventos(politica=os.getenv("TAREAS_EVENTOS_POLITICA", "resincronizar"))
+
+def publicar_cambio(operacion: str, id_tarea: int, tarea: Optional[TareaBase], version: int):
+    """Observador del gestor: publica cada cambio con la tarea ya serializada"""
+    datos = b'{"id":%d,"tarea":%s}' % (id_tarea, tarea.to_json() if tarea is not None else b"null")
+    bus_eventos.publicar(operacion, version, datos)
+
+gestor.agregar_observador(publicar_cambio)
+
+# TAREAS_HANDLERS: "async" (por defecto) ejecuta las operaciones del gestor en el event loop;
+# "hilos" las ejecuta en el threadpool de FastAPI, como si los handlers fueran def,
+# para que el trabajo bloqueante (SQLite, listas grandes) no detenga las demás peticiones.
+# El gestor es seguro entre hilos: las consultas comparten un cerrojo de lectura
+# y las modificaciones toman el de escritura.
+EJECUTAR_EN_HILOS = os.getenv("TAREAS_HANDLERS", "async") == "hilos"
+
+async def ejecutar(funcion: Callable, *args, **kwargs):
+    """Ejecuta una operación del gestor en el event loop o en el threadpool según TAREAS_HANDLERS"""
+    if EJECUTAR_EN_HILOS:
+        if perfilador is not None:
+            funcion = perfilador.en_hilo(funcion)
+        return await run_in_threadpool(funcion, *args, **kwargs)
+    return funcion(*args, **kwargs)
+
+# Vencimientos: al llegar cada fecha límite la tarea se marca como vencida y se avisa
+# con el evento "vencer" (y al webhook). TAREAS_VENCIMIENTOS_WEBHOOK: URL a la que
+# enviar por POST las tareas que vencen, p. ej. http://127.0.0.1:9000/vencidas
+planificador = PlanificadorVencimientos(gestor, ejecutar=ejecutar)
+notificador_webhook = (NotificadorWebhook(os.environ["TAREAS_VENCIMIENTOS_WEBHOOK"])
+                       if os.getenv("TAREAS_VENCIMIENTOS_WEBHOOK") else None)
+if notificador_webhook is not None:
+    gestor.agregar_observador(notificador_webhook)
+
+# Lecturas idénticas simultáneas: una sola consulta y serialización para todas
+consultas_compartidas = ConsultasCompartidas()
+gestor.agregar_observador(consultas_compartidas)
+
+def tarea_json(cerrojo: Callable, operacion: Callable, *args, **kwargs) -> Optional[str]:
+    """
+    Ejecuta una operación del gestor que devuelve una tarea (o None) y la serializa
+    con los campos de TareaResponse sin soltar el cerrojo: ningún otro hilo puede
+    modificarla mientras se serializa.
+    Evita el paso por to_dict -> TareaResponse -> validación de FastAPI.
+    """
+    with cerrojo():
+        tarea = operacion(*args, **kwargs)
+        if tarea is None:
+            return None
+        with DURACION_SERIALIZACION.medir("tarea"):
+            return tarea.to_json()
+
+def lista_json(operacion: Callable, *args, **kwargs) -> str:
+    """Ejecuta una consulta del gestor y la serializa como ListaTareasResponse con el cerrojo de lectura"""
+    with gestor.lectura():
+        tareas = operacion(*args, **kwargs)
+        return lista_a_json((t.to_json() for t in tareas), len(tareas))
+
+def json_a_response(contenido: str, status_code: int = 200) -> Response:
+    """Devuelve un contenido ya serializado en JSON"""
+    return Response(content=contenido, media_type="application/json", status_code=status_code)
+
+# Respuestas de lectura ya serializadas, por ruta, filtros y versión de los datos
+cache_respuestas = CacheRespuestas()
+
+# Respuestas que no estaban en la caché: consulta al gestor + serialización
+DURACION_RENDERIZADO = registro_metricas.histograma(
+    "tareas_renderizado_segundos", "Duración de las respuestas de lectura generadas (fuera de la caché)", ("vista",)
+)
+
+def consulta_condicional(version: Callable[[], Optional[tuple]], renderizar: Callable[[], bytes],
+                         si_no_coincide: Optional[str],
+                         clave: Optional[tuple] = None) -> Tuple[Optional[str], Optional[bytes]]:
+    """
+    GET condicional. Se hace con el cerrojo de lectura, así que la versión y el
+    contenido corresponden al mismo estado de las tareas. Devuelve:
+    - (None, None) si el recurso no existe (version() devuelve None)
+    - (etag, None) si el cliente ya tiene esa versión (If-None-Match): no se renderiza nada
+    - (etag, contenido) en otro caso; con clave, el contenido se reutiliza de la caché de respuestas
+    """
+    with gestor.lectura():
+        version_actual = version()
+        if version_actual is None:
+            return None, None
+        if clave is not None:
+            # Cada combinación de filtros y página tiene su propia ETag
+            version_actual += (zlib.crc32(repr(clave).encode()),)
+        etag = etiqueta(version_actual)
+        if coincide_etag(si_no_coincide, etag):
+            return etag, None
+        contenido = cache_respuestas.obtener((clave, etag)) if clave is not None else None
+        if contenido is None:
+            with DURACION_RENDERIZADO.medir(clave[0] if clave is not None else "tarea"):
+                contenido = renderizar()
+            if clave is not None:
+                cache_respuestas.guardar((clave, etag), contenido)
+        return etag, contenido
+
+async def consulta_compartida(version: Callable[[], Optional[tuple]], renderizar: Callable[[], bytes],
+                              si_no_coincide: Optional[str], clave: tuple) -> Tuple[Optional[str], Optional[bytes]]:
+    """
+    consulta_condicional desde un handler. Con TAREAS_HANDLERS=hilos, las peticiones con la
+    misma clave e If-None-Match que llegan mientras otra se calcula en el threadpool esperan
+    su resultado en lugar de consultar y serializar otra vez. En el event loop las consultas
+    no se solapan: no hay nada que compartir.
+    """
+    if not EJECUTAR_EN_HILOS:
+        return consulta_condicional(version, renderizar, si_no_coincide, clave)
+    return await consultas_compartidas.ejecutar((clave, si_no_coincide), ejecutar, consulta_condicional,
+                                                version, renderizar, si_no_coincide, clave)
 
-def tarea_a_response(tarea: TareaBase) -> TareaResponse:
-    """Convierte una tarea del modelo a schema de respuesta"""
-    data = tarea.to_dict()
-    return TareaResponse(**data)
+def respuesta_condicional(etag: str, contenido: Optional[bytes]) -> Response:
+    """200 con el contenido o 304 sin cuerpo; no-cache: el navegador revalida siempre con If-None-Match"""
+    cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+    if contenido is None:
+        return Response(status_code=304, headers=cabeceras)
+    return Response(content=contenido, media_type="application/json", headers=cabeceras)
 
-# Ruta para la página principal con Jinja2
+async def esperar_durabilidad(durable: bool):
+    """Espera a que los cambios estén en disco solo si la petición lo pide"""
+    if durable:
+        await asyncio.wrap_future(gestor.confirmar_persistencia())
+
+DURABLE_QUERY = Query(False, description="Esperar a que el cambio esté escrito en disco")
+IF_NONE_MATCH_HEADER = Header(None, alias="If-None-Match",
+                              description="ETag de una respuesta anterior: si no hay cambios se responde 304")
+TRANSACCIONAL_QUERY = Query(False, description="Aplicar el lote solo si todos los elementos son válidos")
+
+def datos_creacion(tarea_data: TareaCreate) -> Dict[str, Any]:
+    """Argumentos de GestorTareas.crear_tarea a partir del esquema validado"""
+    datos = {"tipo": tarea_data.tipo.value, "titulo": tarea_data.titulo, "descripcion": tarea_data.descripcion}
+    if tarea_data.prioridad:
+        datos["prioridad"] = tarea_data.prioridad.value
+    if tarea_data.fecha_limite:
+        datos["fecha_limite"] = tarea_data.fecha_limite
+    return datos
+
+def datos_actualizacion(tarea_data: TareaUpdate) -> Dict[str, Any]:
+    """Campos de GestorTareas.actualizar_tarea a partir del esquema validado"""
+    update_data = tarea_data.model_dump(exclude_none=True)
+    
+    if "estado" in update_data:
+        update_data["estado"] = update_data["estado"].value
+    if "prioridad" in update_data:
+        update_data["prioridad"] = update_data["prioridad"].value
+    return update_data
+
+def mensaje_validacion(e: ValidationError) -> str:
+    """Resume en una línea los errores de validación de Pydantic"""
+    return "; ".join(
+        f"{'.'.join(str(parte) for parte in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in e.errors()
+    )
+
+def validar_lote(elementos: List[Any], esquema: Type[BaseModel]):
+    """
+    Valida cada elemento del lote por separado con el esquema dado.
+    Devuelve ({índice: modelo} de los válidos, {índice: error} de los no válidos).
+    """
+    validos, errores = {}, {}
+    for indice, elemento in enumerate(elementos):
+        try:
+            validos[indice] = esquema.model_validate(elemento)
+        except ValidationError as e:
+            errores[indice] = mensaje_validacion(e)
+    return validos, errores
+
+async def aplicar_lote(operacion: Callable, datos: Dict[int, Any], errores: Dict[int, str],
+                       total: int, transaccional: bool, durable: bool) -> Response:
+    """
+    Aplica con el gestor los elementos válidos del lote y une sus resultados
+    con los errores de validación, en el orden en que llegaron
+    """
+    resultados = [{"indice": indice, "id": None, "error": errores.get(indice)} for indice in range(total)]
+    if not (transaccional and errores):
+        for indice, resultado in zip(datos, await ejecutar(operacion, list(datos.values()), transaccional)):
+            resultados[indice]["id"] = resultado["id"]
+            resultados[indice]["error"] = resultado["error"]
+    
+    fallidos = sum(1 for resultado in resultados if resultado["error"] is not None)
+    aplicado = not (transaccional and fallidos)
+    if aplicado:
+        await esperar_durabilidad(durable)
+    
+    contenido = a_json({
+        "resultados": resultados,
+        "correctos": total - fallidos if aplicado else 0,
+        "errores": fallidos,
+        "aplicado": aplicado
+    })
+    return Response(content=contenido, media_type="application/json", status_code=200 if aplicado else 400)
+
+# Ruta para la página principal (plantilla Jinja2 ya renderizada y comprimida)
 @app.get("/", response_class=HTMLResponse)
-async def root(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+async def root(
+    aceptadas: Optional[str] = Header(None, alias="Accept-Encoding"),
+    si_no_coincide: Optional[str] = IF_NONE_MATCH_HEADER
+):
+    return pagina_principal.respuesta(aceptadas, si_no_coincide)
 
 # Ruta para crear una nueva tarea
 @app.post("/tareas", response_model=TareaResponse, status_code=201)
-async def crear_tarea(tarea_data: TareaCreate):
+async def crear_tarea(tarea_data: TareaCreate, durable: bool = DURABLE_QUERY):
     try:
-        kwargs = {}
-        if tarea_data.prioridad:
-            kwargs["prioridad"] = tarea_data.prioridad.value
-        if tarea_data.fecha_limite:
-            kwargs["fecha_limite"] = tarea_data.fecha_limite
+        contenido = await ejecutar(tarea_json, gestor.escritura, gestor.crear_tarea, **datos_creacion(tarea_data))
+        await esperar_durabilidad(durable)
         
-        tarea = gestor.crear_tarea(
-            tipo=tarea_data.tipo.value,
-            titulo=tarea_data.titulo,
-            descripcion=tarea_data.descripcion,
-            **kwargs
-        )
-        
-        return tarea_a_response(tarea)
+        return json_a_response(contenido, status_code=201)
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -75,56 +418,293 @@ async def crear_tarea(tarea_data: TareaCreate):
 # Ruta para listar todas las tareas
 @app.get("/tareas", response_model=ListaTareasResponse)
 async def listar_tareas(
-    estado: Optional[EstadoTareaSchema] = Query(None, description="Filtrar por estado")
+    estado: Optional[EstadoTareaSchema] = Query(None, description="Filtrar por estado"),
+    tipo: Optional[TipoTareaSchema] = Query(None, description="Filtrar por tipo de tarea"),
+    prioridad: Optional[PrioridadTareaSchema] = Query(None, description="Filtrar por prioridad"),
+    orden: OrdenTareasSchema = Query(OrdenTareasSchema.id, description="Campo de ordenación"),
+    limite: Optional[int] = Query(None, alias="limit", ge=1, le=1000, description="Tareas por página"),
+    despues_de: Optional[int] = Query(None, alias="after_id", description="Cursor: ID de la última tarea recibida"),
+    si_no_coincide: Optional[str] = IF_NONE_MATCH_HEADER
 ):
-    try:
-        estado_str = estado.value if estado else None
-        tareas = gestor.listar_tareas(estado=estado_str)
-        
-        tareas_response = [tarea_a_response(t) for t in tareas]
-        
-        return ListaTareasResponse(
-            tareas=tareas_response,
-            total=len(tareas_response)
-        )
+    filtros = {
+        "estado": estado.value if estado else None,
+        "tipo": tipo.value if tipo else None,
+        "prioridad": prioridad.value if prioridad else None
+    }
     
+    def listar() -> bytes:
+        # La página y el total se leen con el mismo cerrojo: son consistentes entre sí
+        tareas = gestor.listar_tareas(orden=orden.value, limite=limite, despues_de=despues_de, **filtros)
+        # Hay más páginas si se llenó la actual
+        siguiente_id = tareas[-1].id if limite is not None and len(tareas) == limite else None
+        return lista_a_json((t.to_json() for t in tareas), gestor.contar_tareas(**filtros), siguiente_id)
+    
+    clave = ("tareas", orden.value, limite, despues_de) + tuple(filtros.values())
+    try:
+        return respuesta_condicional(*await consulta_compartida(gestor.version, listar, si_no_coincide, clave))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail="Error al obtener las tareas")
 
+# Rutas para operar con varias tareas a la vez (antes de /tareas/{tarea_id})
+# Cada elemento se valida por separado y todo el lote se persiste de una vez
+@app.post("/tareas/bulk", response_model=ResultadoLoteResponse)
+async def crear_tareas_lote(
+    elementos: List[Any] = Body(..., description="Tareas a crear (esquema TareaCreate)"),
+    transaccional: bool = TRANSACCIONAL_QUERY,
+    durable: bool = DURABLE_QUERY
+):
+    validos, errores = validar_lote(elementos, TareaCreate)
+    datos = {indice: datos_creacion(tarea_data) for indice, tarea_data in validos.items()}
+    return await aplicar_lote(gestor.crear_tareas, datos, errores, len(elementos), transaccional, durable)
+
+@app.patch("/tareas/bulk", response_model=ResultadoLoteResponse)
+async def actualizar_tareas_lote(
+    elementos: List[Any] = Body(..., description="Actualizaciones con el ID de cada tarea (esquema TareaUpdateLote)"),
+    transaccional: bool = TRANSACCIONAL_QUERY,
+    durable: bool = DURABLE_QUERY
+):
+    validos, errores = validar_lote(elementos, TareaUpdateLote)
+    datos = {indice: {"id": tarea_data.id, **datos_actualizacion(tarea_data)}
+             for indice, tarea_data in validos.items()}
+    return await aplicar_lote(gestor.actualizar_tareas, datos, errores, len(elementos), transaccional, durable)
+
+@app.delete("/tareas/bulk", response_model=ResultadoLoteResponse)
+async def eliminar_tareas_lote(
+    ids: List[int] = Body(..., description="IDs de las tareas a eliminar"),
+    transaccional: bool = TRANSACCIONAL_QUERY,
+    durable: bool = DURABLE_QUERY
+):
+    datos = dict(enumerate(ids))
+    return await aplicar_lote(gestor.eliminar_tareas, datos, {}, len(ids), transaccional, durable)
+
+# Tareas por bloque de importación: cada bloque se persiste de una vez
+TAMANO_BLOQUE_IMPORTACION = 1000
+# Errores de importación que se devuelven con detalle (el resto solo se cuentan)
+MAX_ERRORES_IMPORTACION = 100
+
+# Ruta para exportar todas las tareas en NDJSON (una tarea por línea)
+@app.get("/tareas/export")
+async def exportar_tareas():
+    def generar():
+        # Se recorre el almacén y se envía por bloques, sin construir la lista completa
+        for bloque in agrupar_ndjson(tarea.to_json() for tarea in gestor.iterar_tareas()):
+            yield bloque
+    
+    async def generar_en_event_loop():
+        for bloque in generar():
+            yield bloque
+    
+    # StreamingResponse recorre los generadores síncronos en el threadpool
+    return StreamingResponse(
+        generar() if EJECUTAR_EN_HILOS else generar_en_event_loop(), media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="tareas.ndjson"'}
+    )
+
+# Ruta de búsqueda de texto en título y descripción (antes de /tareas/{tarea_id})
+@app.get("/tareas/buscar", response_model=ListaTareasResponse)
+async def buscar_tareas(
+    q: str = Query(..., min_length=1, max_length=200, description="Palabras a buscar (también como prefijo)"),
+    limite: int = Query(20, alias="limit", ge=1, le=100, description="Número máximo de resultados"),
+    si_no_coincide: Optional[str] = IF_NONE_MATCH_HEADER
+):
+    def buscar() -> bytes:
+        tareas, total = gestor.buscar_tareas(q, limite)
+        return lista_a_json((t.to_json() for t in tareas), total)
+    
+    try:
+        return respuesta_condicional(*await consulta_compartida(gestor.version, buscar, si_no_coincide,
+                                                                ("buscar", q, limite)))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al buscar tareas")
+
+# Ruta para listar las tareas archivadas (antes de /tareas/{tarea_id})
+@app.get("/tareas/archivadas", response_model=ListaTareasResponse)
+async def listar_tareas_archivadas(
+    limite: int = Query(50, alias="limit", ge=1, le=1000, description="Tareas por página"),
+    despues_de: Optional[int] = Query(None, alias="after_id", description="Cursor: ID de la última tarea recibida"),
+    si_no_coincide: Optional[str] = IF_NONE_MATCH_HEADER
+):
+    """Tareas completadas que han salido del almacén al archivo, por orden de ID"""
+    def listar() -> bytes:
+        tareas, total = gestor.listar_archivadas(limite, despues_de)
+        siguiente_id = tareas[-1].id if len(tareas) == limite else None
+        return lista_a_json((t.to_json() for t in tareas), total, siguiente_id)
+    
+    try:
+        return respuesta_condicional(*await consulta_compartida(gestor.version, listar, si_no_coincide,
+                                                                ("archivadas", limite, despues_de)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al obtener las tareas archivadas")
+
+# Ruta con los cambios de las tareas en tiempo real (Server-Sent Events)
+@app.get("/tareas/eventos")
+async def eventos_tareas():
+    """
+    Un evento por cambio: crear, actualizar, completar (con la tarea) y eliminar
+    (con tarea null); "resincronizar" si el cliente se ha quedado atrás y debe
+    volver a pedir la lista. El id de cada evento es la versión de los datos.
+    """
+    suscripcion = bus_eventos.suscribir()
+    
+    async def generar():
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                mensajes = await suscripcion.recibir()
+                if not mensajes:
+                    return
+                yield b"".join(mensajes)
+        finally:
+            bus_eventos.cancelar(suscripcion)
+    
+    return StreamingResponse(generar(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Ruta para importar tareas desde un cuerpo NDJSON (esquema TareaImport por línea)
+@app.post("/tareas/import", response_model=ResultadoImportacionResponse)
+async def importar_tareas(request: Request, durable: bool = DURABLE_QUERY):
+    """
+    Lee el cuerpo por trozos a medida que llega: la memoria usada no depende
+    del tamaño del archivo. Las tareas reciben IDs nuevos.
+    """
+    importadas = 0
+    errores = 0
+    primeros_errores = []
+    bloque, lineas_bloque = [], []
+    
+    def anotar_error(linea: int, error: str):
+        nonlocal errores
+        errores += 1
+        if len(primeros_errores) < MAX_ERRORES_IMPORTACION:
+            primeros_errores.append({"linea": linea, "error": error})
+    
+    async def crear_bloque():
+        nonlocal importadas
+        for linea, resultado in zip(lineas_bloque, await ejecutar(gestor.crear_tareas, bloque)):
+            if resultado["error"] is not None:
+                anotar_error(linea, resultado["error"])
+            else:
+                importadas += 1
+        bloque.clear()
+        lineas_bloque.clear()
+    
+    numero = 0
+    async for linea in lineas_ndjson(request.stream()):
+        numero += 1
+        if linea is None:
+            anotar_error(numero, "Línea demasiado larga")
+            continue
+        if not linea.strip():
+            continue
+        try:
+            tarea_data = TareaImport.model_validate_json(linea)
+        except ValidationError as e:
+            anotar_error(numero, mensaje_validacion(e))
+            continue
+        datos = datos_creacion(tarea_data)
+        if tarea_data.estado:
+            datos["estado"] = tarea_data.estado.value
+        bloque.append(datos)
+        lineas_bloque.append(numero)
+        if len(bloque) >= TAMANO_BLOQUE_IMPORTACION:
+            await crear_bloque()
+    if bloque:
+        await crear_bloque()
+    await esperar_durabilidad(durable)
+    
+    return Response(content=a_json({
+        "importadas": importadas,
+        "errores": errores,
+        "primeros_errores": primeros_errores
+    }), media_type="application/json")
+
 # Ruta para obtener una tarea específica
 @app.get("/tareas/{tarea_id}", response_model=TareaResponse)
-async def obtener_tarea(tarea_id: int):
-    tarea = gestor.obtener_tarea(tarea_id)
+async def obtener_tarea(
+    tarea_id: int,
+    en: Optional[datetime] = Query(None, alias="at", description="Estado de la tarea en esa fecha (historial)"),
+    si_no_coincide: Optional[str] = IF_NONE_MATCH_HEADER
+):
+    if en is not None:
+        try:
+            estado = await ejecutar(gestor.obtener_tarea_en, tarea_id, en)
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        if estado is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No hay historial de la tarea con ID {tarea_id} en {en.isoformat()}"
+            )
+        return json_a_response(a_json({campo: estado.get(campo) for campo in CAMPOS_RESPUESTA}))
     
-    if not tarea:
+    # La tarea guarda su propio JSON: no hace falta la caché de respuestas
+    etag, contenido = await ejecutar(
+        consulta_condicional, lambda: gestor.version_tarea(tarea_id),
+        lambda: gestor.obtener_tarea(tarea_id).to_json(), si_no_coincide
+    )
+    
+    if not etag:
         raise HTTPException(
             status_code=404, 
             detail=f"No se encontró la tarea con ID {tarea_id}"
         )
     
-    return tarea_a_response(tarea)
+    return respuesta_condicional(etag, contenido)
+
+# Ruta con el historial de cambios de una tarea
+@app.get("/tareas/{tarea_id}/historial", response_model=HistorialTareaResponse)
+async def historial_tarea(
+    tarea_id: int,
+    limite: int = Query(50, alias="limit", ge=1, le=1000, description="Revisiones por página"),
+    despues_de: Optional[int] = Query(None, alias="after", ge=0, description="Cursor: última revisión recibida"),
+    si_no_coincide: Optional[str] = IF_NONE_MATCH_HEADER
+):
+    """Revisiones de la tarea, de la más antigua a la más reciente, con los campos que cambió cada una"""
+    def renderizar() -> bytes:
+        revisiones, total = gestor.historial_tarea(tarea_id, limite, despues_de)
+        siguiente = revisiones[-1]["revision"] if revisiones and revisiones[-1]["revision"] < total else None
+        with DURACION_SERIALIZACION.medir("historial"):
+            return HistorialTareaResponse(id=tarea_id, revisiones=revisiones, total=total,
+                                          siguiente=siguiente).model_dump_json().encode()
+    
+    try:
+        etag, contenido = await ejecutar(
+            consulta_condicional, lambda: gestor.version_historial(tarea_id), renderizar, si_no_coincide
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    if not etag:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No se encontró la tarea con ID {tarea_id}"
+        )
+    
+    return respuesta_condicional(etag, contenido)
 
 # Ruta para actualizar una tarea
 @app.put("/tareas/{tarea_id}", response_model=TareaResponse)
-async def actualizar_tarea(tarea_id: int, tarea_data: TareaUpdate):
-    update_data = tarea_data.model_dump(exclude_none=True)
-    
-    if "estado" in update_data:
-        update_data["estado"] = update_data["estado"].value
-    if "prioridad" in update_data:
-        update_data["prioridad"] = update_data["prioridad"].value
+async def actualizar_tarea(tarea_id: int, tarea_data: TareaUpdate, durable: bool = DURABLE_QUERY):
+    update_data = datos_actualizacion(tarea_data)
     
     try:
-        tarea = gestor.actualizar_tarea(tarea_id, **update_data)
+        contenido = await ejecutar(tarea_json, gestor.escritura, gestor.actualizar_tarea, tarea_id, **update_data)
         
-        if not tarea:
+        if not contenido:
             raise HTTPException(
                 status_code=404,
                 detail=f"No se encontró la tarea con ID {tarea_id}"
             )
+        await esperar_durabilidad(durable)
         
-        return tarea_a_response(tarea)
+        return json_a_response(contenido)
     
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -132,8 +712,9 @@ async def actualizar_tarea(tarea_id: int, tarea_data: TareaUpdate):
 
 # Ruta para eliminar una tarea
 @app.delete("/tareas/{tarea_id}", response_model=MensajeResponse)
-async def eliminar_tarea(tarea_id: int):
-    if gestor.eliminar_tarea(tarea_id):
+async def eliminar_tarea(tarea_id: int, durable: bool = DURABLE_QUERY):
+    if await ejecutar(gestor.eliminar_tarea, tarea_id):
+        await esperar_durabilidad(durable)
         return MensajeResponse(mensaje=f"Tarea {tarea_id} eliminada exitosamente")
     else:
         raise HTTPException(
@@ -143,40 +724,146 @@ async def eliminar_tarea(tarea_id: int):
 
 # Ruta para marcar una tarea como completada
 @app.patch("/tareas/{tarea_id}/completar", response_model=TareaResponse)
-async def marcar_completada(tarea_id: int):
-    tarea = gestor.marcar_completada(tarea_id)
+async def marcar_completada(tarea_id: int, durable: bool = DURABLE_QUERY):
+    contenido = await ejecutar(tarea_json, gestor.escritura, gestor.marcar_completada, tarea_id)
     
-    if not tarea:
+    if not contenido:
         raise HTTPException(
             status_code=404,
             detail=f"No se encontró la tarea con ID {tarea_id}"
         )
+    await esperar_durabilidad(durable)
     
-    return tarea_a_response(tarea)
+    return json_a_response(contenido)
 
 # Ruta para obtener estadísticas
 @app.get("/estadisticas", response_model=EstadisticasResponse)
-async def obtener_estadisticas():
+async def obtener_estadisticas(si_no_coincide: Optional[str] = IF_NONE_MATCH_HEADER):
+    def renderizar() -> bytes:
+        estadisticas = gestor.obtener_estadisticas()
+        with DURACION_SERIALIZACION.medir("estadisticas"):
+            return EstadisticasResponse(**estadisticas).model_dump_json().encode()
+    
     try:
-        stats = gestor.obtener_estadisticas()
-        return EstadisticasResponse(**stats)
+        return respuesta_condicional(*await consulta_compartida(gestor.version, renderizar, si_no_coincide,
+                                                                ("estadisticas",)))
     except Exception as e:
         raise HTTPException(status_code=500, detail="Error al obtener estadísticas")
 
+# Ruta con series por hora o por día (creadas, completadas, antigüedad y vencidas por prioridad)
+@app.get("/estadisticas/series", response_model=SeriesEstadisticasResponse)
+async def obtener_series_estadisticas(
+    intervalo: IntervaloSeriesSchema = Query(IntervaloSeriesSchema.hora, description="Duración de cada intervalo"),
+    desde: Optional[datetime] = Query(None, description="Inicio (por defecto, 24 horas o 30 días antes de hasta)"),
+    hasta: Optional[datetime] = Query(None, description="Fin (por defecto, el final del intervalo actual)"),
+    tipo: Optional[TipoTareaSchema] = Query(None, description="Contar solo las tareas de este tipo"),
+    si_no_coincide: Optional[str] = IF_NONE_MATCH_HEADER
+):
+    # Las antigüedades dependen de la hora: se calculan al minuto, así la respuesta
+    # se puede reutilizar (y revalidar con la ETag) durante ese minuto
+    ahora = datetime.now().replace(second=0, microsecond=0)
+    
+    def renderizar() -> bytes:
+        series = gestor.series_estadisticas(intervalo.value, desde, hasta, tipo.value if tipo else None, ahora)
+        with DURACION_SERIALIZACION.medir("series"):
+            return SeriesEstadisticasResponse(**series).model_dump_json().encode()
+    
+    try:
+        return respuesta_condicional(*await consulta_compartida(
+            gestor.version, renderizar, si_no_coincide, ("series", intervalo.value, desde, hasta, tipo, ahora)
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al obtener las series de estadísticas")
+
 # Ruta para listar tareas vencidas
 @app.get("/tareas/vencidas/listar", response_model=ListaTareasResponse)
-async def listar_tareas_vencidas():
+async def listar_tareas_vencidas(si_no_coincide: Optional[str] = IF_NONE_MATCH_HEADER):
     try:
-        tareas_vencidas = gestor.obtener_tareas_vencidas()
-        tareas_response = [tarea_a_response(t) for t in tareas_vencidas]
-        
-        return ListaTareasResponse(
-            tareas=tareas_response,
-            total=len(tareas_response)
-        )
+        return respuesta_condicional(*await consulta_compartida(
+            gestor.version, lambda: lista_json(gestor.obtener_tareas_vencidas),
+            si_no_coincide, ("vencidas",)
+        ))
     except Exception as e:
         raise HTTPException(status_code=500, detail="Error al obtener tareas vencidas")
 
+# Ruta para listar tareas que vencen pronto
+@app.get("/tareas/vencidas/proximas", response_model=ListaTareasResponse)
+async def listar_tareas_por_vencer(
+    horas: float = Query(24, gt=0, description="Ventana en horas desde ahora")
+):
+    try:
+        return json_a_response(await ejecutar(lista_json, gestor.obtener_tareas_por_vencer, horas))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al obtener tareas por vencer")
+
+# Ruta de salud: "lista" o "cargando" (arranque perezoso) con el progreso de la carga
+@app.get("/salud", response_model=SaludResponse)
+async def salud():
+    return SaludResponse(**gestor.estado_carga())
+
+# Ruta para consultar las métricas del escritor de persistencia
+@app.get("/persistencia/metricas", response_model=MetricasPersistenciaResponse)
+async def obtener_metricas_persistencia():
+    return MetricasPersistenciaResponse(**gestor.metricas_persistencia())
+
+# Métricas del proceso que se leen al exponerlas
+def tamano_almacen() -> Optional[float]:
+    # Durante el arranque perezoso contar obligaría a esperar la carga
+    estado = gestor.estado_carga()
+    return gestor.contar_tareas() if estado["estado"] == "lista" else None
+
+registro_metricas.calculada("tareas_almacen_tareas", "Tareas en el almacén", tamano_almacen)
+registro_metricas.calculada("tareas_carga_progreso", "Fracción de las tareas ya cargadas (arranque perezoso)",
+                            lambda: gestor.estado_carga()["progreso"])
+registro_metricas.calculada("tareas_persistencia_pendientes", "Mutaciones encoladas sin escribir",
+                            lambda: gestor.metricas_persistencia()["pendientes"])
+registro_metricas.calculada("tareas_cache_respuestas_total", "Consultas a la caché de respuestas",
+                            lambda: {("acierto",): cache_respuestas.aciertos, ("fallo",): cache_respuestas.fallos},
+                            tipo="counter", etiquetas=("resultado",))
+registro_metricas.calculada("tareas_cache_respuestas_bytes", "Bytes en la caché de respuestas",
+                            lambda: cache_respuestas.tamano)
+registro_metricas.calculada("tareas_cache_comprimidas_total", "Consultas a la caché de respuestas comprimidas",
+                            lambda: {("acierto",): cache_comprimidas.aciertos, ("fallo",): cache_comprimidas.fallos},
+                            tipo="counter", etiquetas=("resultado",))
+registro_metricas.calculada("tareas_cache_comprimidas_bytes", "Bytes en la caché de respuestas comprimidas",
+                            lambda: cache_comprimidas.tamano)
+registro_metricas.calculada("tareas_idempotencia_claves", "Respuestas guardadas por Idempotency-Key",
+                            lambda: len(resultados_idempotentes))
+registro_metricas.calculada("tareas_idempotencia_bytes", "Bytes de las respuestas guardadas por Idempotency-Key",
+                            lambda: resultados_idempotentes.tamano)
+registro_metricas.calculada("tareas_archivadas", "Tareas en el archivo de completadas",
+                            lambda: gestor.metricas_archivo()["tareas"])
+registro_metricas.calculada("tareas_archivo_bytes", "Bytes de los segmentos del archivo",
+                            lambda: gestor.metricas_archivo()["bytes"])
+registro_metricas.calculada("tareas_historial_revisiones", "Revisiones en el historial de cambios",
+                            lambda: gestor.metricas_historial()["revisiones"])
+registro_metricas.calculada("tareas_historial_bytes", "Bytes del log del historial de cambios",
+                            lambda: gestor.metricas_historial()["bytes"])
+registro_metricas.calculada("tareas_eventos_suscriptores", "Clientes conectados a /tareas/eventos",
+                            bus_eventos.suscriptores)
+registro_metricas.calculada("tareas_eventos_descartados_total", "Eventos descartados por clientes lentos",
+                            lambda: bus_eventos.descartados, tipo="counter")
+registro_metricas.calculada("tareas_vencimientos_total", "Tareas marcadas como vencidas al llegar su fecha límite",
+                            lambda: planificador.vencidas, tipo="counter")
+if notificador_webhook is not None:
+    registro_metricas.calculada("tareas_webhook_vencimientos_total", "Avisos de vencimiento por resultado del envío",
+                                lambda: {("enviado",): notificador_webhook.enviadas,
+                                         ("error",): notificador_webhook.errores,
+                                         ("descartado",): notificador_webhook.descartados},
+                                tipo="counter", etiquetas=("resultado",))
+if perfilador is not None:
+    registro_metricas.calculada("tareas_perfiles_guardados_total", "Perfiles de peticiones lentas guardados",
+                                lambda: perfilador.perfiles_guardados, tipo="counter")
+
+# Ruta con las métricas en el formato de texto de Prometheus
+@app.get("/metrics", include_in_schema=False)
+async def metricas():
+    return Response(content=await ejecutar(registro_metricas.exponer), media_type=TIPO_CONTENIDO)
+
 # Manejo de errores globales
 @app.exception_handler(ValueError)
 async def value_error_handler(request, exc):
@@ -188,4 +875,5 @@ async def not_found_handler(request, exc):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Las conexiones de /tareas/eventos no terminan solas: al apagar se cierran tras 5 s
+    uvicorn.run(app, host="0.0.0.0", port=8000, timeout_graceful_shutdown=5)
\ No newline at end of file
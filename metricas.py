@@ -0,0 +1,237 @@
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+# Límites (en segundos) de los histogramas de duración
+LIMITES_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escapar(valor: Any) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(nombres: Sequence[str], valores: Sequence[Any], extra: str = "") -> str:
+    """{nombre="valor",...} en el formato de texto de Prometheus"""
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+# ABSTRACCIÓN: Una métrica sabe exponerse en el formato de texto de Prometheus
+class Metrica(ABC):
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+
+    def exponer(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"] + self._lineas()
+
+    @abstractmethod
+    def _lineas(self) -> List[str]:
+        pass
+
+
+# HERENCIA: Contador que solo crece (peticiones, bytes...)
+class Contador(Metrica):
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        # ENCAPSULACIÓN: Valor por combinación de etiquetas
+        self._valores: Dict[tuple, float] = {}
+        self._cerrojo = threading.Lock()
+
+    def incrementar(self, *etiquetas, cantidad: float = 1):
+        with self._cerrojo:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + cantidad
+
+    def _lineas(self) -> List[str]:
+        with self._cerrojo:
+            valores = sorted(self._valores.items())
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}" for clave, valor in valores]
+
+
+# HERENCIA: Histograma de duraciones con límites fijos
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 limites: Sequence[float] = LIMITES_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._limites = tuple(limites)
+        # Por combinación de etiquetas: [observaciones por intervalo (el último, +Inf), suma]
+        self._series: Dict[tuple, list] = {}
+        self._cerrojo = threading.Lock()
+
+    def observar(self, valor: float, *etiquetas):
+        posicion = bisect_left(self._limites, valor)
+        with self._cerrojo:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [[0] * (len(self._limites) + 1), 0.0]
+            serie[0][posicion] += 1
+            serie[1] += valor
+
+    @contextmanager
+    def medir(self, *etiquetas):
+        """with histograma.medir("etiqueta"): ... observa la duración del bloque"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, *etiquetas)
+
+    def _lineas(self) -> List[str]:
+        with self._cerrojo:
+            series = sorted((clave, (list(cuentas), suma)) for clave, (cuentas, suma) in self._series.items())
+        lineas = []
+        for clave, (cuentas, suma) in series:
+            acumulado = 0
+            for limite, cuenta in zip(self._limites + (float("inf"),), cuentas):
+                acumulado += cuenta
+                le = 'le="' + ("+Inf" if limite == float("inf") else _numero(limite)) + '"'
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acumulado}")
+        return lineas
+
+
+# HERENCIA: Valor que se lee al exponer (tamaño del almacén, contadores mantenidos en otro objeto...)
+class MetricaCalculada(Metrica):
+
+    def __init__(self, nombre: str, ayuda: str, funcion: Callable[[], Union[float, Dict[tuple, float], None]],
+                 tipo: str = "gauge", etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.tipo = tipo
+        self._funcion = funcion
+
+    def _lineas(self) -> List[str]:
+        valor = self._funcion()
+        if valor is None:
+            return []
+        if not isinstance(valor, dict):
+            valor = {(): valor}
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(cantidad)}"
+                for clave, cantidad in sorted(valor.items())]
+
+
+class RegistroMetricas:
+    """Métricas del proceso, expuestas juntas en GET /metrics"""
+
+    def __init__(self):
+        self._metricas: Dict[str, Metrica] = {}
+        self._cerrojo = threading.Lock()
+
+    def _obtener(self, nombre: str, crear: Callable[[], Metrica]) -> Any:
+        # Pedir dos veces la misma métrica devuelve la misma instancia
+        with self._cerrojo:
+            if nombre not in self._metricas:
+                self._metricas[nombre] = crear()
+            return self._metricas[nombre]
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._obtener(nombre, lambda: Contador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                   limites: Sequence[float] = LIMITES_SEGUNDOS) -> Histograma:
+        return self._obtener(nombre, lambda: Histograma(nombre, ayuda, etiquetas, limites))
+
+    def calculada(self, nombre: str, ayuda: str, funcion: Callable, tipo: str = "gauge",
+                  etiquetas: Sequence[str] = ()):
+        """Registra (o sustituye) una métrica cuyo valor calcula funcion() al exponer"""
+        with self._cerrojo:
+            self._metricas[nombre] = MetricaCalculada(nombre, ayuda, funcion, tipo, etiquetas)
+
+    def exponer(self) -> str:
+        with self._cerrojo:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+# Registro global: los módulos registran sus métricas al importarse
+registro_metricas = RegistroMetricas()
+
+
+def cronometrado(histograma: Histograma):
+    """
+    Decorador: observa en histograma la duración de cada llamada al método, con su
+    nombre como etiqueta. Las llamadas anidadas (p. ej. crear_tarea dentro de
+    crear_tareas) no se observan: solo cuenta la operación de fuera.
+    """
+    en_curso = threading.local()
+
+    def decorador(metodo):
+        nombre = metodo.__name__
+
+        @functools.wraps(metodo)
+        def envoltura(*args, **kwargs):
+            if getattr(en_curso, "activa", False):
+                return metodo(*args, **kwargs)
+            en_curso.activa = True
+            inicio = time.perf_counter()
+            try:
+                return metodo(*args, **kwargs)
+            finally:
+                en_curso.activa = False
+                histograma.observar(time.perf_counter() - inicio, nombre)
+        return envoltura
+    return decorador
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI: duración y número de peticiones por método, ruta (la plantilla,
+    p. ej. /tareas/{tarea_id}) y estado. Las respuestas text/event-stream no se
+    miden: duran lo que dure la conexión.
+    Con un perfilador, las peticiones lentas dejan un perfil de muestreo.
+    """
+
+    def __init__(self, app, duracion: Histograma, peticiones: Contador, perfilador: Optional[Any] = None):
+        self.app = app
+        self._duracion = duracion
+        self._peticiones = peticiones
+        self._perfilador = perfilador
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        respuesta = {"estado": 500, "flujo": False}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                respuesta["estado"] = mensaje["status"]
+                respuesta["flujo"] = any(nombre == b"content-type" and valor.startswith(b"text/event-stream")
+                                         for nombre, valor in mensaje.get("headers", ()))
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        try:
+            if self._perfilador is not None:
+                with self._perfilador.peticion(f"{scope['method']} {scope['path']}"):
+                    await self.app(scope, receive, enviar)
+            else:
+                await self.app(scope, receive, enviar)
+        finally:
+            if not respuesta["flujo"]:
+                # El router deja en el scope la ruta que atendió la petición
+                ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+                self._duracion.observar(time.perf_counter() - inicio, scope["method"], ruta)
+                self._peticiones.incrementar(scope["method"], ruta, str(respuesta["estado"]))
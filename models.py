@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 from enum import Enum
+from serializacion import a_json
 
 class EstadoTarea(Enum):
     """Enum para definir estados de tareas"""
@@ -15,16 +16,46 @@ class PrioridadTarea(Enum):
     MEDIA = "media"
     ALTA = "alta"
 
+# Las fechas se guardan como enteros (microsegundos desde 1970) para ocupar menos memoria
+_EPOCA = datetime(1970, 1, 1)
+_MICROSEGUNDO = timedelta(microseconds=1)
+
+def a_epoca_us(fecha: datetime) -> int:
+    """Convierte una fecha a microsegundos desde 1970 (las fechas con zona pasan a hora local)"""
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone().replace(tzinfo=None)
+    return (fecha - _EPOCA) // _MICROSEGUNDO
+
+def desde_epoca_us(microsegundos: int) -> datetime:
+    return _EPOCA + timedelta(microseconds=microsegundos)
+
+def ahora_us() -> int:
+    return a_epoca_us(datetime.now())
+
+# Campos de la respuesta JSON de una tarea (mismo orden que TareaResponse)
+CAMPOS_RESPUESTA = ("id", "titulo", "descripcion", "estado", "fecha_creacion", "tipo",
+                    "info_especifica", "prioridad", "fecha_limite", "vencida", "fecha_completada")
+
 # ABSTRACCIÓN: Clase abstracta base
 class TareaBase(ABC):
     """Clase abstracta base para todas las tareas"""
+    # __slots__ evita un __dict__ por instancia: menos memoria con millones de tareas
+    __slots__ = ("_id", "_titulo", "_descripcion", "_creacion_us", "_estado", "_completada_us",
+                 "_json", "_json_caduca_us")
+    
     def __init__(self, id: int, titulo: str, descripcion: str = ""):
         # ENCAPSULACIÓN: Atributos privados
         self._id = id
         self._titulo = titulo
         self._descripcion = descripcion
-        self._fecha_creacion = datetime.now()
+        self._creacion_us = ahora_us()
+        # Los miembros del Enum son únicos: cada tarea solo guarda una referencia
         self._estado = EstadoTarea.PENDIENTE
+        # Momento en que se completó (None mientras no esté completada)
+        self._completada_us: Optional[int] = None
+        # JSON ya serializado y momento en que deja de ser válido (None: hasta el próximo cambio)
+        self._json: Optional[bytes] = None
+        self._json_caduca_us: Optional[int] = None
     
     # ENCAPSULACIÓN: Getters y setters
     @property
@@ -40,6 +71,7 @@ class TareaBase(ABC):
         if not valor.strip():
             raise ValueError("El título no puede estar vacío")
         self._titulo = valor
+        self._invalidar_json()
     
     @property
     def descripcion(self) -> str:
@@ -48,6 +80,7 @@ class TareaBase(ABC):
     @descripcion.setter
     def descripcion(self, valor: str):
         self._descripcion = valor
+        self._invalidar_json()
     
     @property
     def estado(self) -> EstadoTarea:
@@ -55,11 +88,24 @@ class TareaBase(ABC):
     
     @estado.setter
     def estado(self, valor: EstadoTarea):
-        self._estado = valor
+        self._cambiar_estado(valor)
     
     @property
     def fecha_creacion(self) -> datetime:
-        return self._fecha_creacion
+        return desde_epoca_us(self._creacion_us)
+    
+    @property
+    def fecha_completada(self) -> Optional[datetime]:
+        return desde_epoca_us(self._completada_us) if self._completada_us is not None else None
+    
+    def _cambiar_estado(self, valor: EstadoTarea):
+        """Método privado que cambia el estado y anota cuándo se completa la tarea (o lo borra si se reabre)"""
+        if valor != EstadoTarea.COMPLETADA:
+            self._completada_us = None
+        elif self._estado != EstadoTarea.COMPLETADA:
+            self._completada_us = ahora_us()
+        self._estado = valor
+        self._invalidar_json()
     
     # ABSTRACCIÓN: Método abstracto que debe implementar cada subclase
     @abstractmethod
@@ -68,7 +114,16 @@ class TareaBase(ABC):
     
     # POLIMORFISMO: Método que puede ser sobrescrito
     def marcar_completada(self):
-        self._estado = EstadoTarea.COMPLETADA
+        self._cambiar_estado(EstadoTarea.COMPLETADA)
+    
+    # POLIMORFISMO: Solo las tareas con fecha límite pueden vencer
+    def esta_vencida(self) -> bool:
+        return False
+    
+    # POLIMORFISMO: Cada tipo aporta los campos que tiene (prioridad, fecha límite)
+    def valores_analitica(self) -> tuple:
+        """(tipo, estado, prioridad, creación, completada, fecha límite) con las fechas en microsegundos, para analitica.py"""
+        return (self.__class__.__name__, self._estado, None, self._creacion_us, self._completada_us, None)
     
     def to_dict(self) -> dict:
         """Convierte la tarea a diccionario"""
@@ -77,13 +132,36 @@ class TareaBase(ABC):
             "titulo": self._titulo,
             "descripcion": self._descripcion,
             "estado": self._estado.value,
-            "fecha_creacion": self._fecha_creacion.isoformat(),
+            "fecha_creacion": self.fecha_creacion.isoformat(),
             "tipo": self.__class__.__name__,
-            "info_especifica": self.obtener_info_especifica()
+            "info_especifica": self.obtener_info_especifica(),
+            "fecha_completada": self.fecha_completada.isoformat() if self._completada_us is not None else None
         }
+    
+    def to_json(self) -> bytes:
+        """
+        Serializa la tarea directamente a JSON con los campos de TareaResponse.
+        El resultado se reutiliza hasta que la tarea cambie o caduque.
+        """
+        if self._json is not None and (self._json_caduca_us is None or ahora_us() < self._json_caduca_us):
+            return self._json
+        datos = self.to_dict()
+        self._json = a_json({campo: datos.get(campo) for campo in CAMPOS_RESPUESTA})
+        self._json_caduca_us = self._caducidad_json()
+        return self._json
+    
+    def _invalidar_json(self):
+        """Descarta el JSON cacheado tras modificar la tarea"""
+        self._json = None
+    
+    def _caducidad_json(self) -> Optional[int]:
+        """Momento (microsegundos desde 1970) en que el JSON cacheado deja de ser válido aunque la tarea no cambie"""
+        return None
 
 # HERENCIA: Tarea simple hereda de TareaBase
 class TareaSimple(TareaBase):
+    __slots__ = ()
+    
     def __init__(self, id: int, titulo: str, descripcion: str = ""):
         super().__init__(id, titulo, descripcion)
     
@@ -93,6 +171,8 @@ class TareaSimple(TareaBase):
 
 # HERENCIA: Tarea con prioridad hereda de TareaBase
 class TareaPrioritaria(TareaBase):
+    __slots__ = ("_prioridad",)
+    
     def __init__(self, id: int, titulo: str, descripcion: str = "", prioridad: PrioridadTarea = PrioridadTarea.MEDIA):
         super().__init__(id, titulo, descripcion)
         self._prioridad = prioridad
@@ -104,6 +184,7 @@ class TareaPrioritaria(TareaBase):
     @prioridad.setter
     def prioridad(self, valor: PrioridadTarea):
         self._prioridad = valor
+        self._invalidar_json()
     
     # POLIMORFISMO: Implementación específica
     def obtener_info_especifica(self) -> str:
@@ -114,6 +195,10 @@ class TareaPrioritaria(TareaBase):
         super().marcar_completada()
         print(f"Tarea prioritaria '{self._titulo}' completada!")
     
+    def valores_analitica(self) -> tuple:
+        tipo, estado, _, creacion_us, completada_us, limite_us = super().valores_analitica()
+        return tipo, estado, self._prioridad, creacion_us, completada_us, limite_us
+    
     def to_dict(self) -> dict:
         data = super().to_dict()
         data["prioridad"] = self._prioridad.value
@@ -121,31 +206,120 @@ class TareaPrioritaria(TareaBase):
 
 # HERENCIA: Tarea con fecha límite hereda de TareaBase
 class TareaConFecha(TareaBase):
+    __slots__ = ("_limite_us", "_vencida")
+    # Con un planificador de vencimientos en marcha (vencimientos.py), "vencida" es el
+    # indicador que este marca al llegar cada fecha límite y no se vuelve a mirar la hora
+    vencimientos_planificados = False
+    
     def __init__(self, id: int, titulo: str, descripcion: str = "", fecha_limite: Optional[datetime] = None):
         super().__init__(id, titulo, descripcion)
-        self._fecha_limite = fecha_limite
+        self._limite_us = a_epoca_us(fecha_limite) if fecha_limite else None
+        self._vencida = self._limite_us is not None and self._creacion_us > self._limite_us
     
     @property
     def fecha_limite(self) -> Optional[datetime]:
-        return self._fecha_limite
+        return desde_epoca_us(self._limite_us) if self._limite_us is not None else None
     
     @fecha_limite.setter
     def fecha_limite(self, valor: Optional[datetime]):
-        self._fecha_limite = valor
+        self._limite_us = a_epoca_us(valor) if valor else None
+        self._vencida = self._limite_us is not None and ahora_us() > self._limite_us
+        self._invalidar_json()
     
     # POLIMORFISMO: Implementación específica
     def obtener_info_especifica(self) -> str:
-        if self._fecha_limite:
-            return f"Fecha límite: {self._fecha_limite.strftime('%Y-%m-%d %H:%M')}"
+        if self._limite_us is not None:
+            return f"Fecha límite: {self.fecha_limite.strftime('%Y-%m-%d %H:%M')}"
         return "Sin fecha límite establecida"
     
     def esta_vencida(self) -> bool:
-        if not self._fecha_limite:
+        if self._limite_us is None or self._estado == EstadoTarea.COMPLETADA:
             return False
-        return datetime.now() > self._fecha_limite
+        if TareaConFecha.vencimientos_planificados:
+            return self._vencida
+        return ahora_us() > self._limite_us
+    
+    def recalcular_vencida(self, hasta_us: int):
+        """
+        Vuelve a calcular el indicador "vencida" frente al instante hasta el que se han
+        procesado los vencimientos (lo llama el gestor tras cambiar el estado o la fecha
+        límite: el planificador no vuelve a las fechas que ya ha procesado)
+        """
+        vencida = self._limite_us is not None and self._limite_us < hasta_us
+        if vencida != self._vencida:
+            self._vencida = vencida
+            self._invalidar_json()
+    
+    def marcar_vencida(self):
+        """La fecha límite ha llegado (lo llama el gestor al procesar los vencimientos)"""
+        if not self._vencida:
+            self._vencida = True
+            self._invalidar_json()
+    
+    def _caducidad_json(self) -> Optional[int]:
+        # El campo "vencida" cambia al llegar la fecha límite (con el planificador, al marcarla)
+        if (self._limite_us is not None and not TareaConFecha.vencimientos_planificados
+                and not self.esta_vencida() and self._estado != EstadoTarea.COMPLETADA):
+            return self._limite_us
+        return None
+    
+    def valores_analitica(self) -> tuple:
+        return super().valores_analitica()[:5] + (self._limite_us,)
     
     def to_dict(self) -> dict:
         data = super().to_dict()
-        data["fecha_limite"] = self._fecha_limite.isoformat() if self._fecha_limite else None
+        fecha_limite = self.fecha_limite
+        data["fecha_limite"] = fecha_limite.isoformat() if fecha_limite else None
         data["vencida"] = self.esta_vencida()
-        return data
\ No newline at end of file
+        return data
+
+# Factory para reconstruir tareas desde su representación en diccionario
+_TIPOS_TAREA = {
+    "TareaSimple": TareaSimple,
+    "TareaPrioritaria": TareaPrioritaria,
+    "TareaConFecha": TareaConFecha,
+}
+
+def tarea_desde_dict(data: dict) -> TareaBase:
+    """
+    Reconstruye una tarea a partir del diccionario generado por to_dict()
+    POLIMORFISMO: Devuelve la subclase correspondiente al campo "tipo"
+    """
+    clase = _TIPOS_TAREA.get(data.get("tipo"), TareaSimple)
+    if clase is TareaPrioritaria:
+        tarea = TareaPrioritaria(data["id"], data["titulo"], data.get("descripcion", ""),
+                                 PrioridadTarea(data.get("prioridad") or "media"))
+    elif clase is TareaConFecha:
+        fecha_limite = data.get("fecha_limite")
+        tarea = TareaConFecha(data["id"], data["titulo"], data.get("descripcion", ""),
+                              datetime.fromisoformat(fecha_limite) if fecha_limite else None)
+    else:
+        tarea = TareaSimple(data["id"], data["titulo"], data.get("descripcion", ""))
+    
+    tarea._estado = EstadoTarea(data.get("estado", EstadoTarea.PENDIENTE.value))
+    if data.get("fecha_creacion"):
+        tarea._creacion_us = a_epoca_us(datetime.fromisoformat(data["fecha_creacion"]))
+    if data.get("fecha_completada"):
+        tarea._completada_us = a_epoca_us(datetime.fromisoformat(data["fecha_completada"]))
+    return tarea
+
+def tarea_desde_campos(tipo: str, id: int, titulo: str, descripcion: str, estado: EstadoTarea,
+                       creacion_us: int, prioridad: Optional[PrioridadTarea] = None,
+                       limite_us: Optional[int] = None, completada_us: Optional[int] = None) -> TareaBase:
+    """
+    Reconstruye una tarea a partir de sus campos ya convertidos (snapshot binario),
+    sin pasar por fechas en texto
+    """
+    clase = _TIPOS_TAREA.get(tipo, TareaSimple)
+    if clase is TareaPrioritaria:
+        tarea = TareaPrioritaria(id, titulo, descripcion, prioridad or PrioridadTarea.MEDIA)
+    elif clase is TareaConFecha:
+        tarea = TareaConFecha(id, titulo, descripcion)
+        tarea._limite_us = limite_us
+    else:
+        tarea = TareaSimple(id, titulo, descripcion)
+    
+    tarea._estado = estado
+    tarea._creacion_us = creacion_us
+    tarea._completada_us = completada_us
+    return tarea
@@ -0,0 +1,157 @@
+import contextvars
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# Petición que se está atendiendo en el contexto actual (la tarea asyncio o el hilo)
+_PETICION: contextvars.ContextVar = contextvars.ContextVar("peticion_perfilada", default=None)
+
+# Marcos que se guardan como máximo por muestra (los más cercanos a la raíz se descartan)
+PROFUNDIDAD_MAXIMA = 128
+
+
+class _Peticion:
+    """Petición en curso: los tramos [hilo, desde, hasta] en los que algún hilo trabajó para ella"""
+    __slots__ = ("descripcion", "inicio", "tramos")
+
+    def __init__(self, descripcion: str):
+        self.descripcion = descripcion
+        self.inicio = time.monotonic()
+        self.tramos: List[list] = []
+
+
+class PerfiladorMuestreo:
+    """
+    Perfilador de muestreo para encontrar qué hace el servidor en las peticiones lentas.
+    Un hilo lee cada intervalo segundos la pila de los hilos que están atendiendo
+    alguna petición (el del event loop y, con TAREAS_HANDLERS=hilos, los del
+    threadpool) y guarda las muestras de los últimos ventana segundos. Cuando una
+    petición tarda más que umbral, sus muestras se escriben en directorio como pilas
+    plegadas ("raiz;...;hoja muestras" por línea), el formato de flamegraph.pl y speedscope.
+    ENCAPSULACIÓN: Las peticiones que no superan el umbral no cuestan más que un
+    par de anotaciones; muestrear sí tiene coste, por eso el perfilador es opcional.
+    En el event loop varias peticiones se intercalan: el perfil de una petición
+    lenta incluye también lo que hicieron las demás mientras tanto.
+    """
+
+    def __init__(self, umbral: float, intervalo: float = 0.005, directorio: str = "perfiles",
+                 ventana: float = 60.0, maximo_perfiles: int = 1000):
+        self._umbral = umbral
+        self._intervalo = intervalo
+        self._directorio = directorio
+        self._maximo_perfiles = maximo_perfiles
+        self._muestras: deque = deque(maxlen=max(1, int(ventana / intervalo)))
+        # Hilo -> número de peticiones para las que está trabajando
+        self._observados: Dict[int, int] = {}
+        self._cerrojo = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._activo = True
+        self.perfiles_guardados = 0
+
+    def _iniciar(self):
+        """Arranca el hilo de muestreo con la primera petición (requiere _cerrojo)"""
+        if self._hilo is None and self._activo:
+            self._hilo = threading.Thread(target=self._muestrear, name="perfilador-tareas", daemon=True)
+            self._hilo.start()
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        while self._activo:
+            time.sleep(self._intervalo)
+            with self._cerrojo:
+                hilos = [ident for ident in self._observados if ident != propio]
+            if not hilos:
+                continue
+            marcos = sys._current_frames()
+            ahora = time.monotonic()
+            for ident in hilos:
+                marco = marcos.get(ident)
+                if marco is not None:
+                    self._muestras.append((ahora, ident, self._pila(marco)))
+            del marcos
+
+    @staticmethod
+    def _pila(marco) -> tuple:
+        """(código, línea) de cada marco, de la hoja a la raíz"""
+        pila = []
+        while marco is not None and len(pila) < PROFUNDIDAD_MAXIMA:
+            pila.append((marco.f_code, marco.f_lineno))
+            marco = marco.f_back
+        return tuple(pila)
+
+    def _observar(self, registro: _Peticion) -> list:
+        ident = threading.get_ident()
+        tramo = [ident, time.monotonic(), None]
+        registro.tramos.append(tramo)
+        with self._cerrojo:
+            self._observados[ident] = self._observados.get(ident, 0) + 1
+            self._iniciar()
+        return tramo
+
+    def _dejar(self, tramo: list):
+        tramo[2] = time.monotonic()
+        with self._cerrojo:
+            restantes = self._observados.pop(tramo[0]) - 1
+            if restantes:
+                self._observados[tramo[0]] = restantes
+
+    @contextmanager
+    def peticion(self, descripcion: str):
+        """with perfilador.peticion("GET /tareas"): ... perfila el bloque si dura más que el umbral"""
+        registro = _Peticion(descripcion)
+        token = _PETICION.set(registro)
+        tramo = self._observar(registro)
+        try:
+            yield
+        finally:
+            self._dejar(tramo)
+            _PETICION.reset(token)
+            duracion = time.monotonic() - registro.inicio
+            if duracion >= self._umbral and self.perfiles_guardados < self._maximo_perfiles:
+                self._guardar(registro, duracion)
+
+    def en_hilo(self, funcion: Callable) -> Callable:
+        """
+        Envuelve una función que se ejecutará en otro hilo (run_in_threadpool copia
+        el contexto): mientras se ejecuta, ese hilo también se muestrea para la petición
+        """
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            registro = _PETICION.get()
+            if registro is None:
+                return funcion(*args, **kwargs)
+            tramo = self._observar(registro)
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                self._dejar(tramo)
+        return envoltura
+
+    def _guardar(self, registro: _Peticion, duracion: float):
+        pilas = Counter()
+        for instante, ident, pila in list(self._muestras):
+            if any(ident == hilo and desde <= instante and (hasta is None or instante <= hasta)
+                   for hilo, desde, hasta in registro.tramos):
+                pilas[pila] += 1
+        if not pilas:
+            return
+        os.makedirs(self._directorio, exist_ok=True)
+        nombre = re.sub(r"[^A-Za-z0-9_.-]+", "_", registro.descripcion).strip("_")[:80]
+        ruta = os.path.join(self._directorio, f"{time.strftime('%Y%m%d-%H%M%S')}-{duracion * 1000:.0f}ms-{nombre}.txt")
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            for pila, muestras in pilas.most_common():
+                marcos = (f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{linea})"
+                          for codigo, linea in reversed(pila))
+                archivo.write(f"{';'.join(marcos)} {muestras}\n")
+        self.perfiles_guardados += 1
+
+    def detener(self):
+        self._activo = False
+        if self._hilo is not None:
+            self._hilo.join()
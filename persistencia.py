@@ -0,0 +1,620 @@
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from snapshot_binario import SnapshotBinario, abrir_snapshot, generar_snapshot
+from metricas import registro_metricas
+
+# Bloqueo de archivos entre procesos: fcntl en POSIX, msvcrt en Windows
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - depende del sistema operativo
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Operaciones que se registran en el journal
+OPERACIONES = ("crear", "actualizar", "eliminar", "completar")
+
+# Métricas del proceso (GET /metrics)
+DURACION_ESCRITURA = registro_metricas.histograma(
+    "tareas_persistencia_escritura_segundos",
+    "Duración de las escrituras: lote (group commit), completa (guardar_todo) y compactación", ("operacion",)
+)
+BYTES_ESCRITOS = registro_metricas.contador("tareas_persistencia_bytes_total", "Bytes escritos por el escritor")
+REGISTROS_ESCRITOS = registro_metricas.contador("tareas_persistencia_registros_total", "Mutaciones escritas")
+ERRORES_ESCRITURA = registro_metricas.contador("tareas_persistencia_errores_total",
+                                               "Lotes que no se pudieron escribir")
+
+
+def escribir_atomico(ruta: str, contenido: Union[bytes, Iterable[bytes]]):
+    """
+    Reemplaza un archivo de forma atómica y segura ante caídas:
+    escribe en un temporal, hace fsync y lo renombra sobre el original
+    """
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    temporal = f"{ruta}.tmp"
+    if isinstance(contenido, bytes):
+        contenido = (contenido,)
+    with open(temporal, "wb") as file:
+        for bloque in contenido:
+            file.write(bloque)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporal, ruta)
+    _sincronizar_directorio(directorio)
+
+
+def _sincronizar_directorio(directorio: str):
+    """Hace persistente el renombrado en el directorio (no disponible en Windows)"""
+    try:
+        fd = os.open(directorio, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class BloqueoArchivo:
+    """
+    Cerrojo exclusivo entre procesos sobre un archivo.
+    El sistema operativo lo libera aunque el proceso muera sin cerrarlo.
+    """
+
+    def __init__(self, ruta: str):
+        self._ruta = ruta
+        self._archivo = None
+
+    def adquirir(self) -> bool:
+        """Intenta tomar el cerrojo sin esperar; False si lo tiene otro proceso"""
+        archivo = open(self._ruta, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:  # pragma: no cover - Windows
+                archivo.seek(0)
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            archivo.close()
+            return False
+        self._archivo = archivo
+        return True
+
+    def liberar(self):
+        # Cerrar el archivo suelta el cerrojo (el archivo se deja en disco)
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+
+# ABSTRACCIÓN: Interfaz común para los distintos modos de persistencia
+class Persistencia(ABC):
+    """Clase abstracta base para guardar y recuperar el estado de las tareas"""
+
+    def __init__(self, ruta_bloqueo: Optional[str] = None):
+        # Mayor ID visto al cargar, para no reutilizar IDs eliminados
+        self.ultimo_id = 0
+        self._ruta_bloqueo = ruta_bloqueo
+        self._bloqueo: Optional[BloqueoArchivo] = None
+
+    def bloquear(self):
+        """
+        Reserva los archivos para este proceso. Con varios workers cada uno tendría
+        su propia copia de las tareas en memoria y se sobrescribirían los cambios.
+        """
+        if self._ruta_bloqueo is None or self._bloqueo is not None:
+            return
+        bloqueo = BloqueoArchivo(self._ruta_bloqueo)
+        if not bloqueo.adquirir():
+            raise RuntimeError(
+                f"Otro proceso ya usa {self._ruta_bloqueo}. "
+                "Para ejecutar varios workers usa TAREAS_ALMACEN=sqlite"
+            )
+        self._bloqueo = bloqueo
+
+    @abstractmethod
+    def cargar(self) -> Dict[int, dict]:
+        """Devuelve los datos de las tareas guardadas indexados por ID"""
+        pass
+
+    def registrar(self, operacion: str, id_tarea: int, datos: Optional[dict] = None):
+        """Registra una mutación (crear/actualizar/eliminar/completar)"""
+        self.registrar_lote([crear_registro(operacion, id_tarea, datos)])
+
+    @abstractmethod
+    def registrar_lote(self, registros: List[dict]) -> int:
+        """Escribe varias mutaciones con una sola sincronización y devuelve los bytes escritos"""
+        pass
+
+    @abstractmethod
+    def guardar_todo(self, tareas_data: Dict[int, dict]):
+        """Escribe el estado completo de las tareas"""
+        pass
+
+    def abrir_perezoso(self) -> Optional[Tuple[Dict[int, Optional[dict]], Optional[SnapshotBinario]]]:
+        """
+        Modos con snapshot indexado: prepara la carga bajo demanda y devuelve
+        (cambios del log con None para las eliminadas, snapshot sin leer).
+        None si el modo solo admite cargar().
+        """
+        return None
+
+    def terminar_carga(self):
+        """Avisa de que el almacén ya no lee del snapshot abierto con abrir_perezoso()"""
+        pass
+
+    def cerrar(self):
+        """Libera los recursos abiertos"""
+        if self._bloqueo is not None:
+            self._bloqueo.liberar()
+            self._bloqueo = None
+
+
+# HERENCIA: Modo original, un único archivo JSON reescrito en cada cambio
+class PersistenciaJSON(Persistencia):
+    """
+    Guarda todas las tareas en un archivo JSON.
+    Cada mutación reescribe el archivo completo (coste O(N)).
+    """
+
+    def __init__(self, ruta: str = "tareas.json"):
+        super().__init__(ruta_bloqueo=f"{ruta}.lock")
+        self._ruta = ruta
+        # Copia serializada de las tareas para reescribir el archivo
+        self._datos: Dict[int, dict] = {}
+
+    def cargar(self) -> Dict[int, dict]:
+        try:
+            with open(self._ruta, "r") as file:
+                tareas_data = json.load(file)
+        except FileNotFoundError:
+            tareas_data = {}
+        self._datos = {int(id_tarea): datos for id_tarea, datos in tareas_data.items()}
+        self.ultimo_id = max(self._datos, default=0)
+        return dict(self._datos)
+
+    def registrar_lote(self, registros: List[dict]) -> int:
+        for registro in registros:
+            if registro["op"] == "eliminar":
+                self._datos.pop(registro["id"], None)
+            else:
+                self._datos[registro["id"]] = registro["datos"]
+        return self._volcar()
+
+    def guardar_todo(self, tareas_data: Dict[int, dict]):
+        self._datos = dict(tareas_data)
+        self._volcar()
+
+    def _volcar(self) -> int:
+        contenido = json.dumps(self._datos, indent=4).encode("utf-8")
+        escribir_atomico(self._ruta, contenido)
+        return len(contenido)
+
+
+# HERENCIA: Modo journal, log de solo escritura más snapshot compactado
+class PersistenciaJournal(Persistencia):
+    """
+    Añade cada mutación como una línea al final del log (coste O(1)).
+    Cuando el log supera el umbral, se sella y un hilo en segundo plano
+    lo compacta junto con el snapshot anterior en un snapshot nuevo.
+
+    Archivos:
+    - <base>.snapshot.ndjson: cabecera + una tarea por línea
+    - <base>.log.1: log sellado pendiente de compactar
+    - <base>.log: log activo
+    """
+
+    def __init__(self, base: str = "tareas", umbral_compactacion: int = 10000):
+        super().__init__(ruta_bloqueo=f"{base}.lock")
+        self._ruta_snapshot = f"{base}.snapshot.ndjson"
+        self._ruta_log = f"{base}.log"
+        self._ruta_sellado = f"{base}.log.1"
+        self._umbral = umbral_compactacion
+        self._log = None
+        self._registros_en_log = 0
+        self._compactador: Optional[threading.Thread] = None
+        self._cerrojo = threading.Lock()
+
+    # --- Carga ---
+
+    def cargar(self) -> Dict[int, dict]:
+        tareas_data: Dict[int, dict] = {}
+        for datos in self._leer_snapshot(self._ruta_snapshot):
+            tareas_data[datos["id"]] = datos
+        if os.path.exists(self._ruta_sellado):
+            self._reproducir_log(self._ruta_sellado, tareas_data)
+        self._registros_en_log = self._reproducir_log(self._ruta_log, tareas_data)
+        self.ultimo_id = max(self.ultimo_id, max(tareas_data, default=0))
+        self._log = open(self._ruta_log, "ab")
+        # Si quedó un log sellado de una compactación interrumpida, terminarla
+        if os.path.exists(self._ruta_sellado):
+            self._iniciar_compactacion()
+        return tareas_data
+
+    def _leer_snapshot(self, ruta: str) -> Iterator[dict]:
+        """Lee el snapshot línea a línea sin cargar el archivo entero"""
+        try:
+            file = open(ruta, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with file:
+            cabecera = file.readline()
+            if cabecera:
+                self.ultimo_id = max(self.ultimo_id, json.loads(cabecera).get("ultimo_id", 0))
+            for linea in file:
+                if linea.strip():
+                    yield json.loads(linea)
+
+    def _reproducir_log(self, ruta: str, tareas_data: Dict[int, dict], marcar_eliminadas: bool = False) -> int:
+        """
+        Aplica los registros del log sobre tareas_data y devuelve cuántos había.
+        Con marcar_eliminadas, las tareas eliminadas quedan como None en lugar de quitarse.
+        """
+        aplicados = 0
+        posicion_valida = 0
+        try:
+            file = open(ruta, "rb")
+        except FileNotFoundError:
+            return 0
+        with file:
+            for linea in file:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    # Línea incompleta por una caída a mitad de escritura
+                    break
+                self._aplicar(registro, tareas_data, marcar_eliminadas)
+                posicion_valida += len(linea)
+                aplicados += 1
+        if posicion_valida < os.path.getsize(ruta):
+            with open(ruta, "r+b") as file:
+                file.truncate(posicion_valida)
+        return aplicados
+
+    def _aplicar(self, registro: dict, tareas_data: Dict[int, dict], marcar_eliminadas: bool = False):
+        id_tarea = registro["id"]
+        self.ultimo_id = max(self.ultimo_id, id_tarea)
+        if registro["op"] == "eliminar":
+            if marcar_eliminadas:
+                tareas_data[id_tarea] = None
+            else:
+                tareas_data.pop(id_tarea, None)
+        else:
+            tareas_data[id_tarea] = registro["datos"]
+
+    # --- Escritura ---
+
+    def registrar_lote(self, registros: List[dict]) -> int:
+        contenido = b"".join(json.dumps(registro).encode("utf-8") + b"\n" for registro in registros)
+        for registro in registros:
+            self.ultimo_id = max(self.ultimo_id, registro["id"])
+        self._log.write(contenido)
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._registros_en_log += len(registros)
+        if self._registros_en_log >= self._umbral:
+            self.compactar()
+        return len(contenido)
+
+    def guardar_todo(self, tareas_data: Dict[int, dict]):
+        """Escribe un snapshot completo de forma síncrona y vacía el log"""
+        self.esperar_compactacion()
+        with self._cerrojo:
+            self._escribir_snapshot(tareas_data.values())
+            if os.path.exists(self._ruta_sellado):
+                os.remove(self._ruta_sellado)
+            self._log.close()
+            self._log = open(self._ruta_log, "wb")
+            self._registros_en_log = 0
+
+    # --- Compactación ---
+
+    def compactar(self):
+        """Sella el log activo y lo compacta en segundo plano"""
+        with self._cerrojo:
+            if os.path.exists(self._ruta_sellado):
+                return  # Ya hay una compactación en curso
+            self._log.close()
+            os.replace(self._ruta_log, self._ruta_sellado)
+            self._log = open(self._ruta_log, "ab")
+            self._registros_en_log = 0
+        self._iniciar_compactacion()
+
+    def _iniciar_compactacion(self):
+        self._compactador = threading.Thread(target=self._compactar_sellado, daemon=True)
+        self._compactador.start()
+
+    def _compactar_sellado(self):
+        """
+        Fusiona snapshot + log sellado en un snapshot nuevo y borra el log sellado.
+        Solo lee archivos inmutables, así que no bloquea a registrar().
+        """
+        tareas_data: Dict[int, dict] = {}
+        with DURACION_ESCRITURA.medir("compactacion"):
+            for datos in self._leer_snapshot(self._ruta_snapshot):
+                tareas_data[datos["id"]] = datos
+            self._reproducir_log(self._ruta_sellado, tareas_data)
+            self._escribir_snapshot(tareas_data.values())
+        os.remove(self._ruta_sellado)
+
+    def _escribir_snapshot(self, tareas: Iterable[dict]):
+        cabecera = json.dumps({"formato": 1, "ultimo_id": self.ultimo_id})
+        lineas = (json.dumps(datos) for datos in tareas)
+        contenido = (f"{linea}\n".encode("utf-8") for linea in _encadenar(cabecera, lineas))
+        escribir_atomico(self._ruta_snapshot, contenido)
+
+    def esperar_compactacion(self):
+        """Bloquea hasta que termine la compactación en curso"""
+        if self._compactador is not None:
+            self._compactador.join()
+
+    def cerrar(self):
+        self.esperar_compactacion()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        super().cerrar()
+
+
+# HERENCIA: Modo journal con snapshot binario indexado por ID
+class PersistenciaBinaria(PersistenciaJournal):
+    """
+    Igual que el modo journal, pero el snapshot es binario y tiene un índice por ID
+    (ver snapshot_binario.py). Con abrir_perezoso() el almacén arranca sin leer
+    las tareas: las materializa al pedirlas y carga el resto en segundo plano.
+
+    Archivos:
+    - <base>.snapshot.bin: registros binarios + índice por ID
+    - <base>.log.1 y <base>.log: como en el modo journal
+    """
+
+    def __init__(self, base: str = "tareas", umbral_compactacion: int = 10000):
+        super().__init__(base, umbral_compactacion)
+        self._base = base
+        self._ruta_snapshot = f"{base}.snapshot.bin"
+        # Snapshot del que lee el almacén mientras termina la carga
+        self._snapshot_abierto: Optional[SnapshotBinario] = None
+
+    def cargar(self) -> Dict[int, dict]:
+        self._migrar()
+        return super().cargar()
+
+    def abrir_perezoso(self) -> Tuple[Dict[int, Optional[dict]], Optional[SnapshotBinario]]:
+        self._migrar()
+        cambios: Dict[int, Optional[dict]] = {}
+        if os.path.exists(self._ruta_sellado):
+            self._reproducir_log(self._ruta_sellado, cambios, marcar_eliminadas=True)
+        self._registros_en_log = self._reproducir_log(self._ruta_log, cambios, marcar_eliminadas=True)
+        self._snapshot_abierto = abrir_snapshot(self._ruta_snapshot)
+        if self._snapshot_abierto is not None:
+            self.ultimo_id = max(self.ultimo_id, self._snapshot_abierto.ultimo_id)
+        self._log = open(self._ruta_log, "ab")
+        return cambios, self._snapshot_abierto
+
+    def terminar_carga(self):
+        if self._snapshot_abierto is not None:
+            self._snapshot_abierto.cerrar()
+            self._snapshot_abierto = None
+        # Reanudar la compactación que se aplazó durante la carga
+        if os.path.exists(self._ruta_sellado) and (self._compactador is None or not self._compactador.is_alive()):
+            self._iniciar_compactacion()
+
+    def _migrar(self):
+        """Crea el snapshot binario a partir del modo journal o JSON si aún no existe"""
+        if os.path.exists(self._ruta_snapshot):
+            return
+        ruta_ndjson = f"{self._base}.snapshot.ndjson"
+        if os.path.exists(ruta_ndjson):
+            tareas = list(PersistenciaJournal._leer_snapshot(self, ruta_ndjson))
+        elif os.path.exists(f"{self._base}.json"):
+            persistencia_json = PersistenciaJSON(f"{self._base}.json")
+            tareas = list(persistencia_json.cargar().values())
+            self.ultimo_id = max(self.ultimo_id, persistencia_json.ultimo_id)
+        else:
+            return
+        logger.info("Convirtiendo %d tareas al snapshot binario %s", len(tareas), self._ruta_snapshot)
+        self._escribir_snapshot(tareas)
+
+    def _leer_snapshot(self, ruta: str) -> Iterator[dict]:
+        snapshot = abrir_snapshot(ruta)
+        if snapshot is None:
+            return
+        try:
+            self.ultimo_id = max(self.ultimo_id, snapshot.ultimo_id)
+            for tarea in snapshot:
+                yield tarea.to_dict()
+        finally:
+            snapshot.cerrar()
+
+    def _escribir_snapshot(self, tareas: Iterable[dict]):
+        escribir_atomico(self._ruta_snapshot, generar_snapshot(tareas, self.ultimo_id))
+
+    def _iniciar_compactacion(self):
+        # La compactación reemplaza el snapshot: espera a que el almacén deje de leerlo
+        if self._snapshot_abierto is None:
+            super()._iniciar_compactacion()
+
+    def cerrar(self):
+        if self._snapshot_abierto is not None:
+            self._snapshot_abierto.cerrar()
+            self._snapshot_abierto = None
+        super().cerrar()
+
+
+def crear_registro(operacion: str, id_tarea: int, datos: Optional[dict] = None) -> dict:
+    """Crea el registro de una mutación tal como se guarda en el journal"""
+    if operacion not in OPERACIONES:
+        raise ValueError(f"Operación desconocida: {operacion}")
+    registro = {"op": operacion, "id": id_tarea}
+    if operacion != "eliminar":
+        registro["datos"] = datos
+    return registro
+
+
+class MetricasEscritura:
+    """Acumula la latencia y el tamaño de las últimas escrituras"""
+
+    def __init__(self, muestras: int = 1024):
+        self._latencias = deque(maxlen=muestras)
+        self._tamanos = deque(maxlen=muestras)
+        self._lotes = 0
+        self._registros = 0
+        self._bytes = 0
+        self._errores = 0
+
+    def registrar_lote(self, registros: int, escritos: int, duracion: float):
+        self._latencias.append(duracion)
+        self._tamanos.append(registros)
+        self._lotes += 1
+        self._registros += registros
+        self._bytes += escritos
+        DURACION_ESCRITURA.observar(duracion, "lote")
+        REGISTROS_ESCRITOS.incrementar(cantidad=registros)
+        BYTES_ESCRITOS.incrementar(cantidad=escritos)
+
+    def registrar_error(self):
+        self._errores += 1
+        ERRORES_ESCRITURA.incrementar()
+
+    def resumen(self, pendientes: int = 0) -> Dict[str, Any]:
+        latencias = sorted(self._latencias)
+        tamanos = list(self._tamanos)
+
+        def percentil(valores, p):
+            if not valores:
+                return 0.0
+            return valores[min(len(valores) - 1, int(p * len(valores)))]
+
+        return {
+            "lotes": self._lotes,
+            "registros": self._registros,
+            "bytes_escritos": self._bytes,
+            "errores": self._errores,
+            "pendientes": pendientes,
+            "tamano_lote_medio": sum(tamanos) / len(tamanos) if tamanos else 0.0,
+            "tamano_lote_max": max(tamanos, default=0),
+            "latencia_flush_ms_p50": percentil(latencias, 0.50) * 1000,
+            "latencia_flush_ms_p99": percentil(latencias, 0.99) * 1000,
+            "latencia_flush_ms_max": (latencias[-1] if latencias else 0.0) * 1000,
+        }
+
+
+class EscritorAgrupado:
+    """
+    Hilo escritor dedicado con group commit.
+    Las peticiones encolan sus mutaciones sin bloquear el event loop y el hilo
+    las agrupa en un único lote con un solo fsync por vuelta.
+    """
+
+    def __init__(self, persistencia: Persistencia, max_lote: int = 1000, muestras: int = 1024):
+        self._persistencia = persistencia
+        self._max_lote = max_lote
+        self._pendientes: deque = deque()
+        self._condicion = threading.Condition()
+        # Serializa las escrituras del hilo con guardar_todo()
+        self._cerrojo_escritura = threading.Lock()
+        self._activo = True
+        self._metricas = MetricasEscritura(muestras)
+        self._hilo = threading.Thread(target=self._bucle, name="escritor-tareas", daemon=True)
+        self._hilo.start()
+
+    def encolar(self, registro: dict) -> Future:
+        """Encola un registro y devuelve un Future que se resuelve cuando es durable"""
+        return self.encolar_lote([registro])
+
+    def encolar_lote(self, registros: List[dict]) -> Future:
+        """
+        Encola varios registros como una sola entrada: se escriben juntos
+        en la misma llamada a registrar_lote (una sola sincronización)
+        """
+        futuro: Future = Future()
+        with self._condicion:
+            if not self._activo:
+                raise RuntimeError("El escritor de persistencia está cerrado")
+            self._pendientes.append((registros, futuro))
+            self._condicion.notify()
+        return futuro
+
+    def confirmar(self) -> Future:
+        """Devuelve un Future que se resuelve cuando todo lo encolado hasta ahora es durable"""
+        futuro: Future = Future()
+        with self._condicion:
+            self._pendientes.append(([], futuro))
+            self._condicion.notify()
+        return futuro
+
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                while not self._pendientes and self._activo:
+                    self._condicion.wait()
+                if not self._pendientes and not self._activo:
+                    return
+            with self._cerrojo_escritura:
+                self._escribir_pendientes()
+
+    def _escribir_pendientes(self):
+        """Escribe en lotes todo lo pendiente (requiere _cerrojo_escritura)"""
+        while True:
+            with self._condicion:
+                lote = [self._pendientes.popleft()
+                        for _ in range(min(self._max_lote, len(self._pendientes)))]
+            if not lote:
+                return
+            registros = [registro for entrada, _ in lote for registro in entrada]
+            inicio = time.perf_counter()
+            try:
+                escritos = self._persistencia.registrar_lote(registros) if registros else 0
+            except Exception as e:
+                self._metricas.registrar_error()
+                logger.exception("Error al escribir un lote de %d registros", len(registros))
+                for _, futuro in lote:
+                    futuro.set_exception(e)
+                continue
+            self._metricas.registrar_lote(len(registros), escritos, time.perf_counter() - inicio)
+            for _, futuro in lote:
+                futuro.set_result(None)
+
+    def guardar_todo(self, tareas_data: Dict[int, dict]):
+        """Vacía lo pendiente y escribe el estado completo"""
+        with self._cerrojo_escritura:
+            self._escribir_pendientes()
+            with DURACION_ESCRITURA.medir("completa"):
+                self._persistencia.guardar_todo(tareas_data)
+
+    def metricas(self) -> Dict[str, Any]:
+        """Latencia de flush y tamaño de lote de las últimas vueltas del escritor"""
+        return self._metricas.resumen(pendientes=len(self._pendientes))
+
+    def cerrar(self):
+        """Escribe lo pendiente, detiene el hilo y cierra la persistencia"""
+        with self._condicion:
+            self._activo = False
+            self._condicion.notify()
+        self._hilo.join()
+        self._persistencia.cerrar()
+
+
+def _encadenar(primero: str, resto: Iterable[str]) -> Iterator[str]:
+    yield primero
+    yield from resto
+
+
+def crear_persistencia(modo: str = "json", base: str = "tareas") -> Persistencia:
+    """Factory de modos de persistencia: "json" (por defecto), "journal" o "binario" """
+    if modo == "journal":
+        return PersistenciaJournal(base)
+    if modo == "binario":
+        return PersistenciaBinaria(base)
+    return PersistenciaJSON(f"{base}.json")
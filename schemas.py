@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -19,6 +19,16 @@ class TipoTareaSchema(str, Enum):
     prioritaria = "prioritaria"
     con_fecha = "con_fecha"
 
+class IntervaloSeriesSchema(str, Enum):
+    hora = "hora"
+    dia = "dia"
+
+class OrdenTareasSchema(str, Enum):
+    id = "id"
+    fecha_creacion = "fecha_creacion"
+    fecha_limite = "fecha_limite"
+    prioridad = "prioridad"
+
 # Esquemas de entrada (Request)
 class TareaCreate(BaseModel):
     tipo: TipoTareaSchema = Field(default=TipoTareaSchema.simple, description="Tipo de tarea")
@@ -55,6 +65,29 @@ class TareaUpdate(BaseModel):
             }
         }
 
+# HERENCIA: Elemento de PATCH /tareas/bulk, una actualización con el ID de la tarea
+class TareaUpdateLote(TareaUpdate):
+    id: int = Field(..., description="ID de la tarea a actualizar")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": 1,
+                "estado": "completada"
+            }
+        }
+
+# HERENCIA: Línea de POST /tareas/import; acepta también las líneas de GET /tareas/export
+class TareaImport(TareaCreate):
+    estado: Optional[EstadoTareaSchema] = Field(default=None, description="Estado inicial de la tarea")
+    
+    @field_validator("tipo", mode="before")
+    @classmethod
+    def tipo_desde_clase(cls, valor):
+        # La exportación usa el nombre de la clase (TareaSimple) como tipo
+        return {"TareaSimple": "simple", "TareaPrioritaria": "prioritaria",
+                "TareaConFecha": "con_fecha"}.get(valor, valor)
+
 # Esquemas de salida (Response)
 class TareaResponse(BaseModel):
     id: int
@@ -67,6 +100,7 @@ class TareaResponse(BaseModel):
     prioridad: Optional[str] = None
     fecha_limite: Optional[datetime] = None
     vencida: Optional[bool] = None
+    fecha_completada: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -81,19 +115,49 @@ class TareaResponse(BaseModel):
                 "info_especifica": "Prioridad: alta",
                 "prioridad": "alta",
                 "fecha_limite": None,
-                "vencida": None
+                "vencida": None,
+                "fecha_completada": None
             }
         }
 
 class ListaTareasResponse(BaseModel):
     tareas: List[TareaResponse]
     total: int
+    siguiente_id: Optional[int] = None
     
     class Config:
         json_schema_extra = {
             "example": {
                 "tareas": [],
-                "total": 0
+                "total": 0,
+                "siguiente_id": None
+            }
+        }
+
+class RevisionTarea(BaseModel):
+    revision: int
+    fecha: datetime
+    operacion: str
+    cambios: Dict[str, Any]
+
+class HistorialTareaResponse(BaseModel):
+    id: int
+    revisiones: List[RevisionTarea]
+    total: int
+    siguiente: Optional[int] = None
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": 7,
+                "revisiones": [
+                    {"revision": 1, "fecha": "2024-01-15T10:30:00", "operacion": "crear",
+                     "cambios": {"titulo": "Informe", "descripcion": "", "estado": "pendiente"}},
+                    {"revision": 2, "fecha": "2024-01-15T12:05:00", "operacion": "completar",
+                     "cambios": {"estado": "completada", "fecha_completada": "2024-01-15T12:05:00"}}
+                ],
+                "total": 2,
+                "siguiente": None
             }
         }
 
@@ -102,6 +166,10 @@ class EstadisticasResponse(BaseModel):
     pendientes: int
     en_progreso: int
     completadas: int
+    por_tipo: Dict[str, int] = {}
+    por_prioridad: Dict[str, int] = {}
+    vencidas: int = 0
+    archivadas: int = 0
     
     class Config:
         json_schema_extra = {
@@ -109,7 +177,138 @@ class EstadisticasResponse(BaseModel):
                 "total": 10,
                 "pendientes": 5,
                 "en_progreso": 3,
-                "completadas": 2
+                "completadas": 2,
+                "por_tipo": {"TareaSimple": 4, "TareaPrioritaria": 3, "TareaConFecha": 3},
+                "por_prioridad": {"baja": 1, "media": 1, "alta": 1},
+                "vencidas": 1,
+                "archivadas": 0
+            }
+        }
+
+class IntervaloSerie(BaseModel):
+    inicio: datetime
+    creadas: int
+    completadas: int
+
+class EdadPendientes(BaseModel):
+    total: int
+    grupos: Dict[str, int]
+
+class VencidasPrioridad(BaseModel):
+    con_fecha: int
+    vencidas: int
+    tasa: float
+
+class SeriesEstadisticasResponse(BaseModel):
+    intervalo: str
+    desde: datetime
+    hasta: datetime
+    ahora: datetime
+    series: List[IntervaloSerie]
+    edad_pendientes: EdadPendientes
+    vencidas_por_prioridad: Dict[str, VencidasPrioridad]
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "intervalo": "hora",
+                "desde": "2024-01-14T11:00:00",
+                "hasta": "2024-01-15T11:00:00",
+                "ahora": "2024-01-15T10:30:00",
+                "series": [{"inicio": "2024-01-15T10:00:00", "creadas": 12, "completadas": 7}],
+                "edad_pendientes": {
+                    "total": 40,
+                    "grupos": {"<1h": 5, "1h-6h": 10, "6h-24h": 8, "24h-72h": 9, "72h-168h": 4,
+                               "168h-720h": 3, ">=720h": 1}
+                },
+                "vencidas_por_prioridad": {
+                    "sin_prioridad": {"con_fecha": 10, "vencidas": 2, "tasa": 0.2}
+                }
+            }
+        }
+
+class MetricasPersistenciaResponse(BaseModel):
+    lotes: int
+    registros: int
+    bytes_escritos: int
+    errores: int
+    pendientes: int
+    tamano_lote_medio: float
+    tamano_lote_max: int
+    latencia_flush_ms_p50: float
+    latencia_flush_ms_p99: float
+    latencia_flush_ms_max: float
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "lotes": 120,
+                "registros": 3400,
+                "bytes_escritos": 1048576,
+                "errores": 0,
+                "pendientes": 0,
+                "tamano_lote_medio": 28.3,
+                "tamano_lote_max": 250,
+                "latencia_flush_ms_p50": 1.2,
+                "latencia_flush_ms_p99": 6.8,
+                "latencia_flush_ms_max": 9.5
+            }
+        }
+
+class ResultadoLoteItem(BaseModel):
+    indice: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class ResultadoLoteResponse(BaseModel):
+    resultados: List[ResultadoLoteItem]
+    correctos: int
+    errores: int
+    aplicado: bool
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "resultados": [
+                    {"indice": 0, "id": 11, "error": None},
+                    {"indice": 1, "id": None, "error": "titulo: String should have at least 1 character"}
+                ],
+                "correctos": 1,
+                "errores": 1,
+                "aplicado": True
+            }
+        }
+
+class ErrorImportacion(BaseModel):
+    linea: int
+    error: str
+
+class ResultadoImportacionResponse(BaseModel):
+    importadas: int
+    errores: int
+    primeros_errores: List[ErrorImportacion] = []
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "importadas": 49998,
+                "errores": 2,
+                "primeros_errores": [
+                    {"linea": 17, "error": "JSON no válido"},
+                    {"linea": 203, "error": "titulo: Field required"}
+                ]
+            }
+        }
+
+class SaludResponse(BaseModel):
+    estado: str
+    progreso: float
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "estado": "cargando",
+                "progreso": 0.42
             }
         }
 
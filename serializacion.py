@@ -0,0 +1,86 @@
+import json
+from typing import Any, AsyncIterator, Iterable, Iterator, Optional
+
+from metricas import registro_metricas
+
+# orjson es opcional: si está instalado se usa para serializar más rápido
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+# Tiempo de serializar las respuestas, por vista (lista, tarea, estadisticas...)
+DURACION_SERIALIZACION = registro_metricas.histograma(
+    "tareas_serializacion_segundos", "Duración de la serialización a JSON de las respuestas", ("vista",)
+)
+
+
+def a_json(datos: Any) -> bytes:
+    """Serializa a JSON compacto en bytes (UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(datos)
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def lista_a_json(tareas_json: Iterable[bytes], total: int, siguiente_id: Optional[int] = None) -> bytes:
+    """
+    Construye el cuerpo de ListaTareasResponse uniendo tareas ya serializadas,
+    sin volver a pasar cada tarea por diccionarios ni por Pydantic
+    """
+    # tareas_json suele ser un generador: la serialización de cada tarea ocurre aquí
+    with DURACION_SERIALIZACION.medir("lista"):
+        return b"".join((
+            b'{"tareas":[', b",".join(tareas_json), b'],"total":', str(total).encode(),
+            b',"siguiente_id":', b"null" if siguiente_id is None else str(siguiente_id).encode(), b"}"
+        ))
+
+
+def agrupar_ndjson(tareas_json: Iterable[bytes], tamano_bloque: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Une tareas ya serializadas en bloques NDJSON (una tarea por línea) de unos
+    tamano_bloque bytes, para enviarlas en streaming sin construir la lista entera
+    """
+    bloque = []
+    tamano = 0
+    for tarea_json in tareas_json:
+        bloque.append(tarea_json)
+        tamano += len(tarea_json) + 1
+        if tamano >= tamano_bloque:
+            yield b"\n".join(bloque) + b"\n"
+            bloque = []
+            tamano = 0
+    if bloque:
+        yield b"\n".join(bloque) + b"\n"
+
+
+async def lineas_ndjson(trozos: AsyncIterator[bytes], max_linea: int = 1024 * 1024) -> AsyncIterator[Optional[bytes]]:
+    """
+    Separa en líneas un cuerpo NDJSON recibido por trozos, con memoria acotada:
+    solo se guarda la línea en curso. Las líneas de más de max_linea bytes
+    se descartan y se devuelven como None.
+    """
+    pendiente = bytearray()
+    descartando = False
+    async for trozo in trozos:
+        inicio = 0
+        while True:
+            fin = trozo.find(b"\n", inicio)
+            if fin < 0:
+                break
+            if descartando or len(pendiente) + fin - inicio > max_linea:
+                descartando = False
+                yield None
+            else:
+                pendiente += trozo[inicio:fin]
+                yield bytes(pendiente)
+            pendiente.clear()
+            inicio = fin + 1
+        if not descartando:
+            pendiente += trozo[inicio:]
+            if len(pendiente) > max_linea:
+                pendiente.clear()
+                descartando = True
+    if descartando:
+        yield None
+    elif pendiente:
+        yield bytes(pendiente)
@@ -0,0 +1,164 @@
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Tuple
+
+from models import TareaBase, EstadoTarea, PrioridadTarea, a_epoca_us, tarea_desde_campos
+
+# Formato del snapshot binario (todos los enteros en little-endian):
+#   cabecera: MAGIA + versión
+#   registros: uno por tarea, ordenados por ID
+#   índice: N IDs (int64) seguidos de N posiciones (int64), en el mismo orden
+#   cola: posición del índice, N, último ID y MAGIA
+# El índice se lee directamente del archivo mapeado en memoria (mmap),
+# así que abrir el snapshot no depende del número de tareas.
+MAGIA = b"TARB"
+VERSION = 2
+_CABECERA = struct.Struct("<4sI")
+_COLA = struct.Struct("<qqq4s")
+# id, tipo, estado, prioridad, creación (us), fecha límite (us), completada (us),
+# bytes del título, bytes de la descripción
+_REGISTRO = struct.Struct("<qBBBqqqII")
+# Registro de la versión 1, sin la fecha en que se completó (se sigue pudiendo leer)
+_REGISTRO_V1 = struct.Struct("<qBBBqqII")
+_SIN_FECHA = -(2 ** 63)
+
+_TIPOS = ("TareaSimple", "TareaPrioritaria", "TareaConFecha")
+_CODIGO_TIPO = {tipo: codigo for codigo, tipo in enumerate(_TIPOS)}
+_ESTADOS = tuple(EstadoTarea)
+_CODIGO_ESTADO = {estado.value: codigo for codigo, estado in enumerate(_ESTADOS)}
+# El código 0 indica "sin prioridad"
+_PRIORIDADES = (None,) + tuple(PrioridadTarea)
+_CODIGO_PRIORIDAD = {prioridad.value: codigo for codigo, prioridad in enumerate(_PRIORIDADES) if prioridad}
+
+
+def _epoca(fecha_iso: Optional[str]) -> int:
+    return a_epoca_us(datetime.fromisoformat(fecha_iso)) if fecha_iso else _SIN_FECHA
+
+
+def codificar(datos: dict) -> bytes:
+    """Codifica el diccionario de una tarea (formato de to_dict) como un registro binario"""
+    titulo = datos["titulo"].encode("utf-8")
+    descripcion = (datos.get("descripcion") or "").encode("utf-8")
+    return _REGISTRO.pack(
+        datos["id"],
+        _CODIGO_TIPO.get(datos.get("tipo"), 0),
+        _CODIGO_ESTADO[datos.get("estado", EstadoTarea.PENDIENTE.value)],
+        _CODIGO_PRIORIDAD.get(datos.get("prioridad"), 0),
+        _epoca(datos.get("fecha_creacion")),
+        _epoca(datos.get("fecha_limite")),
+        _epoca(datos.get("fecha_completada")),
+        len(titulo),
+        len(descripcion),
+    ) + titulo + descripcion
+
+
+def _enteros_le(valores: array) -> bytes:
+    if sys.byteorder != "little":
+        valores = array("q", valores)
+        valores.byteswap()
+    return valores.tobytes()
+
+
+def generar_snapshot(tareas: Iterable[dict], ultimo_id: int) -> Iterator[bytes]:
+    """Genera por bloques el contenido de un snapshot binario (para escribir_atomico)"""
+    tareas = sorted(tareas, key=lambda datos: datos["id"])
+    ids = array("q")
+    posiciones = array("q")
+    posicion = _CABECERA.size
+    yield _CABECERA.pack(MAGIA, VERSION)
+    for datos in tareas:
+        registro = codificar(datos)
+        ids.append(datos["id"])
+        posiciones.append(posicion)
+        posicion += len(registro)
+        yield registro
+    yield _enteros_le(ids)
+    yield _enteros_le(posiciones)
+    yield _COLA.pack(posicion, len(ids), max(ultimo_id, ids[-1] if ids else 0), MAGIA)
+
+
+class SnapshotBinario:
+    """
+    Snapshot binario abierto con mmap.
+    ENCAPSULACIÓN: Solo se decodifican las tareas que se piden, a partir del índice por ID.
+    """
+
+    def __init__(self, ruta: str):
+        self._archivo = open(ruta, "rb")
+        self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, version = _CABECERA.unpack_from(self._mapa, 0)
+        posicion_indice, self.cantidad, self.ultimo_id, magia_cola = _COLA.unpack_from(
+            self._mapa, len(self._mapa) - _COLA.size
+        )
+        if magia != MAGIA or magia_cola != MAGIA or version not in (1, VERSION):
+            self.cerrar()
+            raise ValueError(f"{ruta} no es un snapshot binario válido")
+        self._version = version
+        fin_ids = posicion_indice + 8 * self.cantidad
+        self._vista = memoryview(self._mapa)
+        if sys.byteorder == "little":
+            # Sin copia: bisect trabaja directamente sobre las páginas del archivo
+            self._ids = self._vista[posicion_indice:fin_ids].cast("q")
+            self._posiciones = self._vista[fin_ids:fin_ids + 8 * self.cantidad].cast("q")
+        else:  # pragma: no cover - depende de la plataforma
+            self._ids = array("q", self._vista[posicion_indice:fin_ids])
+            self._posiciones = array("q", self._vista[fin_ids:fin_ids + 8 * self.cantidad])
+            self._ids.byteswap()
+            self._posiciones.byteswap()
+
+    def id_en(self, indice: int) -> int:
+        """ID de la tarea en la posición indice (las tareas están ordenadas por ID)"""
+        return self._ids[indice]
+
+    def leer(self, id_tarea: int) -> Optional[TareaBase]:
+        """Materializa la tarea con ese ID, o None si no está en el snapshot"""
+        indice = bisect_left(self._ids, id_tarea)
+        if indice == self.cantidad or self._ids[indice] != id_tarea:
+            return None
+        return self.leer_en(indice)
+
+    def leer_en(self, indice: int) -> TareaBase:
+        """Materializa la tarea que ocupa la posición indice del índice"""
+        posicion = self._posiciones[indice]
+        if self._version == VERSION:
+            (id_tarea, tipo, estado, prioridad, creacion_us, limite_us, completada_us,
+             largo_titulo, largo_descripcion) = _REGISTRO.unpack_from(self._mapa, posicion)
+            inicio = posicion + _REGISTRO.size
+        else:
+            (id_tarea, tipo, estado, prioridad, creacion_us, limite_us,
+             largo_titulo, largo_descripcion) = _REGISTRO_V1.unpack_from(self._mapa, posicion)
+            completada_us = _SIN_FECHA
+            inicio = posicion + _REGISTRO_V1.size
+        titulo = bytes(self._vista[inicio:inicio + largo_titulo]).decode("utf-8")
+        inicio += largo_titulo
+        descripcion = bytes(self._vista[inicio:inicio + largo_descripcion]).decode("utf-8")
+        return tarea_desde_campos(
+            _TIPOS[tipo], id_tarea, titulo, descripcion, _ESTADOS[estado], creacion_us,
+            _PRIORIDADES[prioridad], None if limite_us == _SIN_FECHA else limite_us,
+            None if completada_us == _SIN_FECHA else completada_us
+        )
+
+    def __iter__(self) -> Iterator[TareaBase]:
+        for indice in range(self.cantidad):
+            yield self.leer_en(indice)
+
+    def cerrar(self):
+        # Las vistas deben liberarse antes de cerrar el mmap
+        for vista in ("_ids", "_posiciones", "_vista"):
+            valor = getattr(self, vista, None)
+            if isinstance(valor, memoryview):
+                valor.release()
+        self._mapa.close()
+        self._archivo.close()
+
+
+def abrir_snapshot(ruta: str) -> Optional[SnapshotBinario]:
+    """Abre el snapshot binario, o devuelve None si no existe"""
+    try:
+        return SnapshotBinario(ruta)
+    except FileNotFoundError:
+        return None
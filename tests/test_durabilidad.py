@@ -0,0 +1,58 @@
+"""
+?durable=true con SQLite: la confirmación sincroniza el WAL (fsync) en su propio hilo,
+sin bloquear a quien la pide, y las que llegan a la vez comparten la sincronización.
+
+Uso:
+    python -m pytest -q tests
+"""
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gestor import GestorTareas
+from almacenamiento import AlmacenSQLite, crear_almacen
+
+
+def test_confirmar_sincroniza_el_wal_en_segundo_plano(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    empezada, liberar = threading.Event(), threading.Event()
+    sincronizados = []
+
+    def sincronizar(ruta):
+        empezada.set()
+        liberar.wait()
+        sincronizados.append((ruta, threading.current_thread().name))
+
+    monkeypatch.setattr(AlmacenSQLite, "_sincronizar_archivo", staticmethod(sincronizar))
+    gestor = GestorTareas(almacen=crear_almacen("sqlite"))
+    gestor.crear_tarea("simple", "Informe")
+
+    primera = gestor.confirmar_persistencia()
+    assert empezada.wait(5)
+    # Quien confirma no espera al fsync
+    assert not primera.done()
+    # Las que llegan mientras tanto esperan a la siguiente sincronización, juntas
+    segunda, tercera = gestor.confirmar_persistencia(), gestor.confirmar_persistencia()
+    assert segunda is tercera and segunda is not primera
+
+    liberar.set()
+    primera.result(timeout=5)
+    segunda.result(timeout=5)
+    assert ("tareas.db-wal", "sincronizar-sqlite") in sincronizados
+    assert ("tareas.db", "sincronizar-sqlite") in sincronizados
+    gestor.cerrar()
+
+
+def test_confirmar_con_archivos_reales(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    gestor = GestorTareas(almacen=crear_almacen("sqlite"))
+    gestor.crear_tarea("simple", "Informe")
+    gestor.confirmar_persistencia().result(timeout=5)
+    gestor.cerrar()
+    # Al cerrar, el hilo que sincroniza termina
+    assert gestor._almacen._hilo_sincronizar is None
+    recargado = GestorTareas(almacen=crear_almacen("sqlite"))
+    assert recargado.obtener_tarea(1).titulo == "Informe"
+    recargado.cerrar()
@@ -0,0 +1,156 @@
+"""
+Historial: el log se indexa por trozos en segundo plano sin perder revisiones y la
+retención quita las antiguas sin cambiar el estado de las tareas desde el corte.
+
+Uso:
+    python -m pytest -q tests
+"""
+import os
+import sys
+import time
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import historial
+from historial import HistorialTareas
+from gestor import GestorTareas
+from almacenamiento import crear_almacen
+from models import desde_epoca_us
+
+
+@pytest.fixture
+def reloj(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Trozos pequeños (pero mayores que una línea): las líneas quedan cortadas entre un
+    # trozo y el siguiente
+    monkeypatch.setattr(historial, "_TROZO_LECTURA", 2048)
+    instante = [1_700_000_000_000_000]
+
+    def ahora():
+        instante[0] += 1_000_000
+        return instante[0]
+
+    with mock.patch("historial.ahora_us", ahora):
+        yield instante
+
+
+def poblar(gestor: GestorTareas) -> dict:
+    """Crea 20 tareas, las cambia y elimina una; devuelve el estado de cada tarea en cada instante"""
+    estados = {}
+
+    def anotar(id_tarea):
+        tarea = gestor.obtener_tarea(id_tarea)
+        estados.setdefault(id_tarea, []).append((gestor._historial._tareas[id_tarea].instantes[-1],
+                                                 tarea.to_dict() if tarea else None))
+
+    for i in range(20):
+        anotar(gestor.crear_tarea("simple", f"Tarea {i}", "descripción").id)
+    for paso in range(200):
+        id_tarea = paso % 20 + 1
+        gestor.actualizar_tarea(id_tarea, titulo=f"Tarea {id_tarea}.{paso}")
+        anotar(id_tarea)
+    gestor.eliminar_tarea(1)
+    anotar(1)
+    return estados
+
+
+def esperado(estados: dict, id_tarea: int, instante: int):
+    anteriores = [estado for momento, estado in estados[id_tarea] if momento <= instante]
+    return anteriores[-1] if anteriores else None
+
+
+def test_indexar_por_trozos(reloj):
+    gestor = GestorTareas(almacen=crear_almacen("memoria"), historial=HistorialTareas("historial.log", cada=4))
+    estados = poblar(gestor)
+    total = gestor.metricas_historial()["revisiones"]
+    gestor.cerrar()
+
+    releido = HistorialTareas("historial.log", cada=4)
+    while releido.continuar_carga():
+        pass
+    assert len(releido) == total
+    for id_tarea, cambios in estados.items():
+        for momento, estado in cambios:
+            assert releido.estado_en(id_tarea, momento) == estado
+    releido.cerrar()
+
+
+def test_compactar_conserva_el_estado_desde_el_corte(reloj):
+    gestor = GestorTareas(almacen=crear_almacen("memoria"), historial=HistorialTareas("historial.log", cada=4))
+    estados = poblar(gestor)
+    corte = reloj[0] - 100 * 1_000_000
+    antes = gestor.metricas_historial()["revisiones"]
+    tamano = os.path.getsize("historial.log")
+
+    quitadas = gestor._historial.compactar(corte)
+
+    assert quitadas > 0
+    assert gestor.metricas_historial()["revisiones"] == antes - quitadas
+    assert os.path.getsize("historial.log") < tamano
+    # La tarea eliminada antes del corte desaparece
+    assert gestor.obtener_tarea_en(1, desde_epoca_us(reloj[0])) is None
+    gestor.actualizar_tarea(2, titulo="Después de compactar")
+    estados[2].append((reloj[0] + 1, gestor.obtener_tarea(2).to_dict()))
+    gestor.cerrar()
+
+    releido = HistorialTareas("historial.log", cada=4)
+    for id_tarea, cambios in estados.items():
+        for momento in [corte] + [momento for momento, _ in cambios if momento >= corte]:
+            assert releido.estado_en(id_tarea, momento) == esperado(estados, id_tarea, momento)
+    releido.cerrar()
+
+
+def test_error_de_escritura(reloj, monkeypatch):
+    monkeypatch.setattr(historial, "_ESPERA_REINTENTO", 0.01)
+    gestor = GestorTareas(almacen=crear_almacen("memoria"), historial=HistorialTareas("historial.log", cada=4))
+    registro = gestor._historial
+    tarea = gestor.crear_tarea("simple", "Informe", "descripción")
+    escrita = reloj[0]
+    assert gestor.obtener_tarea_en(tarea.id, desde_epoca_us(escrita))["titulo"] == "Informe"
+
+    # El disco se llena: la primera escritura queda a medias y las siguientes fallan
+    escribir = os.write
+    lleno = [True, True]
+
+    def escribir_lleno(fd, datos):
+        if fd != registro._fd or not lleno[0]:
+            return escribir(fd, datos)
+        if lleno[1]:
+            lleno[1] = False
+            return escribir(fd, datos[:len(datos) // 2])
+        raise OSError(28, "No queda espacio en el dispositivo")
+
+    monkeypatch.setattr(historial.os, "write", escribir_lleno)
+    gestor.actualizar_tarea(tarea.id, titulo="Primero")
+    gestor.actualizar_tarea(tarea.id, titulo="Segundo")
+    while registro._fallo is None:
+        time.sleep(0.01)
+
+    # Lo no escrito no se puede leer (503), lo escrito sí
+    with pytest.raises(RuntimeError):
+        gestor.obtener_tarea_en(tarea.id, desde_epoca_us(reloj[0]))
+    with pytest.raises(RuntimeError):
+        gestor.historial_tarea(tarea.id, 50, None)
+    assert gestor.obtener_tarea_en(tarea.id, desde_epoca_us(escrita))["titulo"] == "Informe"
+    # Sin el estado anterior en memoria, la revisión siguiente lleva el estado completo
+    registro._recientes.clear()
+    gestor.actualizar_tarea(tarea.id, descripcion="otra")
+
+    # Cuando vuelve a haber espacio, el hilo escritor termina lo pendiente en su sitio
+    lleno[0] = False
+    while registro._fallo is not None or registro._escrito < registro._fin:
+        time.sleep(0.01)
+    revisiones, total = gestor.historial_tarea(tarea.id, 50, None)
+    assert [revision["cambios"].get("titulo") for revision in revisiones[:3]] == ["Informe", "Primero", "Segundo"]
+    assert (total, revisiones[3]["cambios"]["descripcion"]) == (4, "otra")
+    assert gestor.obtener_tarea_en(tarea.id, desde_epoca_us(reloj[0]))["descripcion"] == "otra"
+    gestor.cerrar()
+
+    releido = HistorialTareas("historial.log", cada=4)
+    assert releido.cantidad(tarea.id) == 4
+    estado = releido.estado_en(tarea.id, reloj[0])
+    assert (estado["titulo"], estado["descripcion"]) == ("Segundo", "otra")
+    releido.cerrar()
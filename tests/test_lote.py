@@ -0,0 +1,66 @@
+"""
+PATCH /tareas/bulk?transaccional=true: si un elemento falla no se aplica ninguno,
+ni en el almacén ni en la persistencia, y los observadores no reciben nada.
+
+Uso:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gestor import GestorTareas
+from almacenamiento import crear_almacen
+
+# El cuerpo de la petición: el segundo título solo tiene espacios
+LOTE = [{"id": 1, "estado": "completada", "titulo": "cambiado"}, {"id": 2, "titulo": "   "}]
+
+
+def crear_gestor(tipo: str, modo: str) -> GestorTareas:
+    return GestorTareas(almacen=crear_almacen(tipo, modo_persistencia=modo))
+
+
+@pytest.mark.parametrize("tipo,modo", [("memoria", "json"), ("memoria", "journal"), ("sqlite", "json")])
+def test_lote_transaccional_no_aplica_nada(tmp_path, monkeypatch, tipo, modo):
+    monkeypatch.chdir(tmp_path)
+    gestor = crear_gestor(tipo, modo)
+    gestor.crear_tareas([{"tipo": "simple", "titulo": "Primera"}, {"tipo": "simple", "titulo": "Segunda"}])
+    gestor.confirmar_persistencia().result()
+    version = gestor.version()
+    estadisticas = gestor.obtener_estadisticas()
+    cambios = []
+    gestor.agregar_observador(lambda *cambio: cambios.append(cambio))
+
+    resultados = gestor.actualizar_tareas(LOTE, transaccional=True)
+
+    assert [resultado["tarea"] for resultado in resultados] == [None, None]
+    assert resultados[1]["error"] == "El título no puede estar vacío"
+    tarea = gestor.obtener_tarea(1)
+    assert (tarea.titulo, tarea.estado.value) == ("Primera", "pendiente")
+    assert gestor.obtener_estadisticas() == estadisticas
+    assert gestor.version() == version
+    assert cambios == []
+
+    # Lo persistido tampoco cambia
+    gestor.confirmar_persistencia().result()
+    gestor.cerrar()
+    recargado = crear_gestor(tipo, modo)
+    assert recargado.obtener_tarea(1).titulo == "Primera"
+    recargado.cerrar()
+
+
+def test_lote_sin_transaccion_aplica_los_validos(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    gestor = crear_gestor("memoria", "json")
+    gestor.crear_tareas([{"tipo": "simple", "titulo": "Primera"}, {"tipo": "simple", "titulo": "Segunda"}])
+
+    resultados = gestor.actualizar_tareas(LOTE)
+
+    assert resultados[0]["tarea"].titulo == "cambiado"
+    assert resultados[1]["error"] == "El título no puede estar vacío"
+    assert gestor.obtener_tarea(2).titulo == "Segunda"
+    assert gestor.obtener_estadisticas()["completadas"] == 1
+    gestor.cerrar()
@@ -0,0 +1,54 @@
+"""
+GET /tareas?orden=: los índices de ordenación se construyen la primera vez que se piden,
+una sola vez aunque lleguen a la vez varios listados (TAREAS_HANDLERS=hilos).
+
+Uso:
+    python -m pytest -q tests
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import almacenamiento
+from gestor import GestorTareas
+from almacenamiento import crear_almacen
+
+
+class IndiceLento(almacenamiento.IndiceOrdenado):
+    """Tarda en construirse: los listados concurrentes coinciden mientras tanto"""
+
+    def __init__(self, entradas=()):
+        time.sleep(0.05)
+        super().__init__(entradas)
+
+
+def test_listados_concurrentes_construyen_un_indice(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(almacenamiento, "IndiceOrdenado", IndiceLento)
+    gestor = GestorTareas(almacen=crear_almacen("memoria"))
+    gestor.crear_tareas([{"tipo": "prioritaria", "titulo": f"Tarea {i}", "prioridad": "media"} for i in range(50)])
+    almacen = gestor._almacen
+    indices = len(almacen._indices)
+
+    inicio = threading.Barrier(8)
+    paginas = []
+
+    def listar():
+        inicio.wait()
+        paginas.append([tarea.id for tarea in gestor.listar_tareas(orden="prioridad", limite=10)])
+
+    hilos = [threading.Thread(target=listar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(almacen._indices) == indices + 1
+    assert paginas == [list(range(1, 11))] * 8
+    # Las escrituras mantienen ese único índice
+    gestor.actualizar_tarea(5, prioridad="alta")
+    assert [tarea.id for tarea in gestor.listar_tareas(orden="prioridad", limite=2)] == [5, 1]
+    gestor.cerrar()
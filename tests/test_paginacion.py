@@ -0,0 +1,57 @@
+"""
+GET /tareas?after_id=: eliminar la tarea que hace de cursor entre dos páginas no corta
+la paginación; la página siguiente continúa tras la clave que tenía.
+
+Uso:
+    python -m pytest -q tests
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gestor import GestorTareas
+from almacenamiento import ORDENES, crear_almacen
+
+
+@pytest.fixture(params=["memoria", "sqlite"])
+def gestor(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    gestor = GestorTareas(almacen=crear_almacen(request.param))
+    ahora = datetime.now()
+    for i, prioridad in enumerate(["baja", "alta", "media", "alta", "baja", "media"]):
+        gestor.crear_tarea("prioritaria", f"Prioritaria {i}", prioridad=prioridad)
+        gestor.crear_tarea("con_fecha", f"Con fecha {i}", fecha_limite=ahora + timedelta(days=(i * 5) % 7))
+    yield gestor
+    gestor.cerrar()
+
+
+def paginar(gestor: GestorTareas, orden: str, eliminar_cursor: bool) -> list:
+    ids, despues_de = [], None
+    while True:
+        pagina = [tarea.id for tarea in gestor.listar_tareas(orden=orden, limite=3, despues_de=despues_de)]
+        ids.extend(pagina)
+        if len(pagina) < 3:
+            return ids
+        despues_de = pagina[-1]
+        if eliminar_cursor:
+            assert gestor.eliminar_tarea(despues_de)
+
+
+@pytest.mark.parametrize("orden", ORDENES)
+def test_eliminar_el_cursor_entre_paginas(gestor, orden):
+    todas = [tarea.id for tarea in gestor.listar_tareas(orden=orden)]
+    assert paginar(gestor, orden, eliminar_cursor=False) == todas
+
+    # Cada página elimina su última tarea antes de pedir la siguiente: no se salta ni repite ninguna
+    assert paginar(gestor, orden, eliminar_cursor=True) == todas
+
+
+def test_cursor_que_nunca_existio(gestor):
+    with pytest.raises(ValueError):
+        gestor.listar_tareas(orden="prioridad", limite=3, despues_de=999)
+    # Por ID basta con el número
+    assert gestor.listar_tareas(limite=3, despues_de=999) == []
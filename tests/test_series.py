@@ -0,0 +1,63 @@
+"""
+GET /estadisticas/series: archivar una tarea no la quita de las series de creadas y
+completadas, ni al mantener la vista al día ni al construirla de nuevo.
+
+Uso:
+    python -m pytest -q tests
+"""
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("numpy")
+
+from gestor import GestorTareas
+from almacenamiento import crear_almacen
+from archivo import ArchivoTareas
+
+
+def totales(gestor: GestorTareas) -> tuple:
+    series = gestor.series_estadisticas("hora")["series"]
+    return sum(punto["creadas"] for punto in series), sum(punto["completadas"] for punto in series)
+
+
+@pytest.fixture
+def gestor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    gestor = GestorTareas(almacen=crear_almacen("memoria"), archivo=ArchivoTareas("archivo"))
+    gestor.crear_tareas([{"tipo": "simple", "titulo": f"Tarea {i}"} for i in range(5)])
+    for id_tarea in (1, 2, 3):
+        gestor.marcar_completada(id_tarea)
+    yield gestor
+    gestor.cerrar()
+
+
+def test_archivar_mantiene_las_series(gestor):
+    # La vista ya construida se mantiene al día con los cambios
+    assert totales(gestor) == (5, 3)
+
+    assert gestor.archivar_completadas(timedelta(0)) == 3
+
+    assert totales(gestor) == (5, 3)
+    # Construida de nuevo, con las archivadas leídas del archivo
+    gestor._columnas = None
+    assert totales(gestor) == (5, 3)
+
+
+def test_restaurar_y_eliminar_archivadas(gestor):
+    gestor.archivar_completadas(timedelta(0))
+    gestor._columnas = None
+
+    # Restaurada: sigue también en el archivo hasta el siguiente lote, y cuenta una vez
+    gestor.actualizar_tarea(1, estado="pendiente")
+    assert totales(gestor) == (5, 2)
+    gestor._columnas = None
+    assert totales(gestor) == (5, 2)
+
+    # Eliminar una archivada sí la quita de las series
+    assert gestor.eliminar_tarea(2)
+    assert totales(gestor) == (4, 1)
@@ -0,0 +1,73 @@
+"""
+Con el planificador de vencimientos, "vencida" sigue al instante procesado aunque
+la tarea se reabra o cambie de fecha límite después de que el planificador pasara.
+
+Uso:
+    python -m pytest -q tests
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gestor import GestorTareas
+from almacenamiento import crear_almacen
+from models import TareaConFecha
+
+
+@pytest.fixture
+def gestor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(TareaConFecha, "vencimientos_planificados", True)
+    gestor = GestorTareas(almacen=crear_almacen("memoria"))
+    gestor.procesar_vencimientos()
+    yield gestor
+    gestor.cerrar()
+
+
+def observar(gestor: GestorTareas) -> list:
+    cambios = []
+    gestor.agregar_observador(lambda operacion, id_tarea, tarea, version: cambios.append((operacion, id_tarea)))
+    return cambios
+
+
+def test_reabrir_tras_la_fecha_limite(gestor):
+    tarea = gestor.crear_tarea("con_fecha", "Informe", fecha_limite=datetime.now() + timedelta(milliseconds=50))
+    gestor.marcar_completada(tarea.id)
+    time.sleep(0.1)
+    # El planificador pasa con la tarea completada: no la marca
+    assert gestor.procesar_vencimientos() == []
+    cambios = observar(gestor)
+
+    gestor.actualizar_tarea(tarea.id, estado="pendiente")
+
+    assert tarea.to_dict()["vencida"] is True
+    assert [t.id for t in gestor.obtener_tareas_vencidas()] == [tarea.id]
+    assert gestor.obtener_estadisticas()["vencidas"] == 1
+    assert cambios == [("actualizar", tarea.id), ("vencer", tarea.id)]
+
+
+def test_cambiar_la_fecha_limite(gestor):
+    tarea = gestor.crear_tarea("con_fecha", "Informe", fecha_limite=datetime.now() + timedelta(days=1))
+    cambios = observar(gestor)
+
+    # Ya procesada: vence en el acto
+    gestor.actualizar_tarea(tarea.id, fecha_limite=datetime.now() - timedelta(days=1))
+    assert tarea.to_dict()["vencida"] is True
+    assert cambios == [("actualizar", tarea.id), ("vencer", tarea.id)]
+
+    # Posterior al último paso del planificador: vencerá cuando este la procese
+    gestor.actualizar_tarea(tarea.id, fecha_limite=datetime.now() + timedelta(milliseconds=1))
+    assert tarea.to_dict()["vencida"] is False
+    assert gestor.obtener_estadisticas()["vencidas"] == 0
+    time.sleep(0.01)
+    assert [t.id for t in gestor.procesar_vencimientos()] == [tarea.id]
+    assert tarea.to_dict()["vencida"] is True
+
+    # Una fecha futura la vuelve a dejar sin vencer
+    gestor.actualizar_tarea(tarea.id, fecha_limite=datetime.now() + timedelta(days=1))
+    assert tarea.to_dict()["vencida"] is False
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import threading
+import time
+import urllib.request
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from gestor import GestorTareas
+from models import TareaBase, TareaConFecha
+
+logger = logging.getLogger(__name__)
+
+
+async def _ejecutar_directamente(funcion: Callable, *args):
+    return funcion(*args)
+
+
+class PlanificadorVencimientos:
+    """
+    Procesa las fechas límite en el momento en que llegan, en lugar de mirar la
+    hora en cada petición. No guarda su propia cola: el almacén ya mantiene las
+    tareas ordenadas por fecha límite (un índice en memoria o en SQLite), así que
+    basta con una tarea asyncio que duerme hasta la próxima fecha, marca las tareas
+    vencidas (GestorTareas.procesar_vencimientos) y vuelve a dormir. El coste no
+    depende de cuántas fechas haya programadas: O(log n) por despertar más el de
+    las tareas que vencen.
+    Los avisos (eventos SSE, webhook...) son observadores del gestor que reciben
+    la operación "vencer".
+    ENCAPSULACIÓN: El planificador se entera de las fechas nuevas como observador
+    del gestor; si una es anterior a la que espera, se despierta antes.
+    Con varios procesos (SQLite) cada uno tiene su planificador: las fechas que
+    añaden los demás se ven al cabo de espera_maxima segundos como mucho, y
+    cada vencimiento se avisa una vez por proceso.
+    """
+
+    def __init__(self, gestor: GestorTareas, espera_maxima: float = 30.0,
+                 ejecutar: Callable[..., Awaitable] = _ejecutar_directamente):
+        self._gestor = gestor
+        self._espera_maxima = espera_maxima
+        # Cómo llamar al gestor desde el event loop (p. ej. en el threadpool)
+        self._ejecutar = ejecutar
+        self._bucle: Optional[asyncio.AbstractEventLoop] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._despertar: Optional[asyncio.Event] = None
+        # Fecha límite para la que está programado el próximo despertar (None: espera_maxima)
+        self._programado: Optional[datetime] = None
+        self._aviso_pendiente = False
+        self.vencidas = 0
+        self.despertares = 0
+        gestor.agregar_observador(self._observar)
+
+    async def iniciar(self):
+        """Marca las tareas ya vencidas y empieza a esperar la próxima fecha (en el arranque de la aplicación)"""
+        self._bucle = asyncio.get_running_loop()
+        self._despertar = asyncio.Event()
+        await self._ejecutar(self._gestor.procesar_vencimientos)
+        TareaConFecha.vencimientos_planificados = True
+        self._tarea = self._bucle.create_task(self._planificar())
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+        TareaConFecha.vencimientos_planificados = False
+        self._bucle = None
+
+    def _observar(self, operacion: str, id_tarea: int, tarea: Optional[TareaBase], version: int):
+        # Se llama con el cerrojo de escritura del gestor, en cualquier hilo: solo compara una fecha
+        fecha_limite = getattr(tarea, "fecha_limite", None)
+        if (fecha_limite is None or self._bucle is None or self._aviso_pendiente
+                or (self._programado is not None and fecha_limite >= self._programado)):
+            return
+        self._aviso_pendiente = True
+        self._bucle.call_soon_threadsafe(self._despertar.set)
+
+    async def _planificar(self):
+        while True:
+            # Antes de consultar la próxima fecha: un cambio mientras tanto también despierta
+            self._programado = None
+            self._aviso_pendiente = False
+            self._despertar.clear()
+            self._programado = await self._ejecutar(self._gestor.proximo_vencimiento)
+            espera = self._espera_maxima
+            if self._programado is not None:
+                # Un milisegundo de margen: el reloj del event loop no es el de datetime.now()
+                espera = min(espera, max(0.0, (self._programado - datetime.now()).total_seconds()) + 0.001)
+            try:
+                await asyncio.wait_for(self._despertar.wait(), espera)
+                # Hay una fecha anterior a la programada: volver a calcular la espera
+                continue
+            except asyncio.TimeoutError:
+                pass
+            try:
+                vencidas = await self._ejecutar(self._gestor.procesar_vencimientos)
+            except Exception:
+                logger.exception("Error al procesar los vencimientos")
+                continue
+            self.despertares += 1
+            self.vencidas += len(vencidas)
+
+
+class NotificadorWebhook:
+    """
+    Observador del gestor que envía por HTTP POST las tareas que vencen, en JSON:
+    {"evento": "vencer", "tareas": [...]} con hasta max_lote tareas por petición.
+    Un hilo propio hace los envíos para no bloquear a quien cambia las tareas; si el
+    destino no responde se reintenta y, si la cola se llena, se descartan los avisos
+    más antiguos (quedan contados en descartados).
+    """
+
+    def __init__(self, url: str, max_lote: int = 500, max_pendientes: int = 100000,
+                 reintentos: int = 3, tiempo_limite: float = 5.0):
+        self._url = url
+        self._max_lote = max_lote
+        self._reintentos = reintentos
+        self._tiempo_limite = tiempo_limite
+        self._pendientes: deque = deque(maxlen=max_pendientes)
+        self._condicion = threading.Condition()
+        self._activo = True
+        self.enviadas = 0
+        self.errores = 0
+        self.descartados = 0
+        self._hilo = threading.Thread(target=self._bucle, name="webhook-vencimientos", daemon=True)
+        self._hilo.start()
+
+    def __call__(self, operacion: str, id_tarea: int, tarea: Optional[TareaBase], version: int):
+        if operacion != "vencer":
+            return
+        with self._condicion:
+            if len(self._pendientes) == self._pendientes.maxlen:
+                self.descartados += 1
+            # Se serializa ya, con el cerrojo del gestor tomado: la tarea no puede estar cambiando
+            self._pendientes.append(tarea.to_json())
+            self._condicion.notify()
+
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                while self._activo and not self._pendientes:
+                    self._condicion.wait()
+                if not self._pendientes:
+                    return
+                lote = [self._pendientes.popleft() for _ in range(min(self._max_lote, len(self._pendientes)))]
+            self._enviar(b'{"evento":"vencer","tareas":[' + b",".join(lote) + b"]}", len(lote))
+
+    def _enviar(self, cuerpo: bytes, tareas: int):
+        peticion = urllib.request.Request(self._url, data=cuerpo, method="POST",
+                                          headers={"Content-Type": "application/json"})
+        for intento in range(self._reintentos):
+            try:
+                with urllib.request.urlopen(peticion, timeout=self._tiempo_limite) as respuesta:
+                    respuesta.read()
+                self.enviadas += tareas
+                return
+            except OSError as e:
+                if intento == self._reintentos - 1:
+                    self.errores += 1
+                    logger.warning("No se pudo avisar de %d vencimientos a %s: %s", tareas, self._url, e)
+                else:
+                    time.sleep(0.5 * 2 ** intento)
+
+    def cerrar(self):
+        """Envía lo pendiente y detiene el hilo"""
+        with self._condicion:
+            self._activo = False
+            self._condicion.notify()
+        self._hilo.join()